@@ -0,0 +1,41 @@
+"""
+Gunicorn settings read from the working directory at startup.
+"""
+import os
+import shutil
+import tracemalloc
+
+
+def on_starting(server):
+    # Metrics and memory snapshots of an earlier server run would otherwise be mixed into this one's
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mathInsight.settings')
+    from django.conf import settings
+    shutil.rmtree(settings.PERF_METRICS_DIR, ignore_errors=True)
+    shutil.rmtree(settings.PERF_MEMORY_DIR, ignore_errors=True)
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+    if settings.PERF_MEMORY_TRACE or settings.PERF_MEMORY_SNAPSHOT_INTERVAL:
+        from perf.memory import get_tracker, start_periodic, start_tracing
+        start_tracing()
+        get_tracker().snapshot('start')
+        if settings.PERF_MEMORY_SNAPSHOT_INTERVAL:
+            start_periodic(settings.PERF_MEMORY_SNAPSHOT_INTERVAL)
+
+
+def post_request(worker, req, environ, resp):
+    # Finish this request, then let the arbiter replace a worker that has grown past the ceiling
+    from perf.memory import get_tracker, over_ceiling
+    rss = over_ceiling()
+    if rss is None or not worker.alive:
+        return
+    worker.log.warning('Worker %s at %.0f MB is over PERF_WORKER_MAX_RSS_MB, recycling it', worker.pid, rss / 2**20)
+    if tracemalloc.is_tracing():
+        get_tracker().snapshot('ceiling')
+    worker.alive = False
+
+
+def child_exit(server, worker):
+    from perf.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 
 import environ
+import tempfile
 from pathlib import Path
 
 
@@ -55,9 +56,13 @@ INSTALLED_APPS = [
     'students',
     'assignments',
     'quizzes',
+    'perf',
 ]
 
 MIDDLEWARE = [
+    'perf.metrics.MetricsMiddleware',
+    'perf.middleware.RequestTimingMiddleware',
+    'perf.capture.TrafficCaptureMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -66,6 +71,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'perf.profiling.ProfilerMiddleware',
 ]
 # Django REST Framework & JWT settings
 AUTH_USER_MODEL = 'users.User'
@@ -174,6 +180,73 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Number of compiled quiz answer keys each worker keeps in memory
+QUIZ_ANSWER_KEY_CACHE_SIZE = env.int('QUIZ_ANSWER_KEY_CACHE_SIZE', default=256)
+
+# Graded answers are always packed onto each QuizAttempt; turn this off to
+# stop also writing one QuizAnswer row per answered question
+QUIZ_STORE_ANSWER_ROWS = env.bool('QUIZ_STORE_ANSWER_ROWS', default=True)
+
+# Share of requests (0 to 1) timed by perf.middleware.RequestTimingMiddleware
+PERF_SAMPLE_RATE = env.float('PERF_SAMPLE_RATE', default=1.0)
+
+# Each worker process keeps its request metrics in a memory-mapped file here;
+# /metrics adds them up. Must be shared by all workers of one server
+PERF_METRICS_DIR = env('PERF_METRICS_DIR', default=str(Path(tempfile.gettempdir()) / 'mathinsight-metrics'))
+
+# Tests write their metrics, logs and snapshots under a temporary directory
+TEST_RUNNER = 'perf.testing.PerfIsolatedRunner'
+
+# Queries slower than this many milliseconds are written, with their plan,
+# to a rotating JSONL log (0 turns it off); see perf/slow_queries.py
+PERF_SLOW_QUERY_MS = env.float('PERF_SLOW_QUERY_MS', default=200)
+PERF_SLOW_QUERY_LOG = env('PERF_SLOW_QUERY_LOG', default=str(BASE_DIR / 'logs' / 'slow_queries.jsonl'))
+PERF_SLOW_QUERY_LOG_MAX_BYTES = env.int('PERF_SLOW_QUERY_LOG_MAX_BYTES', default=10 * 1024 * 1024)
+PERF_SLOW_QUERY_LOG_BACKUPS = env.int('PERF_SLOW_QUERY_LOG_BACKUPS', default=5)
+
+# Staff can run one request under cProfile with ?_profile=1 or an
+# "X-Profile: 1" header; its .pstats file and SQL list are written here
+PERF_PROFILE_DIR = env('PERF_PROFILE_DIR', default=str(BASE_DIR / 'logs' / 'profiles'))
+PERF_PROFILE_TOP = env.int('PERF_PROFILE_TOP', default=25)
+
+# tracemalloc snapshots of each worker, taken through /api/perf/memory/ or
+# every PERF_MEMORY_SNAPSHOT_INTERVAL seconds under gunicorn (0 = on demand only).
+# Workers only trace, and so can only be snapshotted, with PERF_MEMORY_TRACE
+# on or a nonzero interval
+PERF_MEMORY_DIR = env('PERF_MEMORY_DIR', default=str(BASE_DIR / 'logs' / 'memory'))
+PERF_MEMORY_TRACE = env.bool('PERF_MEMORY_TRACE', default=False)
+PERF_MEMORY_SNAPSHOT_INTERVAL = env.int('PERF_MEMORY_SNAPSHOT_INTERVAL', default=0)
+PERF_MEMORY_FRAMES = env.int('PERF_MEMORY_FRAMES', default=10)
+PERF_MEMORY_KEEP = env.int('PERF_MEMORY_KEEP', default=10)
+# gunicorn replaces a worker whose resident memory passes this (0 = never)
+PERF_WORKER_MAX_RSS_MB = env.int('PERF_WORKER_MAX_RSS_MB', default=512)
+
+# Set to a file path to record each API request for the replay_traffic command
+PERF_CAPTURE_LOG = env('PERF_CAPTURE_LOG', default='')
+PERF_CAPTURE_MAX_BODY_BYTES = env.int('PERF_CAPTURE_MAX_BODY_BYTES', default=64 * 1024)
+PERF_CAPTURE_LOG_MAX_BYTES = env.int('PERF_CAPTURE_LOG_MAX_BYTES', default=100 * 1024 * 1024)
+PERF_CAPTURE_LOG_BACKUPS = env.int('PERF_CAPTURE_LOG_BACKUPS', default=5)
+
+# Timing lines of sampled requests are logged as JSON at DEBUG; set
+# PERF_LOG_LEVEL=DEBUG to print them to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'bare': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'perf_console': {'class': 'logging.StreamHandler', 'formatter': 'bare'},
+    },
+    'loggers': {
+        'perf.requests': {
+            'handlers': ['perf_console'],
+            'level': env('PERF_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Django REST Framework & JWT settings
 AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
@@ -16,6 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from perf.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -23,4 +24,6 @@ urlpatterns = [
     path('api/', include('students.urls')),
     path('api/', include('assignments.urls')),
     path('api/', include('quizzes.urls')),
+    path('api/', include('perf.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class PerfConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'perf'
+    verbose_name = 'Performance Tooling'
+
+    def ready(self):
+        from .slow_queries import install
+        install()
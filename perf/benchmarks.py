@@ -0,0 +1,296 @@
+"""
+perf/benchmarks.py
+Endpoint benchmarks against a seeded database.
+
+Every route in users/urls.py, students/urls.py and quizzes/urls.py has at
+least one Benchmark. Each is requested through the test client with a real
+JWT, a warm-up call first and then ``repeat`` timed calls, recording
+latency percentiles, SQL query count and time, and response size. Requests
+that write run inside a transaction that is rolled back, so every call sees
+the same data. A benchmark whose query count exceeds its budget is a
+violation; budgets don't depend on dataset size, so an N+1 shows up as soon
+as the dataset grows.
+"""
+import io
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from students.models import Student
+from users.models import User
+from quizzes.models import Quiz, QuizAttempt
+
+
+URL_MODULES = ('users.urls', 'students.urls', 'quizzes.urls')
+
+
+class Benchmark:
+    """One request to time: ``path`` and ``data`` are callables taking the fixture dict"""
+
+    def __init__(self, route, method, role, path, budget, data=None, prepare=None, label=None, multipart=False):
+        self.route = route
+        self.method = method
+        self.role = role
+        self.path = path
+        self.budget = budget
+        self.data = data
+        self.prepare = prepare
+        self.label = label or f'{method} {route}'
+        self.multipart = multipart
+
+    @property
+    def writes(self):
+        return self.method != 'GET'
+
+
+def _new_student(fixtures):
+    """A child of the fixture parent in the fixture teacher's class with no attempts yet, and the quiz reopened"""
+    Quiz.objects.filter(pk=fixtures['quiz'].pk).update(is_active=True, deadline=timezone.now() + timedelta(days=1))
+    student = Student.objects.create(
+        name='Benchmark Child', parent=fixtures['parent'], parent_name='Benchmark Parent',
+        parent_email=fixtures['parent'].email, class_name=fixtures['student'].class_name,
+        teacher=fixtures['teacher'],
+    )
+    return {'new_student': student}
+
+
+def _open_attempt(fixtures):
+    extra = _new_student(fixtures)
+    extra['open_attempt'] = QuizAttempt.objects.create(
+        quiz=fixtures['quiz'], student=extra['new_student'], parent=fixtures['parent'],
+        total_marks=fixtures['quiz'].total_marks,
+    )
+    return extra
+
+
+def _answers(fixtures):
+    return {
+        'student_id': fixtures['new_student'].id,
+        'answers': [
+            {'question_id': str(question_id), 'selected_option': 'ABCD'[i % 4]}
+            for i, question_id in enumerate(fixtures['questions'])
+        ],
+    }
+
+
+def _question(n):
+    return {
+        'question_text': f'Benchmark question {n}', 'option_a': '1', 'option_b': '2',
+        'option_c': '3', 'option_d': '4', 'correct_option': 'A', 'marks': 1,
+    }
+
+
+def _question_bank(fixtures):
+    lines = ['question_text,option_a,option_b,option_c,option_d,correct_option,marks']
+    lines += [f'Imported question {n},1,2,3,4,B,2' for n in range(50)]
+    upload = io.BytesIO('\n'.join(lines).encode())
+    upload.name = 'questions.csv'
+    return {'file': upload}
+
+
+BENCHMARKS = [
+    # users/urls.py
+    Benchmark('register', 'POST', None, lambda f: '/api/auth/register/', 1, data=lambda f: {
+        'email': 'benchmark-teacher@example.com', 'password': 'benchmark123', 'firstName': 'Bench',
+    }),
+    Benchmark('login', 'POST', None, lambda f: '/api/auth/login/', 2, data=lambda f: {
+        'email': f['teacher'].email, 'password': f['password'],
+    }),
+    Benchmark('me', 'GET', 'teacher', lambda f: '/api/auth/me/', 1),
+    Benchmark('teacher-profile', 'GET', 'teacher', lambda f: f"/api/teachers/{f['teacher'].id}/", 2),
+    Benchmark('teacher-students', 'GET', 'teacher', lambda f: f"/api/teachers/{f['teacher'].id}/students/", 2),
+    Benchmark('parent-me', 'GET', 'parent', lambda f: '/api/parent/me/', 2),
+    Benchmark('parent-children', 'GET', 'parent', lambda f: '/api/parent/children/', 2),
+    Benchmark('parent-all-performance', 'GET', 'parent', lambda f: '/api/parent/performance/', 2),
+    Benchmark(
+        'parent-child-performance', 'GET', 'parent',
+        lambda f: f"/api/parent/performance/child/{f['student'].id}/", 5,
+    ),
+    Benchmark(
+        'parent-quiz-attempt-detail', 'GET', 'parent',
+        lambda f: f"/api/parent/performance/child/{f['student'].id}/quiz/{f['attempt'].id}/", 5,
+    ),
+
+    # students/urls.py
+    Benchmark('student-list-create', 'GET', 'teacher', lambda f: '/api/students/', 2),
+    Benchmark('student-list-create', 'POST', 'teacher', lambda f: '/api/students/', 7, data=lambda f: {
+        'name': 'Benchmark Student', 'class_name': f['student'].class_name,
+        'parent_name': 'Benchmark Parent', 'parent_email': 'benchmark-parent@example.com',
+    }),
+    Benchmark('student-detail', 'GET', 'teacher', lambda f: f"/api/students/{f['student'].id}/", 2),
+    Benchmark('student-detail', 'PATCH', 'teacher', lambda f: f"/api/students/{f['student'].id}/", 4,
+              data=lambda f: {'class_name': f['student'].class_name}),
+    Benchmark('student-detail', 'DELETE', 'teacher', lambda f: f"/api/students/{f['new_student'].id}/", 9,
+              prepare=_new_student),
+    # Same path as users' parent-children, which is routed first
+    Benchmark('parent-children-list', 'GET', 'parent', lambda f: '/api/parent/children/', 2),
+
+    # quizzes/urls.py
+    Benchmark('quiz-list-create', 'GET', 'teacher', lambda f: '/api/quizzes/', 2),
+    Benchmark('quiz-list-create', 'POST', 'teacher', lambda f: '/api/quizzes/', 2, data=lambda f: {
+        'title': 'Benchmark quiz', 'description': 'Created by the benchmark', 'time_limit': 20,
+        'deadline': (timezone.now() + timedelta(days=7)).strftime('%Y-%m-%dT%H:%M:%SZ'), 'is_active': True,
+    }),
+    Benchmark('quiz-detail-update', 'GET', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/", 3),
+    Benchmark('quiz-detail-update', 'PATCH', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/", 4,
+              data=lambda f: {'description': 'Edited by the benchmark'}),
+    Benchmark('question-list-create', 'GET', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/questions/", 4),
+    Benchmark('question-list-create', 'POST', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/questions/", 5,
+              data=lambda f: _question(0)),
+    Benchmark('question-list-create', 'POST', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/questions/", 7,
+              data=lambda f: [_question(n) for n in range(25)], label='POST question-list-create (bulk)'),
+    Benchmark('question-export', 'GET', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/questions/export/", 3),
+    Benchmark('question-import', 'POST', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/questions/import/", 7,
+              data=_question_bank, multipart=True),
+    Benchmark('parent-quiz-list', 'GET', 'parent', lambda f: '/api/parent/quizzes/', 2),
+    Benchmark('start-quiz-attempt', 'POST', 'parent', lambda f: f"/api/quizzes/{f['quiz'].id}/attempt/", 9,
+              data=lambda f: {'student_id': f['new_student'].id}, prepare=_new_student),
+    Benchmark('submit-quiz', 'POST', 'parent', lambda f: f"/api/quizzes/{f['quiz'].id}/submit/", 15,
+              data=_answers, prepare=_open_attempt),
+    Benchmark('quiz-results', 'GET', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/results/", 7),
+    Benchmark('quiz-results', 'GET', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/results/?page=1", 7,
+              label='GET quiz-results (page)'),
+    Benchmark('quiz-results', 'GET', 'parent',
+              lambda f: f"/api/quizzes/{f['quiz'].id}/results/?student_id={f['student'].id}", 6,
+              label='GET quiz-results (parent)'),
+    Benchmark('quiz-item-analysis', 'GET', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/analysis/", 3),
+    Benchmark('quiz-regrade', 'POST', 'teacher', lambda f: f"/api/quizzes/{f['quiz'].id}/regrade/", 12),
+    Benchmark('teacher-students-scores', 'GET', 'teacher',
+              lambda f: f"/api/scores/teacher/{f['teacher'].id}/students/", 3),
+    Benchmark('teacher-student-detailed-scores', 'GET', 'teacher',
+              lambda f: f"/api/scores/teacher/{f['teacher'].id}/student/{f['student'].id}/", 3),
+    Benchmark('teacher-score-trends', 'GET', 'teacher',
+              lambda f: f"/api/scores/teacher/{f['teacher'].id}/trends/", 3),
+]
+
+
+def route_names():
+    """Names of every route the benchmarks have to cover"""
+    names = set()
+    for module in URL_MODULES:
+        for pattern in get_resolver(module).url_patterns:
+            if not isinstance(pattern, URLResolver) and pattern.name:
+                names.add(pattern.name)
+    return names
+
+
+def uncovered_routes():
+    return sorted(route_names() - {benchmark.route for benchmark in BENCHMARKS})
+
+
+def load_fixtures(password):
+    """Pick the busiest teacher, quiz, student and parent in the current database"""
+    teacher = User.objects.filter(role='teacher').annotate(
+        quiz_count=Count('quizzes', distinct=True), student_count=Count('students', distinct=True)
+    ).order_by('-quiz_count', '-student_count', 'pk').first()
+    quiz = Quiz.objects.filter(teacher=teacher).annotate(
+        completed=Count('attempts', filter=Q(attempts__is_completed=True))
+    ).order_by('-completed', 'pk').first()
+    attempt = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).select_related('student__parent').order_by(
+        'pk'
+    ).first()
+    if attempt is None:
+        raise ValueError('The database needs a teacher with a completed attempt; run seed_load first.')
+
+    return {
+        'password': password,
+        'teacher': teacher,
+        'quiz': quiz,
+        'attempt': attempt,
+        'student': attempt.student,
+        'parent': attempt.student.parent,
+        'questions': list(quiz.questions.order_by('pk').values_list('pk', flat=True)),
+    }
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def _call(client, benchmark, fixtures, headers):
+    """One request; returns (seconds, queries, response). Writes are rolled back with any prepared rows."""
+    with transaction.atomic():
+        if benchmark.prepare:
+            fixtures = {**fixtures, **benchmark.prepare(fixtures)}
+        path = benchmark.path(fixtures)
+        kwargs = dict(headers)
+        if benchmark.data:
+            data = benchmark.data(fixtures)
+            if benchmark.multipart:
+                kwargs['data'] = data
+            else:
+                kwargs.update(data=json.dumps(data), content_type='application/json')
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, benchmark.method.lower())(path, **kwargs)
+            if response.streaming:
+                response.content_length = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                response.content_length = len(response.content)
+            elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+    return elapsed, queries.captured_queries, response
+
+
+def run_benchmark(benchmark, fixtures, repeat=10):
+    client = Client()
+    headers = {}
+    if benchmark.role:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(fixtures[benchmark.role])}'
+
+    _call(client, benchmark, fixtures, headers)
+    timings, query_counts, sql_times, sizes, statuses = [], [], [], [], set()
+    for _ in range(repeat):
+        elapsed, queries, response = _call(client, benchmark, fixtures, headers)
+        timings.append(elapsed * 1000)
+        query_counts.append(len(queries))
+        sql_times.append(sum(float(query['time']) for query in queries) * 1000)
+        sizes.append(response.content_length)
+        statuses.add(response.status_code)
+
+    queries = max(query_counts)
+    return {
+        'method': benchmark.method,
+        'route': benchmark.route,
+        'status': sorted(statuses),
+        'p50_ms': round(_percentile(timings, 0.5), 3),
+        'p95_ms': round(_percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': queries,
+        'query_budget': benchmark.budget,
+        'sql_ms': round(statistics.fmean(sql_times), 3),
+        'response_bytes': max(sizes),
+        'over_budget': queries > benchmark.budget,
+    }
+
+
+def run_suite(repeat=10, password='loadtest123', benchmarks=None):
+    """Benchmark every endpoint against the current database; returns ``{label: result}``"""
+    fixtures = load_fixtures(password)
+    return {
+        benchmark.label: run_benchmark(benchmark, fixtures, repeat)
+        for benchmark in (benchmarks or BENCHMARKS)
+    }
+
+
+def violations(results):
+    """Human-readable problems in ``results``: failed requests and blown query budgets"""
+    problems = []
+    for label, result in results.items():
+        failed = [code for code in result['status'] if code >= 400]
+        if failed:
+            problems.append(f"{label}: HTTP {', '.join(map(str, failed))}")
+        if result['over_budget']:
+            problems.append(f"{label}: {result['queries']} queries, budget {result['query_budget']}")
+    return problems
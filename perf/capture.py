@@ -0,0 +1,129 @@
+"""
+perf/capture.py
+Opt-in recording of live API traffic, for replay as a load test.
+
+When PERF_CAPTURE_LOG is set, every API request is appended to it as one
+JSON line: when it arrived, method, route, path, query parameters, JSON
+body, the caller's role and user id, status and duration. Headers are not
+recorded, so tokens in Authorization never reach the file. Parameters
+named like passwords or tokens are replaced by ``<redacted>``. Requests
+with redacted values, non-JSON bodies or bodies over
+PERF_CAPTURE_MAX_BODY_BYTES are recorded with ``replayable: false``.
+perf/replay.py re-issues the rest.
+"""
+import atexit
+import json
+import re
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from .middleware import view_name
+from .slow_queries import JsonlWriter
+
+
+REDACTED = '<redacted>'
+SENSITIVE = re.compile(r'pass(word)?|token|secret|^refresh$|^access$|authorization|api_?key|csrf', re.I)
+SKIPPED_PREFIXES = ('/admin/', '/static/', '/metrics')
+
+
+def sanitize(value):
+    """``(value, redacted)``: the value with sensitive keys' values replaced, and whether any were"""
+    if isinstance(value, dict):
+        clean, redacted = {}, False
+        for key, item in value.items():
+            if SENSITIVE.search(str(key)):
+                clean[key], redacted = REDACTED, True
+            else:
+                clean[key], inner = sanitize(item)
+                redacted = redacted or inner
+        return clean, redacted
+    if isinstance(value, list):
+        items = [sanitize(item) for item in value]
+        return [item for item, _ in items], any(inner for _, inner in items)
+    return value, False
+
+
+def read_body(request):
+    """``(body, replayable)`` of a request, read before the view consumes the stream"""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if not length:
+        return None, True
+    if request.content_type != 'application/json' or length > settings.PERF_CAPTURE_MAX_BODY_BYTES:
+        return {'omitted': request.content_type, 'bytes': length}, False
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return {'omitted': 'invalid json', 'bytes': length}, False
+    body, redacted = sanitize(body)
+    return body, not redacted
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None or _writer.path != str(settings.PERF_CAPTURE_LOG):
+        if _writer is not None:
+            _writer.flush()
+        _writer = JsonlWriter(
+            settings.PERF_CAPTURE_LOG,
+            max_bytes=settings.PERF_CAPTURE_LOG_MAX_BYTES,
+            backup_count=settings.PERF_CAPTURE_LOG_BACKUPS,
+        )
+    return _writer
+
+
+def _flush_at_exit():
+    if _writer is not None:
+        _writer.flush()
+
+
+atexit.register(_flush_at_exit)
+
+
+class TrafficCaptureMiddleware:
+    """Record the shape of each request for replay; not loaded unless PERF_CAPTURE_LOG is set"""
+
+    def __init__(self, get_response):
+        if not settings.PERF_CAPTURE_LOG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path.startswith(SKIPPED_PREFIXES):
+            return self.get_response(request)
+
+        arrived = timezone.now()
+        body, replayable = read_body(request)
+        started = perf_counter()
+        response = self.get_response(request)
+        duration_ms = (perf_counter() - started) * 1000
+
+        route = view_name(request)
+        if route.startswith('perf-'):
+            return response
+        query, redacted = sanitize(dict(request.GET.lists()))
+        # DRF copies the user it authenticated onto the Django request
+        user = getattr(request, 'user', None)
+        authenticated = user is not None and user.is_authenticated
+        get_writer().write({
+            'ts': arrived.isoformat(),
+            'method': request.method,
+            'route': route,
+            'path': request.path,
+            'query': query,
+            'body': body,
+            'role': (user.role or ('staff' if user.is_staff else 'user')) if authenticated else 'anonymous',
+            'user_id': user.pk if authenticated else None,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'replayable': replayable and not redacted,
+        })
+        return response
@@ -0,0 +1,79 @@
+import json
+import sys
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from perf.benchmarks import run_suite, uncovered_routes, violations
+from quizzes.seeding import PRESETS, seed_load
+
+
+class Command(BaseCommand):
+    help = "Benchmark every API endpoint against seeded datasets and write a JSON report"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--datasets', nargs='+', choices=sorted(PRESETS), default=['small', 'medium', 'large'],
+                            help="seed_load presets to benchmark against, in order")
+        parser.add_argument('--repeat', type=int, default=10, help="Timed requests per endpoint")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Report path; defaults to stdout")
+        parser.add_argument('--current-db', action='store_true',
+                            help="Benchmark the configured database as it is instead of seeded test databases")
+        parser.add_argument('--password', default='loadtest123', help="Password of the seeded users")
+
+    def handle(self, *args, **options):
+        missing = uncovered_routes()
+        if missing:
+            raise CommandError(f"Routes without a benchmark: {', '.join(missing)}")
+
+        # Test client host, locmem email; already in place when run from a test
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            owns_environment = False
+        else:
+            owns_environment = True
+        try:
+            if options['current_db']:
+                datasets = {'current': self._measure(options)}
+            else:
+                datasets = self._seeded_runs(options)
+        finally:
+            if owns_environment:
+                teardown_test_environment()
+
+        problems = [
+            f"{name}: {problem}" for name, dataset in datasets.items() for problem in violations(dataset['endpoints'])
+        ]
+        report = json.dumps({'datasets': datasets, 'violations': problems}, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+        if problems:
+            raise CommandError('\n'.join(problems))
+        self.stderr.write(self.style.SUCCESS(
+            f"Benchmarked {len(next(iter(datasets.values()))['endpoints'])} endpoints "
+            f"against {', '.join(datasets)} with no budget violations."
+        ))
+
+    def _seeded_runs(self, options):
+        """Seed each preset into a throwaway test database, so the real one is never touched"""
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        datasets = {}
+        try:
+            for name in options['datasets']:
+                call_command('flush', interactive=False, verbosity=0)
+                sizes = seed_load(seed=options['seed'], password=options['password'], **PRESETS[name])
+                sys.stderr.write(f"Seeded {name}: {', '.join(f'{n} {k}' for k, n in sizes.items())}\n")
+                datasets[name] = {'rows': sizes, **self._measure(options)}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        return datasets
+
+    def _measure(self, options):
+        return {'endpoints': run_suite(repeat=options['repeat'], password=options['password'])}
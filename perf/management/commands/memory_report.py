@@ -0,0 +1,80 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perf import memory
+
+
+def _mb(size):
+    return f'{size / memory.MiB:.1f}MB'
+
+
+class Command(BaseCommand):
+    help = "Show the allocation sites that grew the most between two tracemalloc snapshots of each worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pid', type=int, action='append', help="Worker to report on; repeat for several (default: all)")
+        parser.add_argument('--from', dest='start', type=int, help="Snapshot sequence to compare from (default: the baseline)")
+        parser.add_argument('--to', dest='end', type=int, help="Snapshot sequence to compare to (default: the newest)")
+        parser.add_argument('--limit', type=int, default=15, help="Number of allocation sites to show")
+        parser.add_argument('--group-by', choices=memory.GROUP_BY, default='lineno', help="How to group allocations")
+        parser.add_argument('--dir', help="Snapshot directory to read instead of PERF_MEMORY_DIR")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        pids = options['pid'] or memory.worker_pids(options['dir'])
+        reports = [self._report(pid, options) for pid in pids]
+        reports = [report for report in reports if report]
+        if not reports:
+            raise CommandError("No memory snapshots found. Run the server with PERF_MEMORY_TRACE=1 and take one "
+                               "with POST /api/perf/memory/, or set PERF_MEMORY_SNAPSHOT_INTERVAL.")
+
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+
+        for report in reports:
+            older, newer = report['from'], report['to']
+            if older is None:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Worker {report['pid']}: one snapshot ({newer['label']}, {newer['ts']}), "
+                    f"rss {_mb(newer['rss_bytes'])}, largest allocation sites:"
+                ))
+                for site in report['sites']:
+                    self.stdout.write(f"  {site['size_kb']:>10.1f} KB  {site['count']:>8} blocks  {site['site']}")
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Worker {report['pid']}: snapshot {older['sequence']} ({older['ts']}) -> "
+                f"{newer['sequence']} ({newer['ts']}), rss {_mb(older['rss_bytes'])} -> {_mb(newer['rss_bytes'])}, "
+                f"traced {_mb(older['traced_bytes'])} -> {_mb(newer['traced_bytes'])}"
+            ))
+            for site in report['sites']:
+                self.stdout.write(
+                    f"  {site['size_diff_kb']:>+10.1f} KB  {site['count_diff']:>+8} blocks  "
+                    f"{site['site']}  (now {site['size_kb']:.1f} KB)"
+                )
+                for frame in (site['traceback'] or [])[1:]:
+                    self.stdout.write(f"      from {frame}")
+
+    def _report(self, pid, options):
+        entries = memory.read_entries(pid, options['dir'])
+        if not entries:
+            return None
+        by_sequence = {entry['sequence']: entry for entry in entries}
+        for name in ('start', 'end'):
+            if options[name] is not None and options[name] not in by_sequence:
+                raise CommandError(
+                    f"Worker {pid} has no snapshot {options[name]}; it has {', '.join(map(str, by_sequence))}."
+                )
+        newer = by_sequence[options['end']] if options['end'] is not None else entries[-1]
+        older = by_sequence[options['start']] if options['start'] is not None else entries[0]
+
+        def load(entry):
+            return memory.load(pid, entry, options['dir'])
+
+        if older is newer:
+            sites = memory.top_sites(load(newer), options['limit'], options['group_by'])
+            return {'pid': pid, 'from': None, 'to': newer, 'sites': sites}
+        sites = memory.compare(load(older), load(newer), options['limit'], options['group_by'])
+        return {'pid': pid, 'from': older, 'to': newer, 'sites': sites}
@@ -0,0 +1,74 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.replay import access_tokens, read_capture, replay, report
+
+
+class Command(BaseCommand):
+    help = "Replay captured API traffic against a running server and report throughput, latency and errors per route"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help="Capture log to read instead of PERF_CAPTURE_LOG (its backups are read too)")
+        parser.add_argument('--target', default='http://localhost:8000', help="Base URL of the server to replay against")
+        parser.add_argument('--speed', type=float, default=1.0, help="Replay this many times faster than recorded")
+        parser.add_argument('--concurrency', type=int, default=8, help="Number of concurrent clients")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for each response")
+        parser.add_argument('--route', action='append', help="Only replay this route name; repeat for several")
+        parser.add_argument('--limit', type=int, help="Replay only the first N replayable requests")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.PERF_CAPTURE_LOG
+        if not path:
+            raise CommandError("No capture log: pass --file or set PERF_CAPTURE_LOG.")
+        if options['speed'] <= 0 or options['concurrency'] < 1:
+            raise CommandError("--speed must be above 0 and --concurrency at least 1.")
+
+        records = read_capture(path, settings.PERF_CAPTURE_LOG_BACKUPS)
+        if options['route']:
+            records = [record for record in records if record['route'] in options['route']]
+        replayable = [record for record in records if record.get('replayable')]
+        tokens = access_tokens(record.get('user_id') for record in replayable)
+        # Requests of users that no longer exist would only measure 401s
+        replayable = [record for record in replayable if record.get('user_id') is None or record['user_id'] in tokens]
+        skipped = len(records) - len(replayable)
+        replayable = replayable[:options['limit']]
+        if not replayable:
+            raise CommandError(f"Nothing to replay in {path}.")
+
+        results, elapsed = replay(
+            replayable, options['target'], options['speed'], options['concurrency'], options['timeout'], tokens
+        )
+        summary = report(results, elapsed)
+        summary['skipped'] = skipped
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+
+        total = summary['total']
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {total['requests']} requests in {summary['elapsed_s']:.1f}s at {options['speed']:g}x "
+            f"with {options['concurrency']} clients: {total['throughput_rps']} req/s, "
+            f"p50 {total['p50_ms']:.1f}ms, p95 {total['p95_ms']:.1f}ms, p99 {total['p99_ms']:.1f}ms, "
+            f"errors {total['error_rate']:.2%}"
+        ))
+        if summary['skipped']:
+            self.stdout.write(f"Skipped {summary['skipped']} requests that can't be replayed (redacted, non-JSON or unknown user).")
+        if total['max_late_ms'] > 1000:
+            self.stdout.write(self.style.WARNING(
+                f"Requests were sent up to {total['max_late_ms'] / 1000:.1f}s late; "
+                "add clients with --concurrency to keep to the recorded pace."
+            ))
+        self.stdout.write(
+            f"{'route':<36} {'method':<7} {'reqs':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+            f"{'errors':>7} {'4xx':>5} {'changed':>8}"
+        )
+        for row in summary['routes']:
+            self.stdout.write(
+                f"{row['route'][:36]:<36} {row['method']:<7} {row['requests']:>6} {row['throughput_rps']:>8} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+                f"{row['error_rate']:>7.2%} {row['client_errors']:>5} {row['status_changed']:>8}"
+            )
@@ -0,0 +1,58 @@
+import json
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from perf.slow_queries import read_records, summarize
+
+
+UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def parse_duration(value):
+    match = re.fullmatch(r'(\d+)([smhd])', value)
+    if not match:
+        raise CommandError(f"Durations look like 30m, 6h or 2d, not {value!r}.")
+    return timedelta(**{UNITS[match[2]]: int(match[1])})
+
+
+class Command(BaseCommand):
+    help = "Summarize the slow-query log by query shape, worst total time first"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', default='24h', help="Window start, as a duration ago (30m, 6h, 2d)")
+        parser.add_argument('--until', help="Window end, as a duration ago; defaults to now")
+        parser.add_argument('--limit', type=int, default=10, help="Number of query shapes to show")
+        parser.add_argument('--file', help="Log to read instead of PERF_SLOW_QUERY_LOG (its backups are read too)")
+        parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        since = now - parse_duration(options['since'])
+        until = now - parse_duration(options['until']) if options['until'] else None
+        summary = summarize(read_records(since, until, path=options['file']))[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2, default=str))
+            return
+        if not summary:
+            self.stdout.write(f"No slow queries since {since:%Y-%m-%d %H:%M}.")
+            return
+
+        for rank, group in enumerate(summary, 1):
+            views = ', '.join(
+                f'{view} ({count})' for view, count in sorted(group['views'].items(), key=lambda item: -item[1])[:3]
+            )
+            self.stdout.write(self.style.WARNING(
+                f"{rank}. {group['fingerprint']}  {group['count']}x  total {group['total_ms']:.0f}ms  "
+                f"mean {group['mean_ms']:.1f}ms  p95 {group['p95_ms']:.1f}ms  max {group['max_ms']:.1f}ms"
+            ))
+            self.stdout.write(f"   {group['shape'][:300]}")
+            self.stdout.write(f"   views: {views}; last seen {group['last_seen']}")
+            sample = group['sample']
+            for frame in sample.get('stack', [])[-2:]:
+                self.stdout.write(f"   at {frame}")
+            for line in sample.get('explain') or []:
+                self.stdout.write(f"   plan: {line}")
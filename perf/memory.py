@@ -0,0 +1,207 @@
+"""
+perf/memory.py
+Memory growth diagnostics for worker processes.
+
+Each worker can keep tracemalloc snapshots, taken on demand through the
+staff endpoint or every PERF_MEMORY_SNAPSHOT_INTERVAL seconds, in its own
+directory under PERF_MEMORY_DIR. The first snapshot is the worker's
+baseline; it and the newest PERF_MEMORY_KEEP - 1 are kept. Comparing two
+snapshots gives the allocation sites that grew the most between them, and
+the files outlive the worker, so the memory_report command can diff any
+worker's snapshots after it has been recycled.
+
+tracemalloc only sees allocations made while it is tracing, so diffs are
+only meaningful in a worker that traces from boot: gunicorn's
+post_worker_init starts tracing with PERF_MEMORY_TRACE or a nonzero
+interval, and PYTHONTRACEMALLOC starts it with the interpreter. Asking a
+process that isn't tracing for a snapshot raises NotTracing.
+
+gunicorn.conf.py recycles a worker once its resident size crosses
+PERF_WORKER_MAX_RSS_MB, after the request that crossed it.
+"""
+import json
+import os
+import re
+import resource
+import threading
+import tracemalloc
+
+from django.conf import settings
+from django.utils import timezone
+
+
+MiB = 1024 * 1024
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# tracemalloc's own bookkeeping and the import machinery only add noise
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def rss_bytes():
+    """Resident set size of this process; the peak where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def over_ceiling():
+    """This process's RSS if it is above PERF_WORKER_MAX_RSS_MB, else None"""
+    ceiling = settings.PERF_WORKER_MAX_RSS_MB
+    rss = rss_bytes()
+    return rss if ceiling and rss > ceiling * MiB else None
+
+
+def _site(frame):
+    base = str(settings.BASE_DIR) + os.sep
+    filename = frame.filename
+    if filename.startswith(base):
+        filename = filename[len(base):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{filename}:{frame.lineno}'
+
+
+def compare(older, newer, limit=15, group_by='lineno'):
+    """Allocation sites whose memory grew the most from one snapshot to the next"""
+    return [
+        {
+            'site': _site(diff.traceback[-1]),
+            'traceback': [_site(frame) for frame in reversed(diff.traceback)] if group_by == 'traceback' else None,
+            'size_kb': round(diff.size / 1024, 1),
+            'size_diff_kb': round(diff.size_diff / 1024, 1),
+            'count': diff.count,
+            'count_diff': diff.count_diff,
+        }
+        for diff in newer.compare_to(older, group_by)[:limit]
+    ]
+
+
+def top_sites(snapshot, limit=15, group_by='lineno'):
+    """Allocation sites holding the most memory in one snapshot"""
+    return [
+        {
+            'site': _site(stat.traceback[-1]),
+            'traceback': [_site(frame) for frame in reversed(stat.traceback)] if group_by == 'traceback' else None,
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count,
+        }
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+
+
+def worker_directory(pid, directory=None):
+    return os.path.join(str(directory or settings.PERF_MEMORY_DIR), f'worker_{pid}')
+
+
+def read_entries(pid, directory=None):
+    """Index entries of a worker's snapshots that are still on disk, oldest first"""
+    path = worker_directory(pid, directory)
+    try:
+        with open(os.path.join(path, 'index.jsonl')) as index:
+            entries = [json.loads(line) for line in index if line.strip()]
+    except FileNotFoundError:
+        return []
+    return [entry for entry in entries if os.path.exists(os.path.join(path, entry['file']))]
+
+
+def worker_pids(directory=None):
+    directory = str(directory or settings.PERF_MEMORY_DIR)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(match[1]) for match in map(re.compile(r'worker_(\d+)').fullmatch, os.listdir(directory)) if match)
+
+
+def load(pid, entry, directory=None):
+    return tracemalloc.Snapshot.load(os.path.join(worker_directory(pid, directory), entry['file']))
+
+
+class NotTracing(Exception):
+    """Raised when a snapshot is asked of a process that isn't tracing allocations"""
+
+
+class MemoryTracker:
+    """The current process's tracemalloc snapshots on disk"""
+
+    def __init__(self, directory):
+        self.pid = os.getpid()
+        self.root = str(directory)
+        self.directory = worker_directory(self.pid, self.root)
+        self._lock = threading.Lock()
+        entries = read_entries(self.pid, self.root)
+        self._sequence = entries[-1]['sequence'] + 1 if entries else 0
+
+    def snapshot(self, label='manual'):
+        """Take, store and index a snapshot; the first one is the baseline"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise NotTracing(
+                    'tracemalloc is not tracing in this process; start workers with '
+                    'PERF_MEMORY_TRACE=1 or a PERF_MEMORY_SNAPSHOT_INTERVAL'
+                )
+            snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+            traced, peak = tracemalloc.get_traced_memory()
+            os.makedirs(self.directory, exist_ok=True)
+            entry = {
+                'sequence': self._sequence,
+                'file': f'{self._sequence:05d}.snapshot',
+                'label': label,
+                'ts': timezone.now().isoformat(),
+                'rss_bytes': rss_bytes(),
+                'traced_bytes': traced,
+                'traced_peak_bytes': peak,
+            }
+            snapshot.dump(os.path.join(self.directory, entry['file']))
+            with open(os.path.join(self.directory, 'index.jsonl'), 'a') as index:
+                index.write(json.dumps(entry) + '\n')
+            self._sequence += 1
+            self._prune()
+            return entry, snapshot
+
+    def _prune(self):
+        entries = read_entries(self.pid, self.root)
+        for entry in entries[1:1 - max(settings.PERF_MEMORY_KEEP, 2)]:
+            os.remove(os.path.join(self.directory, entry['file']))
+
+    def entries(self):
+        return read_entries(self.pid, self.root)
+
+
+def start_tracing():
+    """Start tracemalloc with PERF_MEMORY_FRAMES frames; False if it was already tracing"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(settings.PERF_MEMORY_FRAMES)
+    return True
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker():
+    """This process's MemoryTracker; a forked worker gets its own directory"""
+    global _tracker
+    directory = str(settings.PERF_MEMORY_DIR)
+    with _tracker_lock:
+        if _tracker is None or _tracker.pid != os.getpid() or _tracker.root != directory:
+            _tracker = MemoryTracker(directory)
+        return _tracker
+
+
+def start_periodic(interval):
+    """Snapshot this process every ``interval`` seconds on a daemon thread; set the returned event to stop"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            get_tracker().snapshot('periodic')
+
+    threading.Thread(target=run, name='perf-memory-snapshots', daemon=True).start()
+    return stop
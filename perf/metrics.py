@@ -0,0 +1,348 @@
+"""
+perf/metrics.py
+Request metrics shared by every worker process, in Prometheus text format.
+
+Each worker adds to its own memory-mapped file of float64 values in
+PERF_METRICS_DIR, so updates need no cross-process locking. A scrape
+reads and sums the files of all workers. Counters and histograms from
+workers that have exited are folded into an archive file by
+mark_process_dead(), which gunicorn.conf.py calls from child_exit, so
+totals don't drop when a worker is replaced. Gauges of dead workers are
+dropped instead. A scrape folds the files of any other workers that have
+exited, such as ones killed before child_exit ran.
+
+Metrics are labelled by route name rather than path, so ids in URLs don't
+create new series.
+"""
+import fcntl
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .middleware import view_name
+from .stats import BUCKETS_MS
+
+
+PREFIX = 'mathinsight_'
+DURATION_BUCKETS = tuple(bound / 1000 for bound in BUCKETS_MS)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# name: (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status.'),
+    'http_request_errors_total': ('counter', 'Requests that ended in a server error.'),
+    'http_request_duration_seconds': ('histogram', 'Time to produce the response.'),
+    'http_request_queries': ('histogram', 'SQL queries run per request.'),
+    'http_requests_in_flight': ('gauge', 'Requests being handled right now.'),
+}
+
+_HEADER = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+
+def _entries(data):
+    """(key, value, offset of value) for each entry in the bytes of a values file"""
+    used = _HEADER.unpack_from(data, 0)[0] if len(data) >= _HEADER.size else 0
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        key_end = position + _LENGTH.size + length
+        value_at = key_end + (-key_end % 8)
+        yield data[position + _LENGTH.size:key_end].decode(), _VALUE.unpack_from(data, value_at)[0], value_at
+        position = value_at + _VALUE.size
+
+
+class MmapValues:
+    """
+    Float values by key in a memory-mapped file written by one process.
+
+    The file starts with the number of bytes in use, followed by entries of
+    key length, key and an 8-byte aligned float64. An entry is written in
+    full before the header is moved past it, so readers never see half of one.
+    """
+
+    def __init__(self, path, initial_size=64 * 1024):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size < initial_size:
+            self._file.truncate(initial_size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._offsets = {key: offset for key, _, offset in _entries(self._map)}
+
+    def add(self, key, amount=1):
+        with self._lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                offset = self._append(key)
+            _VALUE.pack_into(self._map, offset, _VALUE.unpack_from(self._map, offset)[0] + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        key_end = self._used + _LENGTH.size + len(encoded)
+        offset = key_end + (-key_end % 8)
+        if offset + _VALUE.size > len(self._map):
+            size = max(2 * len(self._map), offset + _VALUE.size)
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        _LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _LENGTH.size:key_end] = encoded
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used = offset + _VALUE.size
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def items(self):
+        with self._lock:
+            return [(key, value) for key, value, _ in _entries(self._map)]
+
+    def close(self):
+        with self._lock:
+            self._map.close()
+            self._file.close()
+
+
+def _key(name, **labels):
+    return json.dumps([name, sorted(labels.items())], separators=(',', ':'))
+
+
+class Metrics:
+    """The current process's writer of the shared metrics"""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.pid = os.getpid()
+        os.makedirs(self.directory, exist_ok=True)
+        self.values = MmapValues(os.path.join(self.directory, f'worker_{self.pid}.db'))
+
+    def observe(self, name, buckets, value, **labels):
+        le = next((str(bound) for bound in buckets if value <= bound), '+Inf')
+        self.values.add(_key(f'{name}_bucket', le=le, **labels))
+        self.values.add(_key(f'{name}_sum', **labels), value)
+        self.values.add(_key(f'{name}_count', **labels))
+
+    def request_started(self, route):
+        self.values.add(_key('http_requests_in_flight', route=route))
+
+    def request_finished(self, route, method, status, seconds, queries, in_flight=True):
+        if in_flight:
+            self.values.add(_key('http_requests_in_flight', route=route), -1)
+        self.values.add(_key('http_requests_total', route=route, method=method, status=str(status)))
+        if status >= 500:
+            self.values.add(_key('http_request_errors_total', route=route, method=method))
+        self.observe('http_request_duration_seconds', DURATION_BUCKETS, seconds, route=route, method=method)
+        self.observe('http_request_queries', QUERY_BUCKETS, queries, route=route)
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """This process's Metrics; a forked worker gets its own file instead of its parent's"""
+    global _metrics
+    directory = str(settings.PERF_METRICS_DIR)
+    if _metrics is None or _metrics.pid != os.getpid() or _metrics.directory != directory:
+        with _metrics_lock:
+            if _metrics is None or _metrics.pid != os.getpid() or _metrics.directory != directory:
+                if _metrics is not None:
+                    _metrics.values.close()
+                _metrics = Metrics(directory)
+    return _metrics
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _is_gauge(key):
+    return METRICS.get(json.loads(key)[0], ('',))[0] == 'gauge'
+
+
+@contextmanager
+def _archive_lock(directory, operation=fcntl.LOCK_EX):
+    """Held exclusively while a worker file is folded into the archive, shared while files are read"""
+    with open(os.path.join(directory, 'archive.lock'), 'a') as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+
+def mark_process_dead(pid, directory=None):
+    """Fold an exited worker's counters and histograms into the archive and remove its file"""
+    directory = str(directory or settings.PERF_METRICS_DIR)
+    path = os.path.join(directory, f'worker_{pid}.db')
+    with _archive_lock(directory):
+        # Checked under the lock: a concurrent scrape may have folded it already
+        try:
+            with open(path, 'rb') as dead:
+                entries = [(key, value) for key, value, _ in _entries(dead.read()) if not _is_gauge(key)]
+        except FileNotFoundError:
+            return
+        archive = MmapValues(os.path.join(directory, 'archive.db'))
+        try:
+            for key, value in entries:
+                archive.add(key, value)
+        finally:
+            archive.close()
+        os.remove(path)
+
+
+def collect(directory=None):
+    """``{key: value}`` summed over the archive and every worker file; gauges only from live workers"""
+    directory = str(directory or settings.PERF_METRICS_DIR)
+    totals = {}
+    if not os.path.isdir(directory):
+        return totals
+    for name in os.listdir(directory):
+        match = re.fullmatch(r'worker_(\d+)\.db', name)
+        if match and int(match[1]) != os.getpid() and not _alive(int(match[1])):
+            mark_process_dead(int(match[1]), directory)
+
+    with _archive_lock(directory, fcntl.LOCK_SH):
+        for name in sorted(os.listdir(directory)):
+            match = re.fullmatch(r'worker_(\d+)\.db|archive\.db', name)
+            if not match:
+                continue
+            live = match[1] is None or int(match[1]) == os.getpid() or _alive(int(match[1]))
+            try:
+                with open(os.path.join(directory, name), 'rb') as values_file:
+                    data = values_file.read()
+            except FileNotFoundError:
+                continue
+            for key, value, _ in _entries(data):
+                if live or not _is_gauge(key):
+                    totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def _bucket_order(le):
+    return float('inf') if le == '+Inf' else float(le)
+
+
+def render(totals):
+    """Prometheus text exposition (format 0.0.4) of collected values"""
+    series = {}
+    for key, value in totals.items():
+        name, pairs = json.loads(key)
+        series.setdefault(name, []).append((tuple(map(tuple, pairs)), value))
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        full_name = PREFIX + name
+        lines += [f'# HELP {full_name} {help_text}', f'# TYPE {full_name} {kind}']
+        if kind != 'histogram':
+            for pairs, value in sorted(series.get(name, [])):
+                lines.append(f'{full_name}{_labels(pairs)} {_number(value)}')
+            continue
+
+        buckets = {}
+        for pairs, value in series.get(f'{name}_bucket', []):
+            le = dict(pairs)['le']
+            buckets.setdefault(tuple(pair for pair in pairs if pair[0] != 'le'), {})[le] = value
+        bounds = [str(bound) for bound in (DURATION_BUCKETS if name.endswith('seconds') else QUERY_BUCKETS)]
+        sums = dict(series.get(f'{name}_sum', []))
+        counts = dict(series.get(f'{name}_count', []))
+        for pairs in sorted(buckets):
+            cumulative = 0
+            for le in sorted(set(bounds) | set(buckets[pairs]) | {'+Inf'}, key=_bucket_order):
+                cumulative += buckets[pairs].get(le, 0)
+                lines.append(f'{full_name}_bucket{_labels(pairs + (("le", le),))} {_number(cumulative)}')
+            lines.append(f'{full_name}_sum{_labels(pairs)} {_number(sums.get(pairs, 0))}')
+            lines.append(f'{full_name}_count{_labels(pairs)} {_number(counts.get(pairs, 0))}')
+    return '\n'.join(lines) + '\n'
+
+
+class _RequestTally:
+    """One request's clock and query count, recorded into the shared metrics once its response is done"""
+
+    def __init__(self, request):
+        self.request = request
+        self.started = perf_counter()
+        self.queries = 0
+        self.done = False
+        # Added and removed by identity rather than with execute_wrapper(), whose
+        # exit pops the last wrapper: a streamed response outlives this middleware's
+        # call, while middleware inside it may still unwind their own wrappers
+        self.connections = list(connections.all())
+        for connection in self.connections:
+            connection.execute_wrappers.append(self)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def finish(self, status):
+        if self.done:
+            return
+        self.done = True
+        for connection in self.connections:
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+        route = getattr(self.request, '_perf_route', None)
+        get_metrics().request_finished(
+            route or view_name(self.request), self.request.method, status, perf_counter() - self.started,
+            self.queries, in_flight=route is not None,
+        )
+
+
+class MetricsMiddleware:
+    """Count, time and tally the queries of every request into the shared metrics"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tally = _RequestTally(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            tally.finish(500)
+            raise
+        if response.streaming:
+            # A streamed body runs its queries while it is sent, so the request
+            # ends with the stream, or when the server closes the response early
+            response.streaming_content = self._streamed(response.streaming_content, tally, response.status_code)
+            response._resource_closers.append(lambda: tally.finish(response.status_code))
+        else:
+            tally.finish(response.status_code)
+        return response
+
+    def _streamed(self, content, tally, status):
+        try:
+            yield from content
+        finally:
+            tally.finish(status)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._perf_route = view_name(request)
+        get_metrics().request_started(request._perf_route)
@@ -0,0 +1,141 @@
+"""
+perf/middleware.py
+Per-request timing: total time, DB queries and time, render time and size.
+
+A sampled request runs with an execute wrapper on every database
+connection that counts queries and their time. DRF responses are rendered
+after the view returns, so render time is measured from
+process_template_response() to a post-render callback. The result goes
+out in a Server-Timing header, a DEBUG-level JSON line on the
+``perf.requests`` logger and the per-view histograms of perf.stats.
+PERF_SAMPLE_RATE picks the share of requests measured; the rest pass
+straight through.
+"""
+import json
+import logging
+import random
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .stats import request_stats
+
+
+logger = logging.getLogger('perf.requests')
+
+# The request being handled, for code that only sees its queries
+current_request = ContextVar('current_request', default=None)
+
+
+class RequestTiming:
+    """Measurements of one request; also the execute wrapper that counts its queries"""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+        self.bytes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += perf_counter() - started
+
+    def rendered(self, response):
+        self.render_time = perf_counter() - self.render_started
+
+    def server_timing(self):
+        total = perf_counter() - self.started
+        app = max(total - self.db_time - self.render_time, 0)
+        return (
+            f'app;dur={app * 1000:.1f}, db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f'render;dur={self.render_time * 1000:.1f}, total;dur={total * 1000:.1f}'
+        )
+
+
+def sampled():
+    rate = settings.PERF_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_request.set(request)
+        try:
+            return self._timed(request) if sampled() else self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+    def _timed(self, request):
+        timing = request._perf_timing = RequestTiming()
+        wrappers = ExitStack()
+        for connection in connections.all():
+            wrappers.enter_context(connection.execute_wrapper(timing))
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            wrappers.close()
+            raise
+
+        response['Server-Timing'] = timing.server_timing()
+        if response.streaming:
+            # Streamed bodies run their queries as they are sent, so the
+            # wrappers stay on and the request is recorded once the stream ends
+            response.streaming_content = self._counted(
+                response.streaming_content, request, response, timing, wrappers
+            )
+        else:
+            wrappers.close()
+            timing.bytes = len(response.content)
+            self._record(request, response, timing)
+        return response
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, '_perf_timing', None)
+        if timing is not None:
+            timing.render_started = perf_counter()
+            response.add_post_render_callback(timing.rendered)
+        return response
+
+    def _counted(self, content, request, response, timing, wrappers):
+        try:
+            for chunk in content:
+                timing.bytes += len(chunk)
+                yield chunk
+        finally:
+            wrappers.close()
+            self._record(request, response, timing)
+
+    def _record(self, request, response, timing):
+        total_ms = (perf_counter() - timing.started) * 1000
+        db_ms = timing.db_time * 1000
+        render_ms = timing.render_time * 1000
+        view = view_name(request)
+        request_stats.record(view, response.status_code, total_ms, db_ms, timing.queries, render_ms, timing.bytes)
+        logger.debug(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 3),
+            'db_ms': round(db_ms, 3),
+            'queries': timing.queries,
+            'render_ms': round(render_ms, 3),
+            'bytes': timing.bytes,
+        }))
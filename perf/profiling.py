@@ -0,0 +1,145 @@
+"""
+perf/profiling.py
+On-demand cProfile of a single request, for staff.
+
+A request with an ``X-Profile: 1`` header or a ``_profile=1`` query
+parameter from a staff user runs under cProfile, with an execute wrapper
+collecting its SQL. The .pstats file and the SQL list are written to
+PERF_PROFILE_DIR, and the response body is replaced by a JSON summary of
+the top functions by cumulative time. Staff status comes from the session
+or, since DRF only authenticates inside the view, from the request's JWT.
+Anyone else's trigger is ignored.
+"""
+import cProfile
+import json
+import os
+import pstats
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .middleware import view_name
+from .slow_queries import redact
+
+
+TRIGGER_PARAM = '_profile'
+TRIGGER_HEADER = 'HTTP_X_PROFILE'
+
+
+def wants_profile(request):
+    return request.GET.get(TRIGGER_PARAM) == '1' or request.META.get(TRIGGER_HEADER) == '1'
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+class SqlLog:
+    """Execute wrapper keeping every statement of the request with its time"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': None if many else redact(params),
+                'many': many,
+                'ms': round((perf_counter() - started) * 1000, 3),
+            })
+
+
+def _location(filename, line, function):
+    if filename == '~':
+        return function
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        filename = filename[len(base):]
+    elif 'site-packages' + os.sep in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f'{filename}:{line}({function})'
+
+
+def top_functions(profile, limit):
+    """The ``limit`` functions with the most cumulative time, as plain dicts"""
+    stats = pstats.Stats(profile).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': _location(*key),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        }
+        for key, (primitive_calls, calls, tottime, cumtime, _) in ranked
+    ]
+
+
+class ProfilerMiddleware:
+    """Profile a staff request on demand and answer with the summary instead of the view's response"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not wants_profile(request) or not is_staff(request):
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        sql = SqlLog()
+        started = perf_counter()
+        with ExitStack() as wrappers:
+            for connection in connections.all():
+                wrappers.enter_context(connection.execute_wrapper(sql))
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already running in this thread
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+        total_ms = (perf_counter() - started) * 1000
+
+        view = view_name(request)
+        directory = str(settings.PERF_PROFILE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{timezone.now():%Y%m%dT%H%M%S.%f}-{view.replace(':', '_')}-{os.getpid()}"
+        pstats_path = os.path.join(directory, f'{name}.pstats')
+        sql_path = os.path.join(directory, f'{name}.sql.json')
+        profile.dump_stats(pstats_path)
+        with open(sql_path, 'w') as sql_file:
+            json.dump(sql.queries, sql_file, indent=2, default=str)
+
+        return JsonResponse({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 3),
+            'queries': len(sql.queries),
+            'sql_ms': round(sum(query['ms'] for query in sql.queries), 3),
+            'pstats': pstats_path,
+            'sql': sql_path,
+            'top': top_functions(profile, settings.PERF_PROFILE_TOP),
+        })
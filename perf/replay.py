@@ -0,0 +1,161 @@
+"""
+perf/replay.py
+Re-issue captured traffic against a running server and measure it.
+
+Records from the capture log keep their original spacing, divided by
+``speed``. A pool of ``concurrency`` clients sends them, so a server that
+falls behind makes requests queue up on the client side. That shows up as
+lateness in the report. Each request is authenticated as the user who made
+it, with an access token signed by this process's settings. The target
+server therefore needs the same SECRET_KEY and a copy of the same database.
+Replay against a throwaway copy, because recorded writes are made again.
+"""
+import json
+import os
+import queue
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+from time import perf_counter, sleep
+from urllib.parse import urlencode
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+
+from .slow_queries import JsonlWriter
+
+
+def read_capture(path, backup_count=5):
+    """Captured records from a log and its backups, in arrival order"""
+    records = []
+    for name in reversed(JsonlWriter(path, backup_count=backup_count).files()):
+        if not os.path.exists(name):
+            continue
+        with open(name) as capture_file:
+            for line in capture_file:
+                try:
+                    record = json.loads(line)
+                    record['ts'] = datetime.fromisoformat(record['ts'])
+                except (ValueError, KeyError):
+                    continue
+                records.append(record)
+    return sorted(records, key=lambda record: record['ts'])
+
+
+def access_tokens(user_ids):
+    """Fresh access tokens by user id, for the users that still exist"""
+    return {
+        user_id: str(AccessToken.for_user(user))
+        for user_id, user in User.objects.in_bulk(set(user_ids) - {None}).items()
+    }
+
+
+def _send(target, record, token, timeout):
+    url = target.rstrip('/') + record['path']
+    if record.get('query'):
+        url += '?' + urlencode(record['query'], doseq=True)
+    headers = {'Accept': 'application/json'}
+    data = None
+    if record.get('body') is not None:
+        data = json.dumps(record['body']).encode()
+        headers['Content-Type'] = 'application/json'
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    request = urllib.request.Request(url, data=data, headers=headers, method=record['method'])
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        error.read()
+        return error.code
+    except OSError:
+        return 0
+
+
+def replay(records, target, speed=1.0, concurrency=8, timeout=30.0, tokens=None):
+    """
+    Send ``records`` to ``target``; returns (results, elapsed seconds).
+
+    Each result has the record's method, route and recorded status, the
+    replayed status (0 when the connection failed), latency_ms and late_ms,
+    which is how long after its scheduled time the request was sent.
+    """
+    tokens = tokens or {}
+    pending = queue.Queue(maxsize=concurrency * 2)
+    results = []
+
+    def client():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            record, due = item
+            sent = perf_counter()
+            status = _send(target, record, tokens.get(record.get('user_id')), timeout)
+            results.append({
+                'method': record['method'],
+                'route': record['route'],
+                'recorded_status': record.get('status'),
+                'status': status,
+                'latency_ms': (perf_counter() - sent) * 1000,
+                'late_ms': max(0.0, (sent - due) * 1000),
+            })
+
+    clients = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    started = perf_counter()
+    first = records[0]['ts'] if records else None
+    for record in records:
+        due = started + (record['ts'] - first).total_seconds() / speed
+        wait = due - perf_counter()
+        if wait > 0:
+            sleep(wait)
+        pending.put((record, due))
+    for _ in clients:
+        pending.put(None)
+    for thread in clients:
+        thread.join()
+    return results, perf_counter() - started
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+def _summary(results, elapsed):
+    latencies = sorted(result['latency_ms'] for result in results)
+    errors = sum(1 for result in results if result['status'] == 0 or result['status'] >= 500)
+    return {
+        'requests': len(results),
+        'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(_percentile(latencies, 0.5), 3),
+        'p95_ms': round(_percentile(latencies, 0.95), 3),
+        'p99_ms': round(_percentile(latencies, 0.99), 3),
+        'max_ms': round(latencies[-1], 3),
+        'errors': errors,
+        'error_rate': round(errors / len(results), 4),
+        'client_errors': sum(1 for result in results if 400 <= result['status'] < 500),
+        'status_changed': sum(1 for result in results if result['status'] != result['recorded_status']),
+        'max_late_ms': round(max(result['late_ms'] for result in results), 3),
+    }
+
+
+def report(results, elapsed):
+    """Totals and per-route figures of a replay, busiest route first"""
+    by_route = {}
+    for result in results:
+        by_route.setdefault((result['method'], result['route']), []).append(result)
+    routes = [
+        {'method': method, 'route': route, **_summary(route_results, elapsed)}
+        for (method, route), route_results in by_route.items()
+    ]
+    routes.sort(key=lambda row: (-row['requests'], row['route'], row['method']))
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'total': _summary(results, elapsed) if results else None,
+        'routes': routes,
+    }
@@ -0,0 +1,293 @@
+"""
+perf/slow_queries.py
+Slow-query log: queries over PERF_SLOW_QUERY_MS, with their EXPLAIN output.
+
+install() adds SlowQueryLog as an execute wrapper to every new database
+connection. A query that takes longer than the threshold is written out
+with its SQL, redacted parameters, a fingerprint of its shape, the view
+and request it ran for, the project frames of its stack and the plan the
+database gives for it. Plans come from a bare backend cursor, so the
+EXPLAIN is not itself seen by execute wrappers or counted against the
+request.
+
+Records are buffered and appended to a size-rotated JSONL file by
+JsonlWriter; summarize() groups a time window of them by fingerprint for
+the slow_queries command.
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import traceback
+from datetime import date, datetime, time as clock_time
+from decimal import Decimal
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+from .middleware import current_request, view_name
+
+
+class JsonlWriter:
+    """
+    Buffered, size-rotated JSONL file.
+
+    Records are kept in memory until ``buffer_size`` of them are waiting or
+    ``flush_interval`` seconds have passed, then appended in one write. A
+    file that would grow past ``max_bytes`` is first rotated to ``.1``,
+    ``.2`` ... keeping ``backup_count`` old files.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5, buffer_size=50, flush_interval=5.0):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._lines = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def write(self, record):
+        line = json.dumps(record, default=str, sort_keys=True) + '\n'
+        with self._lock:
+            self._lines.append(line)
+            full = len(self._lines) >= self.buffer_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            lines, self._lines = self._lines, []
+            if not lines:
+                return
+            data = ''.join(lines).encode()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            if size and size + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'ab') as log_file:
+                log_file.write(data)
+
+    def _rotate(self):
+        if self.backup_count < 1:
+            os.remove(self.path)
+            return
+        for n in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{n}'):
+                os.replace(f'{self.path}.{n}', f'{self.path}.{n + 1}')
+        os.replace(self.path, f'{self.path}.1')
+
+    def files(self):
+        """The current file and its backups, newest first"""
+        return [self.path] + [f'{self.path}.{n}' for n in range(1, self.backup_count + 1)]
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUE_ROWS = re.compile(r'VALUES\s*\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+', re.I)
+
+
+def normalize(sql):
+    """The shape of ``sql``: literals and placeholders become ?, value lists collapse to (...)"""
+    shape = _LITERALS.sub('?', sql)
+    shape = _LISTS.sub('(...)', shape)
+    shape = _VALUE_ROWS.sub('VALUES (...)', shape)
+    return ' '.join(shape.split())
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def redact(value):
+    """Keep numbers, flags and dates, which say how a query was filtered; hide text and bytes"""
+    if value is None or isinstance(value, (bool, int, float, Decimal, date, datetime, clock_time)):
+        return value
+    if isinstance(value, str):
+        return f'<str:{len(value)}>'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f'<bytes:{len(value)}>'
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    return f'<{type(value).__name__}>'
+
+
+def project_stack(limit=8):
+    """The innermost frames of the current stack that are in this project, outside perf/"""
+    base = str(settings.BASE_DIR) + os.sep
+    perf_dir = os.path.dirname(os.path.abspath(__file__)) + os.sep
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base) and not frame.filename.startswith(perf_dir)
+        and 'site-packages' not in frame.filename and f'{os.sep}.venv{os.sep}' not in frame.filename
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, base)}:{frame.lineno} in {frame.name}'
+        for frame in frames[-limit:]
+    ]
+
+
+def explain(connection, sql, params):
+    """The database's plan for a SELECT, one line per row, or None for other statements"""
+    statement = sql.lstrip()[:6].upper()
+    if not statement.startswith(('SELECT', 'WITH')):
+        return None
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+        return [' | '.join(str(column) for column in row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """Execute wrapper that writes out queries slower than PERF_SLOW_QUERY_MS"""
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        failed = None
+        try:
+            return execute(sql, params, many, context)
+        except Exception as exc:
+            failed = exc
+            raise
+        finally:
+            elapsed_ms = (perf_counter() - started) * 1000
+            threshold = settings.PERF_SLOW_QUERY_MS
+            if threshold and elapsed_ms >= threshold:
+                self.record(context['connection'], sql, params, many, elapsed_ms, failed)
+
+    @staticmethod
+    def _sample_params(params, many):
+        """The parameters, or the first rows of an executemany() that was given a list"""
+        if not many:
+            return params
+        return list(params[:20]) if isinstance(params, (list, tuple)) else None
+
+    def record(self, connection, sql, params, many, elapsed_ms, failed):
+        request = current_request.get()
+        record = {
+            'ts': timezone.now().isoformat(),
+            'duration_ms': round(elapsed_ms, 3),
+            'db': connection.alias,
+            'fingerprint': fingerprint(sql),
+            'sql': sql,
+            'params': redact(self._sample_params(params, many)),
+            'many': many,
+            'view': view_name(request) if request is not None else None,
+            'method': request.method if request is not None else None,
+            'path': request.path if request is not None else None,
+            'stack': project_stack(),
+        }
+        if failed is not None:
+            record['error'] = repr(failed)
+        elif not many:
+            try:
+                record['explain'] = explain(connection, sql, params)
+            except DatabaseError as exc:
+                record['explain_error'] = str(exc)
+        get_writer().write(record)
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None or _writer.path != str(settings.PERF_SLOW_QUERY_LOG):
+        if _writer is not None:
+            _writer.flush()
+        _writer = JsonlWriter(
+            settings.PERF_SLOW_QUERY_LOG,
+            max_bytes=settings.PERF_SLOW_QUERY_LOG_MAX_BYTES,
+            backup_count=settings.PERF_SLOW_QUERY_LOG_BACKUPS,
+        )
+    return _writer
+
+
+def _flush_at_exit():
+    if _writer is not None:
+        _writer.flush()
+
+
+atexit.register(_flush_at_exit)
+
+
+def _add_wrapper(sender, connection, **kwargs):
+    # First in the list, because a connection opened during a request gets here while the request's
+    # own execute_wrapper() contexts are entered, and those leave by popping the last wrapper
+    if not any(isinstance(wrapper, SlowQueryLog) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, SlowQueryLog())
+
+
+def install():
+    """Log slow queries on every connection, including ones already open"""
+    connection_created.connect(_add_wrapper, dispatch_uid='perf.slow_queries')
+    for connection in connections.all(initialized_only=True):
+        _add_wrapper(None, connection)
+
+
+def read_records(since=None, until=None, path=None):
+    """Records from the log and its backups, oldest file first, between two aware datetimes"""
+    writer = get_writer()
+    writer.flush()
+    files = JsonlWriter(path, backup_count=writer.backup_count).files() if path else writer.files()
+    for name in reversed(files):
+        if not os.path.exists(name):
+            continue
+        with open(name) as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads(line)
+                    ts = datetime.fromisoformat(record['ts'])
+                except (ValueError, KeyError):
+                    continue
+                if (since is None or ts >= since) and (until is None or ts <= until):
+                    yield record
+
+
+def summarize(records):
+    """Group records by fingerprint; returns one dict per query shape, most total time first"""
+    groups = {}
+    for record in records:
+        group = groups.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'], 'shape': normalize(record['sql']), 'durations': [],
+            'views': {}, 'last_seen': record['ts'], 'sample': record,
+        })
+        group['durations'].append(record['duration_ms'])
+        view = record.get('view') or '-'
+        group['views'][view] = group['views'].get(view, 0) + 1
+        group['last_seen'] = max(group['last_seen'], record['ts'])
+        if record['duration_ms'] >= group['sample']['duration_ms']:
+            group['sample'] = record
+
+    summary = []
+    for group in groups.values():
+        durations = sorted(group.pop('durations'))
+        group.update(
+            count=len(durations),
+            total_ms=round(sum(durations), 3),
+            mean_ms=round(sum(durations) / len(durations), 3),
+            p95_ms=durations[min(len(durations) - 1, round(0.95 * (len(durations) - 1)))],
+            max_ms=durations[-1],
+        )
+        summary.append(group)
+    return sorted(summary, key=lambda group: group['total_ms'], reverse=True)
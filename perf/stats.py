@@ -0,0 +1,95 @@
+"""
+perf/stats.py
+Per-view request statistics kept in process memory.
+
+Each view gets a fixed-bucket latency histogram plus running totals of DB
+time, query count, render time and response bytes. Recording is a handful
+of additions under a lock, so it is cheap enough for every sampled
+request. The numbers belong to the current worker process only and start
+again from zero when it restarts.
+"""
+import threading
+
+
+# Upper bounds, in milliseconds, of the latency histogram buckets; the last bucket is unbounded
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class ViewStats:
+    __slots__ = ('count', 'errors', 'total_ms', 'max_ms', 'db_ms', 'queries', 'render_ms', 'bytes', 'buckets')
+
+    def __init__(self):
+        self.count = self.errors = self.queries = self.bytes = 0
+        self.total_ms = self.max_ms = self.db_ms = self.render_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, status, total_ms, db_ms, queries, render_ms, size):
+        self.count += 1
+        self.errors += status >= 500
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        self.db_ms += db_ms
+        self.queries += queries
+        self.render_ms += render_ms
+        self.bytes += size or 0
+        for i, bound in enumerate(BUCKETS_MS):
+            if total_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given share of requests (the max for the last bucket)"""
+        wanted = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'p50_ms': round(self.percentile(0.5), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'p99_ms': round(self.percentile(0.99), 3),
+            'max_ms': round(self.max_ms, 3),
+            'mean_ms': round(self.total_ms / count, 3),
+            'mean_db_ms': round(self.db_ms / count, 3),
+            'mean_queries': round(self.queries / count, 2),
+            'mean_render_ms': round(self.render_ms / count, 3),
+            'mean_bytes': round(self.bytes / count),
+            'buckets': {
+                **{str(bound): hits for bound, hits in zip(BUCKETS_MS, self.buckets)},
+                '+Inf': self.buckets[-1],
+            },
+        }
+
+
+class RequestStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view, status, total_ms, db_ms, queries, render_ms, size):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = ViewStats()
+            stats.add(status, total_ms, db_ms, queries, render_ms, size)
+
+    def snapshot(self):
+        """``{view: stats}`` for every view recorded so far, as plain dicts"""
+        with self._lock:
+            return {view: stats.as_dict() for view, stats in sorted(self._views.items())}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+request_stats = RequestStats()
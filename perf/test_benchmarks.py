@@ -0,0 +1,62 @@
+"""
+Test the endpoint benchmark suite on small seeded datasets
+"""
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from quizzes.models import QuizAttempt
+from quizzes.seeding import seed_load
+from perf import benchmarks
+from perf.benchmarks import BENCHMARKS, run_suite, uncovered_routes, violations
+
+
+SIZES = {'teachers': 2, 'parents': 5, 'students': 8, 'quizzes': 3, 'questions': 4}
+
+
+class BenchmarkSuiteTest(TestCase):
+    def test_every_route_is_covered(self):
+        self.assertEqual(uncovered_routes(), [])
+
+    def test_suite_passes_and_query_counts_do_not_grow(self):
+        seed_load(seed=1, **SIZES)
+        small = run_suite(repeat=1)
+
+        self.assertEqual(set(small), {benchmark.label for benchmark in BENCHMARKS})
+        self.assertEqual(violations(small), [])
+        attempts = QuizAttempt.objects.count()
+
+        # A second, larger dataset gives the same teacher more of everything
+        seed_load(seed=2, prefix='more', teachers=1, parents=20, students=40, quizzes=6, questions=8)
+        self.assertGreater(QuizAttempt.objects.count(), 3 * attempts)
+        larger = run_suite(repeat=1)
+
+        self.assertEqual(violations(larger), [])
+        for label, result in small.items():
+            self.assertLessEqual(result['queries'], result['query_budget'], label)
+            self.assertGreater(result['p95_ms'], 0, label)
+
+    def test_budget_violation_is_reported(self):
+        seed_load(seed=1, **SIZES)
+        tight = [
+            benchmarks.Benchmark('me', 'GET', 'teacher', lambda f: '/api/auth/me/', 0),
+        ]
+
+        results = run_suite(repeat=1, benchmarks=tight)
+
+        self.assertEqual(violations(results), ['GET me: 1 queries, budget 0'])
+
+    def test_command_writes_report_and_fails_on_violations(self):
+        seed_load(seed=1, **SIZES)
+        out = StringIO()
+        call_command('benchmark_endpoints', '--current-db', '--repeat', '1', stdout=out, stderr=StringIO())
+        self.assertIn('"violations": []', out.getvalue())
+
+        with mock.patch.object(benchmarks, 'BENCHMARKS', [
+            benchmarks.Benchmark('me', 'GET', 'teacher', lambda f: '/api/auth/me/', 0, label='GET me (tight)'),
+            *BENCHMARKS,
+        ]):
+            with self.assertRaisesMessage(CommandError, 'GET me (tight): 1 queries, budget 0'):
+                call_command('benchmark_endpoints', '--current-db', '--repeat', '1', stdout=StringIO())
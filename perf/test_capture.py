@@ -0,0 +1,99 @@
+"""
+Test traffic capture and its replay against a live server
+"""
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import LiveServerTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from quizzes.models import Quiz
+from perf.capture import REDACTED, get_writer, sanitize
+
+
+class TrafficCaptureTest(LiveServerTestCase):
+    def setUp(self):
+        capture_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(capture_dir.cleanup)
+        self.log_path = os.path.join(capture_dir.name, 'capture.jsonl')
+        settings_override = override_settings(PERF_CAPTURE_LOG=self.log_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.quiz = Quiz.objects.create(
+            title='Captured', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+
+    def _capture(self):
+        client = APIClient()
+        login = client.post('/api/auth/login/', {'email': 'teacher@test.com', 'password': 'testpass123'}, format='json')
+        self.assertEqual(login.status_code, status.HTTP_200_OK)
+        access = login.data['token']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        for _ in range(3):
+            self.assertEqual(client.get('/api/quizzes/', {'page': '1'}).status_code, status.HTTP_200_OK)
+        client.patch(f'/api/quizzes/{self.quiz.id}/', {'title': 'Renamed'}, format='json')
+        get_writer().flush()
+        with open(self.log_path) as capture_file:
+            return access, [json.loads(line) for line in capture_file]
+
+    def test_requests_are_recorded_without_credentials(self):
+        access, records = self._capture()
+
+        self.assertEqual([record['route'] for record in records], ['login'] + ['quiz-list-create'] * 3 + ['quiz-detail-update'])
+        login = records[0]
+        self.assertEqual((login['role'], login['user_id']), ('anonymous', None))
+        self.assertEqual(login['body']['password'], REDACTED)
+        self.assertFalse(login['replayable'])
+
+        listing = records[1]
+        self.assertEqual((listing['role'], listing['user_id']), ('teacher', self.teacher.id))
+        self.assertEqual(listing['query'], {'page': ['1']})
+        self.assertEqual(listing['status'], status.HTTP_200_OK)
+        self.assertTrue(listing['replayable'])
+        self.assertEqual(records[-1]['body'], {'title': 'Renamed'})
+
+        with open(self.log_path) as capture_file:
+            content = capture_file.read()
+        self.assertNotIn(access, content)
+        self.assertNotIn('testpass123', content)
+
+    def test_nested_sensitive_values_are_redacted(self):
+        self.assertEqual(
+            sanitize({'answers': [{'question_id': 1}], 'user': {'new_password': 'x'}, 'answer_key_version': 2}),
+            ({'answers': [{'question_id': 1}], 'user': {'new_password': REDACTED}, 'answer_key_version': 2}, True)
+        )
+
+    def test_replay_reports_per_route(self):
+        self._capture()
+
+        out = StringIO()
+        call_command(
+            'replay_traffic', '--target', self.live_server_url, '--speed', '50', '--concurrency', '2',
+            '--json', stdout=out
+        )
+        summary = json.loads(out.getvalue())
+
+        self.assertEqual(summary['skipped'], 1)
+        self.assertEqual(summary['total']['requests'], 4)
+        self.assertEqual(summary['total']['errors'], 0)
+        listing, = [row for row in summary['routes'] if row['route'] == 'quiz-list-create']
+        self.assertEqual(listing['requests'], 3)
+        self.assertEqual(listing['status_changed'], 0)
+        self.assertLessEqual(listing['p50_ms'], listing['p99_ms'])
+
+        out = StringIO()
+        call_command(
+            'replay_traffic', '--target', self.live_server_url, '--speed', '50', '--route', 'quiz-detail-update', stdout=out
+        )
+        self.assertIn('Replayed 1 requests', out.getvalue())
@@ -0,0 +1,146 @@
+"""
+Test the tracemalloc snapshots, their report and the worker memory ceiling
+"""
+import importlib.util
+import json
+import os
+import tempfile
+import tracemalloc
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from perf import memory
+
+
+def _load_gunicorn_conf():
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _leak(into):
+    into.extend(bytearray(1024) for _ in range(500))  # the allocation site the reports should find
+
+
+class MemoryDiagnosticsTest(TestCase):
+    def setUp(self):
+        memory_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(memory_dir.cleanup)
+        self.directory = memory_dir.name
+        settings_override = override_settings(PERF_MEMORY_DIR=self.directory, PERF_MEMORY_KEEP=3)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # As in a worker that traces from boot
+        if memory.start_tracing():
+            self.addCleanup(tracemalloc.stop)
+        self.leaked = []
+
+    def test_snapshots_are_pruned_to_baseline_and_newest(self):
+        tracker = memory.get_tracker()
+        for _ in range(5):
+            tracker.snapshot()
+
+        self.assertEqual([entry['sequence'] for entry in tracker.entries()], [0, 3, 4])
+        self.assertEqual(memory.worker_pids(), [os.getpid()])
+
+    def test_report_command_finds_growing_site(self):
+        tracker = memory.get_tracker()
+        tracker.snapshot('before')
+        _leak(self.leaked)
+        tracker.snapshot('after')
+
+        out = StringIO()
+        call_command('memory_report', '--json', '--limit', '3', stdout=out)
+        report, = json.loads(out.getvalue())
+
+        self.assertEqual(report['pid'], os.getpid())
+        self.assertEqual((report['from']['label'], report['to']['label']), ('before', 'after'))
+        top = report['sites'][0]
+        self.assertTrue(top['site'].startswith('perf/test_memory.py:'))
+        self.assertGreaterEqual(top['count_diff'], 500)
+        self.assertGreater(top['size_diff_kb'], 500)
+
+        out = StringIO()
+        call_command('memory_report', '--from', '1', stdout=out)
+        self.assertIn('largest allocation sites', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('memory_report', '--from', '7', stdout=StringIO())
+
+    def test_endpoint_is_staff_only_and_diffs_against_previous(self):
+        staff = User.objects.create_user(
+            username='staff@test.com', email='staff@test.com', password='testpass123', is_staff=True
+        )
+        teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+        self.assertEqual(client.post('/api/perf/memory/').status_code, status.HTTP_403_FORBIDDEN)
+
+        client.force_authenticate(user=staff)
+        first = client.post('/api/perf/memory/')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(first.data['tracing'])
+        self.assertIsNone(first.data['growth'])
+
+        _leak(self.leaked)
+        second = client.post('/api/perf/memory/', QUERY_STRING='group_by=traceback')
+        self.assertEqual(second.data['growth']['from'], 0)
+        self.assertTrue(any(site['site'].startswith('perf/test_memory.py:') for site in second.data['growth']['sites']))
+
+        self.assertEqual(client.get('/api/perf/memory/?group_by=module').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_snapshot_without_tracing_is_refused(self):
+        tracemalloc.stop()
+        staff = User.objects.create_user(
+            username='staff@test.com', email='staff@test.com', password='testpass123', is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=staff)
+
+        response = client.post('/api/perf/memory/')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertIn('PERF_MEMORY_TRACE', response.data['error'])
+        self.assertEqual(memory.get_tracker().entries(), [])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_worker_traces_from_boot_with_perf_memory_trace(self):
+        tracemalloc.stop()
+        conf = _load_gunicorn_conf()
+
+        with override_settings(PERF_MEMORY_TRACE=True, PERF_MEMORY_SNAPSHOT_INTERVAL=0):
+            conf.post_worker_init(SimpleNamespace(pid=os.getpid()))
+        self.addCleanup(tracemalloc.stop)
+        self.assertTrue(tracemalloc.is_tracing())
+
+        _leak(self.leaked)
+        tracker = memory.get_tracker()
+        tracker.snapshot()
+        start, now = tracker.entries()
+        self.assertEqual(start['label'], 'start')
+        growth = memory.compare(memory.load(tracker.pid, start), memory.load(tracker.pid, now))
+        self.assertTrue(growth[0]['site'].startswith('perf/test_memory.py:'))
+        self.assertGreater(growth[0]['size_diff_kb'], 500)
+
+    def test_worker_over_ceiling_is_recycled(self):
+        conf = _load_gunicorn_conf()
+        worker = SimpleNamespace(alive=True, pid=os.getpid(), log=mock.Mock())
+
+        with override_settings(PERF_WORKER_MAX_RSS_MB=0):
+            conf.post_request(worker, None, {}, None)
+        self.assertTrue(worker.alive)
+
+        with override_settings(PERF_WORKER_MAX_RSS_MB=1):
+            conf.post_request(worker, None, {}, None)
+        self.assertFalse(worker.alive)
+        worker.log.warning.assert_called_once()
@@ -0,0 +1,121 @@
+"""
+Test the shared request metrics and the Prometheus /metrics endpoint
+"""
+import multiprocessing
+import os
+import tempfile
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from quizzes.models import Quiz
+from perf.metrics import Metrics, MmapValues, collect, mark_process_dead, render
+
+
+def _run_worker(directory):
+    metrics = Metrics(directory)
+    metrics.request_finished('quiz-list-create', 'GET', 200, 0.25, 3, in_flight=False)
+    metrics.request_started('quiz-list-create')
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(metrics_dir.cleanup)
+        self.directory = metrics_dir.name
+        settings_override = override_settings(PERF_METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_values_file_grows_and_reopens(self):
+        path = os.path.join(self.directory, 'values.db')
+        values = MmapValues(path, initial_size=64)
+        for n in range(100):
+            values.add(f'key-{n}', n)
+        values.add('key-7', 0.5)
+        values.close()
+
+        reopened = dict(MmapValues(path).items())
+        self.assertEqual(len(reopened), 100)
+        self.assertEqual(reopened['key-99'], 99)
+        self.assertEqual(reopened['key-7'], 7.5)
+
+    def test_metrics_endpoint_reports_requests(self):
+        teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        staff = User.objects.create_user(
+            username='staff@test.com', email='staff@test.com', password='testpass123', is_staff=True
+        )
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+        for _ in range(2):
+            self.assertEqual(client.get('/api/quizzes/').status_code, status.HTTP_200_OK)
+        self.assertEqual(client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+
+        client.force_authenticate(user=staff)
+        response = client.get('/metrics')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE mathinsight_http_request_duration_seconds histogram', text)
+        self.assertIn('mathinsight_http_requests_total{method="GET",route="quiz-list-create",status="200"} 2', text)
+        self.assertIn(
+            'mathinsight_http_request_duration_seconds_bucket{method="GET",route="quiz-list-create",le="+Inf"} 2', text
+        )
+        self.assertIn('mathinsight_http_request_queries_count{route="quiz-list-create"} 2', text)
+        self.assertIn('mathinsight_http_requests_total{method="GET",route="metrics",status="403"} 1', text)
+        # Only the scrape itself is still in flight
+        self.assertIn('mathinsight_http_requests_in_flight{route="metrics"} 1', text)
+        self.assertIn('mathinsight_http_requests_in_flight{route="quiz-list-create"} 0', text)
+
+    def test_streamed_response_is_recorded_when_the_stream_ends(self):
+        teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        quiz = Quiz.objects.create(
+            title='Export', description='Test quiz', teacher=teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        client = APIClient()
+        client.force_authenticate(user=teacher)
+
+        response = client.get(f'/api/quizzes/{quiz.id}/questions/export/')
+        self.assertNotIn('mathinsight_http_requests_total{method="GET",route="question-export"', render(collect()))
+        b''.join(response.streaming_content)
+        response.close()
+
+        text = render(collect())
+        self.assertIn('mathinsight_http_requests_total{method="GET",route="question-export",status="200"} 1', text)
+        # The quiz lookup, and the questions read while the body is sent
+        self.assertIn('mathinsight_http_request_queries_sum{route="question-export"} 2', text)
+        self.assertIn('mathinsight_http_requests_in_flight{route="question-export"} 0', text)
+        self.assertFalse([wrapper for wrapper in connection.execute_wrappers if type(wrapper).__module__ == 'perf.metrics'])
+
+    def test_workers_are_added_up_and_archived_when_they_exit(self):
+        workers = [multiprocessing.get_context('fork').Process(target=_run_worker, args=(self.directory,))
+                   for _ in range(2)]
+        for worker in workers:
+            worker.start()
+            worker.join()
+        Metrics(self.directory).request_finished('quiz-list-create', 'GET', 500, 0.5, 12, in_flight=False)
+
+        text = render(collect())
+        self.assertIn('mathinsight_http_requests_total{method="GET",route="quiz-list-create",status="200"} 2', text)
+        self.assertIn('mathinsight_http_request_errors_total{method="GET",route="quiz-list-create"} 1', text)
+        self.assertIn('mathinsight_http_request_queries_sum{route="quiz-list-create"} 18', text)
+        self.assertIn('mathinsight_http_request_queries_bucket{route="quiz-list-create",le="5"} 2', text)
+        # The exited workers' in-flight requests are not counted
+        self.assertNotIn('mathinsight_http_requests_in_flight{', text)
+        # and the scrape folded their files into the archive
+        self.assertEqual(sorted(os.listdir(self.directory)), ['archive.db', 'archive.lock', f'worker_{os.getpid()}.db'])
+
+        for worker in workers:
+            mark_process_dead(worker.pid)
+
+        self.assertEqual(render(collect()), text)
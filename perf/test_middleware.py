@@ -0,0 +1,101 @@
+"""
+Test the per-request timing middleware and the staff stats endpoint
+"""
+import json
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from quizzes.models import Quiz, Question
+from perf.stats import request_stats
+
+
+class RequestTimingTest(TestCase):
+    def setUp(self):
+        request_stats.reset()
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.staff = User.objects.create_user(
+            username='staff@test.com', email='staff@test.com', password='testpass123', is_staff=True
+        )
+        self.quiz = Quiz.objects.create(
+            title='Timed', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        for i in range(3):
+            Question.objects.create(
+                quiz=self.quiz, question_text=f'Question {i}', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option='B', marks=1
+            )
+
+    def _timings(self, response):
+        """Server-Timing entries as ``{name: (duration, description)}``"""
+        timings = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            params = dict(param.split('=', 1) for param in params)
+            timings[name] = (float(params['dur']), params.get('desc', '').strip('"'))
+        return timings
+
+    def test_server_timing_header_and_log_line(self):
+        self.client.force_authenticate(user=self.teacher)
+
+        with self.assertLogs('perf.requests', 'DEBUG') as logs:
+            response = self.client.get(f'/api/quizzes/{self.quiz.id}/questions/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = self._timings(response)
+        self.assertEqual(set(timings), {'app', 'db', 'render', 'total'})
+        self.assertGreater(timings['render'][0] + timings['total'][0], 0)
+        self.assertLessEqual(timings['db'][0], timings['total'][0])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'question-list-create')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['bytes'], len(response.content))
+        self.assertEqual(timings['db'][1], f"{record['queries']} queries")
+        self.assertGreater(record['queries'], 0)
+
+    def test_streamed_response_is_recorded_when_sent(self):
+        self.client.force_authenticate(user=self.teacher)
+
+        with self.assertLogs('perf.requests', 'DEBUG') as logs:
+            response = self.client.get(f'/api/quizzes/{self.quiz.id}/questions/export/')
+            self.assertEqual(logs.records, [])
+            body = b''.join(response.streaming_content)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['bytes'], len(body))
+        self.assertGreater(record['queries'], 0)
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_timed(self):
+        self.client.force_authenticate(user=self.teacher)
+
+        response = self.client.get('/api/quizzes/')
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(request_stats.snapshot(), {})
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.force_authenticate(user=self.teacher)
+        for _ in range(3):
+            self.client.get('/api/quizzes/')
+        self.assertEqual(self.client.get('/api/perf/requests/').status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get('/api/perf/requests/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        quiz_list = response.data['views']['quiz-list-create']
+        self.assertEqual(quiz_list['count'], 3)
+        self.assertEqual(sum(quiz_list['buckets'].values()), 3)
+        self.assertLessEqual(quiz_list['p50_ms'], quiz_list['max_ms'])
+
+        self.assertEqual(self.client.delete('/api/perf/requests/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertNotIn('quiz-list-create', self.client.get('/api/perf/requests/').data['views'])
@@ -0,0 +1,77 @@
+"""
+Test the on-demand request profiler
+"""
+import json
+import os
+import pstats
+import tempfile
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+from quizzes.models import Quiz
+
+
+class ProfilerTest(TestCase):
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        self.directory = profile_dir.name
+        settings_override = override_settings(PERF_PROFILE_DIR=self.directory, PERF_PROFILE_TOP=10)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.staff_teacher = User.objects.create_user(
+            username='staff@test.com', email='staff@test.com', password='testpass123', role='teacher',
+            is_staff=True
+        )
+        for teacher in (self.teacher, self.staff_teacher):
+            Quiz.objects.create(
+                title='Profiled', description='Test quiz', teacher=teacher,
+                time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+            )
+
+    def _client(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_staff_request_is_profiled(self):
+        response = self._client(self.staff_teacher).get('/api/quizzes/', {'_profile': '1'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = response.json()
+        self.assertEqual(summary['view'], 'quiz-list-create')
+        self.assertEqual(summary['status'], status.HTTP_200_OK)
+        self.assertEqual(len(summary['top']), 10)
+        cumulative = [function['cumtime_ms'] for function in summary['top']]
+        self.assertEqual(cumulative, sorted(cumulative, reverse=True))
+
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted(os.path.basename(summary[key]) for key in ('pstats', 'sql'))
+        )
+        self.assertTrue(pstats.Stats(summary['pstats']).total_calls)
+        with open(summary['sql']) as sql_file:
+            queries = json.load(sql_file)
+        self.assertEqual(len(queries), summary['queries'])
+        self.assertTrue(any('"quizzes_quiz"' in query['sql'] for query in queries))
+
+    def test_header_triggers_profile(self):
+        response = self._client(self.staff_teacher).get('/api/quizzes/', HTTP_X_PROFILE='1')
+
+        self.assertIn('top', response.json())
+
+    def test_trigger_is_ignored_for_other_users(self):
+        for client in (self._client(self.teacher), APIClient()):
+            response = client.get('/api/quizzes/', {'_profile': '1'}, HTTP_X_PROFILE='1')
+            self.assertNotIn('top', response.json())
+
+        self.assertEqual(os.listdir(self.directory), [])
@@ -0,0 +1,146 @@
+"""
+Test the slow-query log, its writer and the summary command
+"""
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from quizzes.models import Quiz
+from perf.slow_queries import JsonlWriter, SlowQueryLog, fingerprint, get_writer, normalize, redact
+
+
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.log_dir.cleanup)
+        self.log_path = os.path.join(self.log_dir.name, 'slow.jsonl')
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        Quiz.objects.create(
+            title='Slow', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+
+    def _records(self):
+        get_writer().flush()
+        with open(self.log_path) as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def test_slow_queries_are_logged_with_view_and_plan(self):
+        client = APIClient()
+        client.force_authenticate(user=self.teacher)
+
+        with override_settings(PERF_SLOW_QUERY_MS=1e-6, PERF_SLOW_QUERY_LOG=self.log_path):
+            response = client.get('/api/quizzes/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            records = [record for record in self._records() if record['view'] == 'quiz-list-create']
+
+        self.assertTrue(records)
+        select = records[-1]
+        self.assertEqual(select['path'], '/api/quizzes/')
+        self.assertTrue(select['sql'].startswith('SELECT'))
+        self.assertTrue(select['explain'])
+        self.assertEqual(select['fingerprint'], fingerprint(select['sql']))
+        # Only project frames are kept; DRF evaluates the list view's queryset, so the caller here is the test
+        self.assertTrue(select['stack'])
+        self.assertTrue(all(frame.startswith(('perf/test_', 'manage.py')) for frame in select['stack']))
+
+    def test_fast_queries_are_not_logged(self):
+        with override_settings(PERF_SLOW_QUERY_MS=60000, PERF_SLOW_QUERY_LOG=self.log_path):
+            list(Quiz.objects.all())
+            get_writer().flush()
+
+        self.assertFalse(os.path.exists(self.log_path))
+
+    def test_params_are_redacted(self):
+        self.assertEqual(
+            redact(['teacher@test.com', 42, None, True, b'\x01\x02']),
+            ['<str:16>', 42, None, True, '<bytes:2>']
+        )
+
+    def test_fingerprint_ignores_literals_and_list_lengths(self):
+        self.assertEqual(
+            normalize('SELECT * FROM "t" WHERE "id" IN (1, 2, 3) AND "name" = \'x\' LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" IN (...) AND "name" = ? LIMIT ?'
+        )
+        self.assertEqual(
+            fingerprint('SELECT "a" FROM "t" WHERE "id" IN (%s, %s)'),
+            fingerprint('SELECT "a" FROM "t"  WHERE "id" IN (%s)')
+        )
+        self.assertNotEqual(fingerprint('SELECT "a" FROM "t"'), fingerprint('SELECT "b" FROM "t"'))
+
+    def test_writer_buffers_and_rotates(self):
+        writer = JsonlWriter(self.log_path, max_bytes=400, backup_count=2, buffer_size=3)
+        for n in range(2):
+            writer.write({'n': n, 'padding': 'x' * 50})
+        self.assertFalse(os.path.exists(self.log_path))
+
+        for n in range(2, 30):
+            writer.write({'n': n, 'padding': 'x' * 50})
+        writer.flush()
+
+        self.assertTrue(os.path.exists(self.log_path + '.2'))
+        self.assertFalse(os.path.exists(self.log_path + '.3'))
+        with open(self.log_path) as log_file:
+            self.assertEqual(json.loads(log_file.readlines()[-1])['n'], 29)
+
+    def test_summary_command_groups_by_fingerprint_in_window(self):
+        now = timezone.now()
+        writer = JsonlWriter(self.log_path)
+        records = [
+            ('SELECT * FROM "quizzes_quiz" WHERE "id" IN (1, 2)', 300, now - timedelta(minutes=5)),
+            ('SELECT * FROM "quizzes_quiz" WHERE "id" IN (3)', 500, now - timedelta(minutes=10)),
+            ('SELECT COUNT(*) FROM "quizzes_question"', 250, now - timedelta(minutes=20)),
+            ('SELECT COUNT(*) FROM "quizzes_question"', 900, now - timedelta(days=3)),
+        ]
+        for sql, duration, ts in records:
+            writer.write({
+                'ts': ts.isoformat(), 'sql': sql, 'fingerprint': fingerprint(sql),
+                'duration_ms': duration, 'view': 'quiz-list-create',
+            })
+        writer.flush()
+
+        out = StringIO()
+        call_command('slow_queries', '--file', self.log_path, '--since', '1h', '--json', stdout=out)
+        summary = json.loads(out.getvalue())
+
+        self.assertEqual([group['count'] for group in summary], [2, 1])
+        self.assertEqual(summary[0]['total_ms'], 800)
+        self.assertEqual(summary[0]['max_ms'], 500)
+        self.assertEqual(summary[1]['max_ms'], 250)
+
+        out = StringIO()
+        call_command('slow_queries', '--file', self.log_path, '--since', '7d', stdout=out)
+        self.assertIn('1150ms', out.getvalue())
+
+
+class WrapperStackTest(TransactionTestCase):
+    def test_connection_opened_during_requests_keeps_its_wrappers(self):
+        # A fresh thread opens its connection inside the middlewares' execute_wrapper() contexts
+        seen = []
+
+        def requests():
+            client = APIClient()
+            try:
+                for _ in range(2):
+                    client.post('/api/auth/login/', {'email': 'nobody@test.com', 'password': 'x'}, format='json')
+                    seen.append([type(wrapper) for wrapper in connection.execute_wrappers])
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=requests)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(seen, [[SlowQueryLog], [SlowQueryLog]])
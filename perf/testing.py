@@ -0,0 +1,40 @@
+"""
+perf/testing.py
+Test runner that keeps test traffic out of the perf output of real servers.
+
+Every request made by the test suite goes through the perf middleware. The
+runner points the metrics directory, slow query log, profile and memory
+directories at a temporary directory for the run, so worker files and logs
+written by tests never end up in the shared defaults that a dev or
+production server on the same machine scrapes or reads. Per-request timing
+lines are kept out of the test output even when PERF_LOG_LEVEL=DEBUG.
+"""
+import logging
+import os
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class PerfIsolatedRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._perf_dir = tempfile.TemporaryDirectory(prefix='mathinsight-tests-')
+        self._perf_settings = override_settings(
+            PERF_METRICS_DIR=os.path.join(self._perf_dir.name, 'metrics'),
+            PERF_SLOW_QUERY_LOG=os.path.join(self._perf_dir.name, 'slow_queries.jsonl'),
+            PERF_PROFILE_DIR=os.path.join(self._perf_dir.name, 'profiles'),
+            PERF_MEMORY_DIR=os.path.join(self._perf_dir.name, 'memory'),
+        )
+        self._perf_settings.enable()
+        # Tests that check the timing lines capture them with assertLogs
+        self._perf_logger = logging.getLogger('perf.requests')
+        self._perf_log_level = self._perf_logger.level
+        self._perf_logger.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        self._perf_logger.setLevel(self._perf_log_level)
+        self._perf_settings.disable()
+        self._perf_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Staff-only performance data of the worker that serves the request
+    path('perf/requests/', views.request_stats_view, name='perf-request-stats'),
+    path('perf/memory/', views.memory_view, name='perf-memory'),
+]
@@ -0,0 +1,89 @@
+import os
+import tracemalloc
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import memory, metrics
+from .stats import request_stats
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def request_stats_view(request):
+    """
+    GET /api/perf/requests/ - Staff get this worker's per-view latency histograms
+    DELETE /api/perf/requests/ - Staff clear them
+    """
+    if request.method == 'DELETE':
+        request_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    return Response({
+        'pid': os.getpid(),
+        'sample_rate': settings.PERF_SAMPLE_RATE,
+        'views': request_stats.snapshot(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """
+    GET /metrics - Staff scrape request metrics of all workers in Prometheus text format
+    """
+    return HttpResponse(
+        metrics.render(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAdminUser])
+def memory_view(request):
+    """
+    GET /api/perf/memory/ - Staff see this worker's snapshots and what grew since its baseline
+    POST /api/perf/memory/ - Staff take a snapshot now and see what grew since the previous one
+    Optional query params: limit (default 15), group_by (lineno, filename or traceback)
+    """
+    group_by = request.query_params.get('group_by', 'lineno')
+    if group_by not in memory.GROUP_BY:
+        return Response(
+            {'error': f"group_by must be one of: {', '.join(memory.GROUP_BY)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = int(request.query_params.get('limit', 15))
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    tracker = memory.get_tracker()
+    if request.method == 'POST':
+        try:
+            tracker.snapshot()
+        except memory.NotTracing as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    entries = tracker.entries()
+    growth = None
+    if len(entries) > 1:
+        older = entries[-2] if request.method == 'POST' else entries[0]
+        growth = {
+            'from': older['sequence'],
+            'to': entries[-1]['sequence'],
+            'rss_diff_bytes': entries[-1]['rss_bytes'] - older['rss_bytes'],
+            'sites': memory.compare(
+                memory.load(tracker.pid, older), memory.load(tracker.pid, entries[-1]), limit, group_by
+            ),
+        }
+
+    return Response({
+        'pid': tracker.pid,
+        'rss_bytes': memory.rss_bytes(),
+        'tracing': tracemalloc.is_tracing(),
+        'ceiling_mb': settings.PERF_WORKER_MAX_RSS_MB,
+        'snapshots': entries,
+        'growth': growth,
+    }, status=status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK)
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Quiz, Question, QuizAttempt, QuizAnswer
+from django.utils.html import format_html, format_html_join
+from .models import Quiz, Question, QuizAttempt, QuizAnswer, StudentScoreSummary
+from .answer_sheets import attempt_answers
+from .regrading import regrade_quizzes
+from .rollups import schedule_rollup_repair
 
 
 class QuestionInline(admin.TabularInline):
@@ -8,12 +12,6 @@ class QuestionInline(admin.TabularInline):
     fields = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_option', 'marks']
 
 
-class QuizAnswerInline(admin.TabularInline):
-    model = QuizAnswer
-    extra = 0
-    readonly_fields = ['question', 'selected_option', 'is_correct']
-
-
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
     list_display = ['title', 'teacher', 'is_active', 'deadline', 'total_questions', 'total_marks', 'created_at']
@@ -21,6 +19,7 @@ class QuizAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description', 'teacher__username', 'teacher__email']
     readonly_fields = ['created_at', 'total_questions', 'total_marks']
     inlines = [QuestionInline]
+    actions = ['regrade']
 
     fieldsets = (
         (None, {
@@ -41,6 +40,13 @@ class QuizAdmin(admin.ModelAdmin):
             return qs
         return qs.filter(teacher=request.user)
 
+    @admin.action(description="Regrade submitted attempts")
+    def regrade(self, request, queryset):
+        result = regrade_quizzes(queryset.values_list('pk', flat=True))
+        self.message_user(
+            request, f"Regraded {result['quizzes']} quizzes; {result['attempts']} attempts changed."
+        )
+
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
@@ -64,8 +70,7 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     list_display = ['student', 'quiz', 'score', 'total_marks', 'percentage', 'is_completed', 'attempted_at']
     list_filter = ['is_completed', 'attempted_at', 'quiz']
     search_fields = ['student__name', 'quiz__title', 'parent__username']
-    readonly_fields = ['percentage', 'attempted_at', 'completed_at']
-    inlines = [QuizAnswerInline]
+    readonly_fields = ['percentage', 'attempted_at', 'completed_at', 'recorded_answers']
 
     fieldsets = (
         (None, {
@@ -74,6 +79,9 @@ class QuizAttemptAdmin(admin.ModelAdmin):
         ('Results', {
             'fields': ('score', 'total_marks', 'percentage', 'is_completed')
         }),
+        ('Answers', {
+            'fields': ('recorded_answers',)
+        }),
         ('Timestamps', {
             'fields': ('attempted_at', 'completed_at'),
             'classes': ('collapse',)
@@ -86,6 +94,30 @@ class QuizAttemptAdmin(admin.ModelAdmin):
             return qs
         return qs.filter(quiz__teacher=request.user)
 
+    def recorded_answers(self, obj):
+        answers = attempt_answers(obj) if obj.pk else []
+        if not answers:
+            return "No answers recorded"
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            (
+                (answer.question.question_text[:50], answer.selected_option,
+                 answer.question.correct_option, 'Yes' if answer.is_correct else 'No')
+                for answer in answers
+            )
+        )
+        return format_html(
+            '<table><tr><th>Question</th><th>Selected</th><th>Correct option</th><th>Correct</th></tr>{}</table>',
+            rows
+        )
+    recorded_answers.short_description = "Answers"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            # Hand edits bypass the incremental rollups; recompute the ones this attempt feeds
+            schedule_rollup_repair([obj])
+
 
 @admin.register(QuizAnswer)
 class QuizAnswerAdmin(admin.ModelAdmin):
@@ -111,3 +143,19 @@ class QuizAnswerAdmin(admin.ModelAdmin):
         if request.user.is_superuser:
             return qs
         return qs.filter(attempt__quiz__teacher=request.user)
+
+
+@admin.register(StudentScoreSummary)
+class StudentScoreSummaryAdmin(admin.ModelAdmin):
+    list_display = ['student', 'total_attempts', 'completed_attempts', 'average_percentage', 'last_attempted_at', 'updated_at']
+    search_fields = ['student__name']
+    readonly_fields = [field.name for field in StudentScoreSummary._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).select_related('student')
+        if request.user.is_superuser:
+            return qs
+        return qs.filter(student__teacher=request.user)
@@ -0,0 +1,97 @@
+"""
+quizzes/answer_key.py
+Compiled, read-only answer keys cached per worker process.
+
+Each quiz carries an ``answer_key_version`` stamp that is replaced whenever one
+of its questions is saved or deleted, or the quiz itself is edited. A cached
+key is only used while its stamp matches the quiz row being served, so every
+worker drops its stale copy on its next request for that quiz without any
+cross-process messaging. Keys carry each question's text as well, so a
+submission can be graded and rendered without reading its quiz's questions.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+
+from django.conf import settings
+
+from .models import Quiz, Question, new_answer_key_version
+
+
+KeyEntry = namedtuple('KeyEntry', ['correct_option', 'marks', 'question_text'])
+
+
+class AnswerKey:
+    """Correct option, marks and text of every question of one quiz revision"""
+
+    __slots__ = ('quiz_id', 'version', 'entries', 'question_ids', 'total_marks', 'question_count')
+
+    def __init__(self, quiz_id, version, rows):
+        entries = {question_id: KeyEntry(*fields) for question_id, *fields in rows}
+        assign = object.__setattr__
+        assign(self, 'quiz_id', quiz_id)
+        assign(self, 'version', version)
+        assign(self, 'entries', MappingProxyType(entries))
+        assign(self, 'question_ids', tuple(sorted(entries)))
+        assign(self, 'total_marks', sum(entry.marks for entry in entries.values()))
+        assign(self, 'question_count', len(entries))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('AnswerKey is read-only')
+
+    def __contains__(self, question_id):
+        return question_id in self.entries
+
+    def __len__(self):
+        return self.question_count
+
+    def get(self, question_id):
+        return self.entries.get(question_id)
+
+    def is_correct(self, question_id, selected_option):
+        entry = self.entries.get(question_id)
+        return entry is not None and entry.correct_option == selected_option
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _store(answer_key):
+    max_size = getattr(settings, 'QUIZ_ANSWER_KEY_CACHE_SIZE', 256)
+    with _lock:
+        _cache[answer_key.quiz_id] = answer_key
+        _cache.move_to_end(answer_key.quiz_id)
+        while len(_cache) > max_size:
+            _cache.popitem(last=False)
+    return answer_key
+
+
+def answer_key_for(quiz_id, version):
+    """Return the answer key of revision ``version`` of a quiz, loading it with one query on a miss"""
+    with _lock:
+        answer_key = _cache.get(quiz_id)
+        if answer_key is not None and answer_key.version == version:
+            _cache.move_to_end(quiz_id)
+            return answer_key
+
+    rows = Question.objects.filter(quiz_id=quiz_id).values_list('id', 'correct_option', 'marks', 'question_text')
+    return _store(AnswerKey(quiz_id, version, rows))
+
+
+def get_answer_key(quiz):
+    return answer_key_for(quiz.pk, quiz.answer_key_version)
+
+
+def invalidate_answer_key(quiz_id):
+    """Stamp a new answer key version on the quiz and drop this worker's copy"""
+    version = new_answer_key_version()
+    Quiz.objects.filter(pk=quiz_id).update(answer_key_version=version)
+    with _lock:
+        _cache.pop(quiz_id, None)
+    return version
+
+
+def clear_answer_key_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,212 @@
+"""
+quizzes/answer_sheets.py
+Packed per-attempt answer storage.
+
+Each graded attempt stores its answers on its own row: an AnswerLayout
+naming the quiz's questions in order, an answer sheet with one option letter
+(or BLANK) per layout position and a little-endian correctness bitmask.
+Results views decode sheets into unsaved QuizAnswer instances, so reading
+answers costs one row per attempt rather than one per answered question.
+
+QuizAnswer rows are still written unless QUIZ_STORE_ANSWER_ROWS is off; rows
+saved or deleted one at a time (admin, fixtures) are folded into the sheet by
+signals.
+"""
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from .answer_key import get_answer_key
+from .models import AnswerLayout, Question, QuizAttempt, QuizAnswer
+
+
+BLANK = '-'
+# Layout rows are immutable, so their question orders can be kept per worker
+_LAYOUT_CACHE_SIZE = 4096
+_layout_ids = {}
+_layout_questions = {}
+_lock = threading.Lock()
+
+
+def store_answer_rows():
+    return getattr(settings, 'QUIZ_STORE_ANSWER_ROWS', True)
+
+
+def _remember(cache, key, value):
+    # Only once committed: a rolled-back layout's id can be handed out again
+    def remember():
+        with _lock:
+            if len(cache) >= _LAYOUT_CACHE_SIZE:
+                cache.clear()
+            cache[key] = value
+
+    transaction.on_commit(remember)
+
+
+def layout_for(answer_key):
+    """The AnswerLayout id matching the answer key's question order, created on first use"""
+    cache_key = (answer_key.quiz_id, answer_key.version)
+    layout_id = _layout_ids.get(cache_key)
+    if layout_id is None:
+        layout, _ = AnswerLayout.objects.get_or_create(
+            quiz_id=answer_key.quiz_id, question_ids=AnswerLayout.encode_ids(answer_key.question_ids)
+        )
+        layout_id = layout.pk
+        _remember(_layout_ids, cache_key, layout_id)
+        _remember(_layout_questions, layout_id, answer_key.question_ids)
+    return layout_id
+
+
+def layout_questions(layout_ids):
+    """Map layout ids to their question id tuples, querying only the ones not yet cached"""
+    found = {layout_id: _layout_questions[layout_id] for layout_id in layout_ids if layout_id in _layout_questions}
+    missing = set(layout_ids) - set(found)
+    if missing:
+        for layout in AnswerLayout.objects.filter(pk__in=missing):
+            found[layout.pk] = layout.id_list
+            _remember(_layout_questions, layout.pk, layout.id_list)
+    return found
+
+
+def pack(question_ids, answers):
+    """Pack ``{question_id: (selected_option, is_correct)}`` into a sheet and bitmask"""
+    sheet = []
+    mask = 0
+    for position, question_id in enumerate(question_ids):
+        selected_option, is_correct = answers.get(question_id, (BLANK, False))
+        sheet.append(selected_option)
+        if is_correct:
+            mask |= 1 << position
+    return ''.join(sheet), mask.to_bytes((len(question_ids) + 7) // 8, 'little')
+
+
+def unpack(question_ids, sheet, mask):
+    """Inverse of pack(): ``{question_id: (selected_option, is_correct)}`` for answered positions"""
+    bits = int.from_bytes(bytes(mask), 'little')
+    return {
+        question_id: (selected_option, bool(bits >> position & 1))
+        for position, (question_id, selected_option) in enumerate(zip(question_ids, sheet))
+        if selected_option != BLANK
+    }
+
+
+def sheet_counts(attempt):
+    """(answered, correct) from the attempt's own row, without touching QuizAnswer"""
+    answered = len(attempt.answer_sheet) - attempt.answer_sheet.count(BLANK)
+    correct = bin(int.from_bytes(bytes(attempt.correct_mask), 'little')).count('1')
+    return answered, correct
+
+
+def write_sheet(attempt, answer_key, answers):
+    """Set the attempt's packed fields for ``answers``; the caller saves the attempt"""
+    attempt.answer_layout_id = layout_for(answer_key)
+    attempt.answer_sheet, attempt.correct_mask = pack(answer_key.question_ids, answers)
+    attempt._sheet_packed = True
+
+
+def load_answers(attempts, questions=None):
+    """
+    Decode the answers of several attempts at once.
+
+    Returns ``{attempt_id: [QuizAnswer, ...]}`` with unsaved QuizAnswer
+    instances in question order. Questions are fetched in one query unless
+    a ``{question_id: Question}`` mapping is passed in.
+    """
+    attempts = list(attempts)
+    layouts = layout_questions({attempt.answer_layout_id for attempt in attempts if attempt.answer_layout_id})
+    if questions is None:
+        question_ids = set().union(*layouts.values()) if layouts else set()
+        questions = Question.objects.in_bulk(question_ids) if question_ids else {}
+
+    decoded = {}
+    for attempt in attempts:
+        answers = decoded[attempt.pk] = []
+        if not attempt.answer_layout_id:
+            continue
+        unpacked = unpack(layouts[attempt.answer_layout_id], attempt.answer_sheet, attempt.correct_mask)
+        for question_id, (selected_option, is_correct) in unpacked.items():
+            question = questions.get(question_id)
+            if question is None:
+                continue
+            answers.append(QuizAnswer(
+                attempt=attempt, question=question, selected_option=selected_option, is_correct=is_correct
+            ))
+    return decoded
+
+
+def attempt_answers(attempt):
+    return load_answers([attempt])[attempt.pk]
+
+
+def _repack(attempt_id, change):
+    """Apply ``change(answers)`` to one attempt's decoded answers and store the result"""
+    attempt = QuizAttempt.objects.select_related('quiz').only(
+        'quiz', 'answer_layout', 'answer_sheet', 'correct_mask'
+    ).get(pk=attempt_id)
+    answers = {}
+    if attempt.answer_layout_id:
+        question_ids = layout_questions([attempt.answer_layout_id])[attempt.answer_layout_id]
+        answers = unpack(question_ids, attempt.answer_sheet, attempt.correct_mask)
+    change(answers)
+
+    answer_key = get_answer_key(attempt.quiz)
+    write_sheet(attempt, answer_key, answers)
+    QuizAttempt.objects.filter(pk=attempt_id).update(
+        answer_layout_id=attempt.answer_layout_id,
+        answer_sheet=attempt.answer_sheet,
+        correct_mask=attempt.correct_mask,
+    )
+
+
+def record_answer(answer):
+    """Fold a QuizAnswer row saved on its own into its attempt's sheet"""
+    _repack(answer.attempt_id, lambda answers: answers.__setitem__(
+        answer.question_id, (answer.selected_option, answer.is_correct)
+    ))
+
+
+def forget_answers(attempt_id, question_ids):
+    """Blank questions on an attempt's sheet"""
+    def forget(answers):
+        for question_id in question_ids:
+            answers.pop(question_id, None)
+
+    _repack(attempt_id, forget)
+
+
+def drop_questions(quiz_id, question_ids, batch_size=500):
+    """Blank deleted questions on every sheet that still has an answer for one of them"""
+    question_ids = set(question_ids)
+    layouts = {}
+    for layout in AnswerLayout.objects.filter(quiz_id=quiz_id):
+        positions = [position for position, question_id in enumerate(layout.id_list) if question_id in question_ids]
+        if positions:
+            layouts[layout.pk] = positions
+    if not layouts:
+        return
+
+    attempts = QuizAttempt.objects.filter(answer_layout_id__in=list(layouts)).only(
+        'answer_layout', 'answer_sheet', 'correct_mask'
+    ).order_by('pk')
+    changed = []
+    for attempt in attempts.iterator(chunk_size=batch_size):
+        sheet = list(attempt.answer_sheet)
+        positions = [
+            position for position in layouts[attempt.answer_layout_id]
+            if position < len(sheet) and sheet[position] != BLANK
+        ]
+        if not positions:
+            continue
+        mask = int.from_bytes(bytes(attempt.correct_mask), 'little')
+        for position in positions:
+            sheet[position] = BLANK
+            mask &= ~(1 << position)
+        attempt.answer_sheet = ''.join(sheet)
+        attempt.correct_mask = mask.to_bytes(len(attempt.correct_mask), 'little')
+        changed.append(attempt)
+        if len(changed) >= batch_size:
+            QuizAttempt.objects.bulk_update(changed, ['answer_sheet', 'correct_mask'])
+            changed = []
+    if changed:
+        QuizAttempt.objects.bulk_update(changed, ['answer_sheet', 'correct_mask'])
@@ -0,0 +1,69 @@
+"""
+quizzes/grading.py
+Set-based grading of quiz submissions.
+"""
+from .models import Question, QuizAnswer
+from .answer_key import get_answer_key
+from .answer_sheets import store_answer_rows, write_sheet
+
+
+class GradingError(Exception):
+    """Raised when a submission cannot be graded against the quiz's answer key"""
+
+
+def grade_submission(quiz, attempt, answers_data):
+    """
+    Grade a whole submission in memory and persist it in one pass.
+
+    The quiz's cached answer key (loaded with one query if it is stale)
+    validates and scores every answer without reading the questions, and the
+    result is packed onto the attempt's answer sheet (saved with the attempt
+    by the caller). Unless QUIZ_STORE_ANSWER_ROWS is off, QuizAnswer rows are also
+    written with one bulk insert that updates rows which already exist for
+    this attempt. Returns the answers (with their question attached) and the
+    total score.
+    """
+    answer_key = get_answer_key(quiz)
+
+    # Later answers for the same question replace earlier ones
+    selected = {}
+    for answer_data in answers_data:
+        try:
+            question_id = int(answer_data['question_id'])
+        except (TypeError, ValueError):
+            raise GradingError(f"Question {answer_data['question_id']} not found in this quiz.")
+        if question_id not in answer_key:
+            raise GradingError(f'Question {question_id} not found in this quiz.')
+        selected.pop(question_id, None)
+        selected[question_id] = answer_data['selected_option']
+
+    total_score = 0
+    quiz_answers = []
+    for question_id, selected_option in selected.items():
+        entry = answer_key.get(question_id)
+        is_correct = entry.correct_option == selected_option
+        if is_correct:
+            total_score += entry.marks
+        quiz_answers.append(QuizAnswer(
+            attempt=attempt,
+            # Enough of the question to render the result, from the key
+            question=Question(
+                id=question_id, quiz_id=quiz.pk, question_text=entry.question_text,
+                correct_option=entry.correct_option, marks=entry.marks
+            ),
+            selected_option=selected_option,
+            is_correct=is_correct,
+        ))
+
+    write_sheet(attempt, answer_key, {
+        answer.question_id: (answer.selected_option, answer.is_correct) for answer in quiz_answers
+    })
+    if store_answer_rows():
+        QuizAnswer.objects.bulk_create(
+            quiz_answers,
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['selected_option', 'is_correct'],
+        )
+
+    return quiz_answers, total_score
@@ -0,0 +1,137 @@
+"""
+quizzes/item_analysis.py
+Per-question item analysis for a quiz, computed with NumPy.
+
+Difficulty is the share of completed attempts that answered a question
+correctly. The discrimination index is the difference in that share between
+the top and bottom 27% of attempts ranked by marks earned. Distractor counts
+show how often each option was picked. Answers are read from each
+attempt's packed answer sheet, one row per attempt.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .answer_sheets import BLANK, layout_questions
+from .models import Question, QuizAttempt
+
+
+OPTIONS = np.array(['A', 'B', 'C', 'D'])
+# Share of attempts in each of the upper and lower groups
+GROUP_FRACTION = 0.27
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(quiz):
+    # Any newly completed attempt or edited answer key changes the key
+    stamp = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).aggregate(
+        count=Count('id'), latest=Max('completed_at')
+    )
+    latest = stamp['latest'].timestamp() if stamp['latest'] else 0
+    return f"quiz-item-analysis:{quiz.pk}:{quiz.answer_key_version}:{stamp['count']}:{latest}", stamp['count']
+
+
+def get_item_analysis(quiz):
+    """Item analysis for ``quiz``, served from the cache until another attempt completes"""
+    key, attempt_count = _cache_key(quiz)
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = analyse_quiz(quiz, attempt_count)
+        cache.set(key, analysis, CACHE_TIMEOUT)
+    return analysis
+
+
+def _round(values):
+    return [None if np.isnan(value) else round(float(value), 4) for value in values]
+
+
+def _decode_sheets(sheets, masks, width):
+    """Stack same-layout sheets into an option matrix and a correctness matrix"""
+    options = np.frombuffer(''.join(sheets).encode('ascii'), dtype='S1').reshape(len(sheets), width)
+    packed = np.frombuffer(b''.join(bytes(mask) for mask in masks), dtype=np.uint8).reshape(len(masks), -1)
+    correct = np.unpackbits(packed, axis=1, count=width, bitorder='little').astype(bool)
+    return options.astype('<U1'), correct
+
+
+def analyse_quiz(quiz, attempt_count):
+    """Compute the analysis from the quiz's questions and the packed sheets of its completed attempts"""
+    questions = list(
+        Question.objects.filter(quiz=quiz).order_by('id').values_list('id', 'question_text', 'correct_option', 'marks')
+    )
+    sheets = {}
+    rows = QuizAttempt.objects.filter(quiz=quiz, is_completed=True, answer_layout__isnull=False).order_by().values_list(
+        'answer_layout_id', 'answer_sheet', 'correct_mask'
+    )
+    for layout_id, sheet, mask in rows:
+        layout_sheets = sheets.setdefault(layout_id, ([], []))
+        layout_sheets[0].append(sheet)
+        layout_sheets[1].append(mask)
+    layouts = layout_questions(sheets)
+
+    question_ids = np.array([question[0] for question in questions], dtype=np.int64)
+    marks = np.array([question[3] for question in questions], dtype=np.float64)
+    question_count = len(questions)
+
+    # Completed attempts without a sheet still count, as all-wrong rows
+    attempts = max(attempt_count, sum(len(layout_sheets[0]) for layout_sheets in sheets.values()))
+    correct = np.zeros((attempts, question_count), dtype=np.float64)
+    question_index, selected = [], []
+    first_row = 0
+    for layout_id, (layout_sheets, masks) in sheets.items():
+        layout_ids = np.array(layouts[layout_id], dtype=np.int64)
+        if not layout_ids.size:
+            first_row += len(layout_sheets)
+            continue
+        options, is_correct = _decode_sheets(layout_sheets, masks, len(layout_ids))
+
+        # Layout positions of questions that have since been removed are ignored
+        position_index = np.searchsorted(question_ids, layout_ids)
+        known = position_index < question_count
+        known[known] = question_ids[position_index[known]] == layout_ids[known]
+        options, is_correct, position_index = options[:, known], is_correct[:, known], position_index[known]
+
+        row_index = np.arange(first_row, first_row + len(layout_sheets))
+        correct[row_index[:, None], position_index[None, :]] = is_correct
+        picked = options != BLANK
+        question_index.append(position_index[np.nonzero(picked)[1]])
+        selected.append(options[picked])
+        first_row += len(layout_sheets)
+
+    question_index = np.concatenate(question_index) if question_index else np.empty(0, dtype=np.int64)
+    selected = np.concatenate(selected) if selected else np.empty(0, dtype='<U1')
+
+    option_counts = np.zeros((question_count, len(OPTIONS)), dtype=np.int64)
+    np.add.at(option_counts, (question_index, np.searchsorted(OPTIONS, selected)), 1)
+    answered = option_counts.sum(axis=1)
+
+    difficulty = correct.mean(axis=0) if attempts else np.full(question_count, np.nan)
+
+    group_size = int(round(attempts * GROUP_FRACTION))
+    if attempts >= 2 and group_size:
+        ranking = np.argsort(correct @ marks, kind='stable')
+        discrimination = correct[ranking[-group_size:]].mean(axis=0) - correct[ranking[:group_size]].mean(axis=0)
+    else:
+        group_size = 0
+        discrimination = np.full(question_count, np.nan)
+
+    difficulty, discrimination = _round(difficulty), _round(discrimination)
+    return {
+        'quiz_id': quiz.pk,
+        'quiz_title': quiz.title,
+        'attempts_analysed': attempts,
+        'group_size': group_size,
+        'questions': [
+            {
+                'question_id': question_id,
+                'question_text': question_text,
+                'correct_option': correct_option,
+                'marks': question_marks,
+                'answered': int(answered[i]),
+                'unanswered': attempts - int(answered[i]),
+                'difficulty': difficulty[i],
+                'discrimination': discrimination[i],
+                'option_counts': dict(zip(OPTIONS.tolist(), option_counts[i].tolist())),
+            }
+            for i, (question_id, question_text, correct_option, question_marks) in enumerate(questions)
+        ]
+    }
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quizzes import question_bank
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Export a quiz's questions as CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('--output', help="File to write (default: stdout); its extension picks the format")
+        parser.add_argument('--file-format', choices=question_bank.FORMATS)
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(pk=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist.")
+
+        output = options['output']
+        file_format = options['file_format'] or question_bank.guess_format(output or '')
+        lines = question_bank.export_questions(quiz, file_format)
+        if not output:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(output, 'w', encoding='utf-8', newline='') as stream:
+            stream.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(f"Exported quiz {quiz.id} questions to {output}."))
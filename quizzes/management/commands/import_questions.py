@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quizzes import question_bank
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Import a CSV or JSONL question bank into a quiz"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('path', help="File to import; its extension picks the format")
+        parser.add_argument('--file-format', choices=question_bank.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(pk=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist.")
+
+        file_format = options['file_format'] or question_bank.guess_format(options['path'])
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            try:
+                created = question_bank.import_questions(
+                    quiz, question_bank.read_records(stream, file_format), batch_size=options['batch_size']
+                )
+            except question_bank.QuestionBankError as exc:
+                details = ''.join(f"\n  record {row}: {errors}" for row, errors in exc.rows.items())
+                raise CommandError(f"{exc}{details}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} questions into quiz {quiz.id}."))
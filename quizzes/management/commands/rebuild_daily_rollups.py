@@ -0,0 +1,18 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from quizzes.rollups import rebuild_daily_rollups
+
+
+class Command(BaseCommand):
+    help = "Backfill and compact the daily student, class and teacher score rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help="First day to rebuild, YYYY-MM-DD (default: all history)")
+        parser.add_argument('--until', type=date.fromisoformat, help="Last day to rebuild, YYYY-MM-DD (default: today)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_daily_rollups(options['since'], options['until'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily rollup rows."))
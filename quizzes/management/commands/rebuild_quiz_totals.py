@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored question count and total marks of quizzes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Quizzes to rebuild (default: all)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        quiz_ids = options['quiz_ids'] or list(Quiz.objects.values_list('id', flat=True))
+        batch_size = options['batch_size']
+
+        updated = 0
+        for start in range(0, len(quiz_ids), batch_size):
+            updated += Quiz.refresh_totals(quiz_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt totals for {updated} quizzes."))
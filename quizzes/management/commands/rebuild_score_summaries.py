@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from quizzes.rollups import rebuild_student_summaries
+
+
+class Command(BaseCommand):
+    help = "Recreate per-student score summaries from quiz attempt history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('student_ids', nargs='*', type=int, help="Students to rebuild (default: all)")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_student_summaries(options['student_ids'] or None, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt score summaries for {rebuilt} students."))
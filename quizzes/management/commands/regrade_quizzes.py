@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from quizzes.models import Quiz
+from quizzes.regrading import regrade_quizzes
+
+
+class Command(BaseCommand):
+    help = "Regrade quiz attempts against the current correct options and marks of their questions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help="Quizzes to regrade (default: all)")
+        parser.add_argument('--batch-size', type=int, default=100, help="Attempt groups written per UPDATE")
+
+    def handle(self, *args, **options):
+        quiz_ids = options['quiz_ids'] or list(Quiz.objects.values_list('id', flat=True))
+        result = regrade_quizzes(quiz_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Regraded {result['quizzes']} quizzes: {result['answers']} answers checked, "
+            f"{result['attempts']} attempts updated."
+        ))
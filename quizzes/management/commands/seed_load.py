@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes.seeding import PRESETS, delete_seeded, seed_load
+
+
+class Command(BaseCommand):
+    help = "Fill the database with deterministic synthetic teachers, students, quizzes and graded attempts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', choices=sorted(PRESETS), default='medium',
+                            help="Base sizes; the count options below override them")
+        parser.add_argument('--seed', type=int, default=0, help="Same seed and sizes give the same data")
+        parser.add_argument('--teachers', type=int)
+        parser.add_argument('--parents', type=int)
+        parser.add_argument('--students', type=int)
+        parser.add_argument('--quizzes', type=int)
+        parser.add_argument('--questions', type=int, help="Average questions per quiz")
+        parser.add_argument('--attempt-rate', type=float, default=0.8,
+                            help="Share of their teacher's quizzes each student attempts")
+        parser.add_argument('--days', type=int, default=120, help="Days of history to spread attempts over")
+        parser.add_argument('--prefix', default='load', help="Username prefix of the generated users")
+        parser.add_argument('--password', default='loadtest123', help="Password of every generated user")
+        parser.add_argument('--no-answer-rows', action='store_true',
+                            help="Only pack answers onto attempts, without QuizAnswer rows")
+        parser.add_argument('--flush', action='store_true', help="Delete users with the same prefix first")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        sizes = dict(PRESETS[options['preset']])
+        sizes.update({name: options[name] for name in sizes if options[name] is not None})
+
+        if options['flush']:
+            deleted = delete_seeded(options['prefix'])
+            self.stdout.write(f"Deleted {deleted} rows from the previous dataset.")
+
+        started = time.monotonic()
+        counts = seed_load(
+            seed=options['seed'], attempt_rate=options['attempt_rate'], days=options['days'],
+            prefix=options['prefix'], password=options['password'],
+            answer_rows=False if options['no_answer_rows'] else None, batch_size=options['batch_size'],
+            **sizes
+        )
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:11
+
+import quizzes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='answer_key_version',
+            field=models.PositiveBigIntegerField(default=quizzes.models.new_answer_key_version, editable=False),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:12
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_quiz_totals(apps, schema_editor):
+    Quiz = apps.get_model('quizzes', 'Quiz')
+    Question = apps.get_model('quizzes', 'Question')
+    questions = Question.objects.filter(quiz=models.OuterRef('pk')).order_by().values('quiz')
+    Quiz.objects.update(
+        total_questions=Coalesce(
+            models.Subquery(questions.annotate(count=models.Count('id')).values('count')), 0
+        ),
+        total_marks=Coalesce(
+            models.Subquery(questions.annotate(marks_sum=models.Sum('marks')).values('marks_sum')), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_quiz_answer_key_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='total_marks',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='total_questions',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_quiz_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    StudentScoreSummary = apps.get_model('quizzes', 'StudentScoreSummary')
+
+    summaries = {}
+    attempts = QuizAttempt.objects.order_by('student_id', '-attempted_at').values_list(
+        'student_id', 'score', 'total_marks', 'attempted_at', 'is_completed'
+    )
+    for student_id, score, total_marks, attempted_at, is_completed in attempts.iterator(chunk_size=2000):
+        summary = summaries.get(student_id)
+        if summary is None:
+            summary = summaries[student_id] = StudentScoreSummary(
+                student_id=student_id, last_attempted_at=attempted_at, recent_percentages=[]
+            )
+        summary.total_attempts += 1
+        if not is_completed:
+            continue
+        percentage = round(score / total_marks * 100, 2) if total_marks else 0
+        summary.completed_attempts += 1
+        summary.total_score += score
+        summary.total_possible += total_marks
+        summary.percentage_sum += percentage
+        summary.min_percentage = percentage if summary.min_percentage is None else min(summary.min_percentage, percentage)
+        summary.max_percentage = percentage if summary.max_percentage is None else max(summary.max_percentage, percentage)
+        if len(summary.recent_percentages) < 6:
+            summary.recent_percentages.append([attempted_at.isoformat(timespec='microseconds'), percentage])
+
+    StudentScoreSummary.objects.bulk_create(summaries.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_stored_totals'),
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentScoreSummary',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_summary', serialize=False, to='students.student')),
+                ('total_attempts', models.PositiveIntegerField(default=0)),
+                ('completed_attempts', models.PositiveIntegerField(default=0)),
+                ('total_score', models.PositiveIntegerField(default=0)),
+                ('total_possible', models.PositiveIntegerField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('min_percentage', models.FloatField(blank=True, null=True)),
+                ('max_percentage', models.FloatField(blank=True, null=True)),
+                ('last_attempted_at', models.DateTimeField(blank=True, null=True)),
+                ('recent_percentages', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Student score summaries',
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_daily_rollups(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    rollups = {
+        apps.get_model('quizzes', 'StudentDailyRollup'): {},
+        apps.get_model('quizzes', 'ClassDailyRollup'): {},
+        apps.get_model('quizzes', 'TeacherDailyRollup'): {},
+    }
+    rollup_models = list(rollups)
+
+    attempts = QuizAttempt.objects.order_by().values_list(
+        'student_id', 'student__teacher_id', 'student__class_name',
+        'score', 'total_marks', 'attempted_at', 'is_completed'
+    )
+    for student_id, teacher_id, class_name, score, total_marks, attempted_at, is_completed in attempts.iterator(chunk_size=2000):
+        day = timezone.localdate(attempted_at)
+        keys = [
+            {'student_id': student_id, 'date': day},
+            {'teacher_id': teacher_id, 'class_name': class_name, 'date': day},
+            {'teacher_id': teacher_id, 'date': day},
+        ]
+        for model, key in zip(rollup_models, keys):
+            row = rollups[model].get(tuple(key.values()))
+            if row is None:
+                row = rollups[model][tuple(key.values())] = model(**key)
+            row.attempts += 1
+            if is_completed:
+                row.completed_attempts += 1
+                row.marks_earned += score
+                row.marks_possible += total_marks
+                row.percentage_sum += round(score / total_marks * 100, 2) if total_marks else 0
+
+    for model, rows in rollups.items():
+        model.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_student_score_summary'),
+        ('students', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('completed_attempts', models.PositiveIntegerField(default=0)),
+                ('marks_earned', models.PositiveIntegerField(default=0)),
+                ('marks_possible', models.PositiveIntegerField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('class_name', models.CharField(max_length=50)),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'class_name', 'date'), name='unique_class_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('completed_attempts', models.PositiveIntegerField(default=0)),
+                ('marks_earned', models.PositiveIntegerField(default=0)),
+                ('marks_possible', models.PositiveIntegerField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='students.student')),
+            ],
+            options={
+                'ordering': ['date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('student', 'date'), name='unique_student_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TeacherDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('completed_attempts', models.PositiveIntegerField(default=0)),
+                ('marks_earned', models.PositiveIntegerField(default=0)),
+                ('marks_possible', models.PositiveIntegerField(default=0)),
+                ('percentage_sum', models.FloatField(default=0)),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teacher_daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('teacher', 'date'), name='unique_teacher_daily_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:33
+
+from itertools import groupby
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def pack_answer_rows(apps, schema_editor):
+    Question = apps.get_model('quizzes', 'Question')
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    QuizAnswer = apps.get_model('quizzes', 'QuizAnswer')
+    AnswerLayout = apps.get_model('quizzes', 'AnswerLayout')
+
+    question_ids = {}
+    for quiz_id, question_id in Question.objects.order_by('quiz_id', 'id').values_list('quiz_id', 'id'):
+        question_ids.setdefault(quiz_id, []).append(question_id)
+    layouts = {}
+
+    rows = QuizAnswer.objects.order_by('attempt_id').values_list(
+        'attempt_id', 'attempt__quiz_id', 'question_id', 'selected_option', 'is_correct'
+    )
+    batch = []
+    for attempt_id, answers in groupby(rows.iterator(chunk_size=2000), key=lambda row: row[0]):
+        answers = list(answers)
+        quiz_id = answers[0][1]
+        quiz_question_ids = question_ids.get(quiz_id, [])
+        if quiz_id not in layouts:
+            layouts[quiz_id] = AnswerLayout.objects.create(
+                quiz_id=quiz_id, question_ids=','.join(str(pk) for pk in quiz_question_ids)
+            ).pk
+        positions = {question_id: i for i, question_id in enumerate(quiz_question_ids)}
+        sheet = ['-'] * len(positions)
+        mask = 0
+        for _, _, question_id, selected_option, is_correct in answers:
+            # Rows for a question of another quiz (e.g. one moved since) have no place on this sheet
+            position = positions.get(question_id)
+            if position is None:
+                continue
+            sheet[position] = selected_option
+            if is_correct:
+                mask |= 1 << position
+        batch.append(QuizAttempt(
+            pk=attempt_id,
+            answer_layout_id=layouts[quiz_id],
+            answer_sheet=''.join(sheet),
+            correct_mask=mask.to_bytes((len(positions) + 7) // 8, 'little'),
+        ))
+        if len(batch) >= 500:
+            QuizAttempt.objects.bulk_update(batch, ['answer_layout', 'answer_sheet', 'correct_mask'])
+            batch = []
+    if batch:
+        QuizAttempt.objects.bulk_update(batch, ['answer_layout', 'answer_sheet', 'correct_mask'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_daily_score_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='answer_sheet',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='correct_mask',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.CreateModel(
+            name='AnswerLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_ids', models.TextField(help_text='Comma-separated question ids, one per sheet position')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_layouts', to='quizzes.quiz')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='answer_layout',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quizzes.answerlayout'),
+        ),
+        migrations.AddConstraint(
+            model_name='answerlayout',
+            constraint=models.UniqueConstraint(fields=('quiz', 'question_ids'), name='unique_quiz_answer_layout'),
+        ),
+        migrations.RunPython(pack_answer_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Cast, Round
+
+
+def fill_percentages(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    QuizAttempt.objects.exclude(total_marks=0).update(
+        percentage=Round(Cast('score', models.FloatField()) / models.F('total_marks') * 100, 2)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_packed_answer_sheets'),
+        ('students', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='percentage',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_percentages, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', 'percentage'], name='attempt_student_percentage'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'percentage'], name='attempt_quiz_percentage'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_attempt_percentage'),
+        ('students', '0002_parent_teacher_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['teacher', 'created_at'], name='quiz_teacher_created'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['teacher', 'deadline'], name='quiz_teacher_open'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', 'attempted_at', 'is_completed'], name='attempt_student_timeline'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['quiz', 'attempted_at'], name='attempt_quiz_completed'),
+        ),
+    ]
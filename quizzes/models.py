@@ -1,10 +1,22 @@
-from django.db import models
+import secrets
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from users.models import User
 from students.models import Student
 
 
+def new_answer_key_version():
+    """Random stamp identifying one revision of a quiz's answer key"""
+    return secrets.randbits(62)
+
+
 class Quiz(models.Model):
+    # Maintained with set-based updates; a full save never writes back a
+    # possibly stale copy held by this instance
+    DERIVED_FIELDS = ('total_questions', 'total_marks', 'answer_key_version')
+
     title = models.CharField(max_length=200)
     description = models.TextField()
     teacher = models.ForeignKey(
@@ -17,21 +29,46 @@ class Quiz(models.Model):
     deadline = models.DateTimeField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    total_questions = models.PositiveIntegerField(default=0, editable=False)
+    total_marks = models.PositiveIntegerField(default=0, editable=False)
+    answer_key_version = models.PositiveBigIntegerField(default=new_answer_key_version, editable=False)
 
     class Meta:
         verbose_name_plural = "Quizzes"
         ordering = ['-created_at']
+        indexes = [
+            # Teacher quiz list, newest first
+            models.Index(fields=['teacher', 'created_at'], name='quiz_teacher_created'),
+            # Open quizzes of a parent's teachers. Partial, because SQLite can
+            # only match a bare boolean filter against an index condition
+            models.Index(
+                fields=['teacher', 'deadline'], condition=models.Q(is_active=True), name='quiz_teacher_open'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.teacher.get_full_name() or self.teacher.username}"
 
-    @property
-    def total_questions(self):
-        return self.questions.count()
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
-    @property
-    def total_marks(self):
-        return self.questions.aggregate(models.Sum('marks'))['marks__sum'] or 0
+    @classmethod
+    def refresh_totals(cls, quiz_ids):
+        """Recompute the stored question count and total marks with one UPDATE"""
+        questions = Question.objects.filter(quiz=models.OuterRef('pk')).order_by().values('quiz')
+        return cls.objects.filter(pk__in=quiz_ids).update(
+            total_questions=Coalesce(
+                models.Subquery(questions.annotate(count=models.Count('id')).values('count')), 0
+            ),
+            total_marks=Coalesce(
+                models.Subquery(questions.annotate(marks_sum=models.Sum('marks')).values('marks_sum')), 0
+            ),
+        )
 
 
 class Question(models.Model):
@@ -54,10 +91,40 @@ class Question(models.Model):
     class Meta:
         ordering = ['id']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the quiz this question was loaded with, so moving it to
+        # another quiz invalidates both answer keys
+        instance._loaded_quiz_id = instance.__dict__.get('quiz_id')
+        return instance
+
     def __str__(self):
         return f"Question for {self.quiz.title}: {self.question_text[:50]}..."
 
 
+class AnswerLayout(models.Model):
+    """The question order a packed answer sheet was written against; rows never change"""
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='answer_layouts')
+    question_ids = models.TextField(help_text="Comma-separated question ids, one per sheet position")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['quiz', 'question_ids'], name='unique_quiz_answer_layout'),
+        ]
+
+    @staticmethod
+    def encode_ids(question_ids):
+        return ','.join(str(question_id) for question_id in question_ids)
+
+    @property
+    def id_list(self):
+        return tuple(int(question_id) for question_id in self.question_ids.split(',')) if self.question_ids else ()
+
+    def __str__(self):
+        return f"Layout {self.pk} for {self.quiz_id}"
+
+
 class QuizAttempt(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='quiz_attempts')
@@ -72,25 +139,79 @@ class QuizAttempt(models.Model):
     attempted_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     is_completed = models.BooleanField(default=False)
+    # Stored so ordering, filtering and aggregating by percentage run in SQL;
+    # recomputed by save() and by bulk regrades
+    percentage = models.FloatField(default=0, editable=False)
+    SHEET_FIELDS = ('answer_layout', 'answer_sheet', 'correct_mask')
+
+    # Packed answers: one option letter (or '-') per position of answer_layout,
+    # with bit i of correct_mask (little-endian) set when position i is correct
+    answer_layout = models.ForeignKey(
+        AnswerLayout, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
+    answer_sheet = models.TextField(blank=True, default='', editable=False)
+    correct_mask = models.BinaryField(default=b'', editable=False)
 
     class Meta:
         unique_together = ['quiz', 'student']
         ordering = ['-attempted_at']
+        indexes = [
+            models.Index(fields=['student', 'percentage'], name='attempt_student_percentage'),
+            models.Index(fields=['quiz', 'percentage'], name='attempt_quiz_percentage'),
+            # A student's attempts newest first; is_completed is read from the index
+            models.Index(fields=['student', 'attempted_at', 'is_completed'], name='attempt_student_timeline'),
+            # Completed attempts of a quiz, for results, analysis and its cache stamp
+            models.Index(
+                fields=['quiz', 'attempted_at'], condition=models.Q(is_completed=True), name='attempt_quiz_completed'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.quiz.title} ({self.score}/{self.total_marks})"
 
     @property
-    def percentage(self):
-        if self.total_marks == 0:
+    def answer_counts(self):
+        """(answered, correct) read from the packed answer sheet"""
+        from .answer_sheets import sheet_counts
+        return sheet_counts(self)
+
+    @staticmethod
+    def calculate_percentage(score, total_marks):
+        if total_marks == 0:
             return 0
-        return round((self.score / self.total_marks) * 100, 2)
+        return round((score / total_marks) * 100, 2)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.percentage = self.calculate_percentage(self.score, self.total_marks)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'score', 'total_marks'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'percentage'}
+        if not adding and kwargs.get('update_fields') is None and not getattr(self, '_sheet_packed', False):
+            # Answer rows saved on their own repack the sheet with an UPDATE;
+            # don't overwrite it with the copy this instance was loaded with
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SHEET_FIELDS
+            ]
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            self._sheet_packed = False
+            if adding:
+                from .rollups import record_attempt_started
+                record_attempt_started(self)
 
     def complete_attempt(self):
-        """Mark the attempt as completed"""
+        """Mark the attempt as completed and add it to the student's score rollups"""
+        from .rollups import record_attempt_completed
+
+        was_completed = self.is_completed
         self.is_completed = True
         self.completed_at = timezone.now()
-        self.save()
+        with transaction.atomic(savepoint=False):
+            self.save()
+            if not was_completed:
+                record_attempt_completed(self)
 
 
 class QuizAnswer(models.Model):
@@ -107,6 +228,124 @@ class QuizAnswer(models.Model):
         return f"{self.attempt.student.name} - {self.question.question_text[:30]}... - {self.selected_option}"
 
     def save(self, *args, **kwargs):
-        # Automatically determine if the answer is correct
-        self.is_correct = self.selected_option == self.question.correct_option
+        from .answer_key import answer_key_for
+
+        # Automatically determine if the answer is correct, from the cached key while it is current
+        quiz_id, version = QuizAttempt.objects.filter(pk=self.attempt_id).values_list(
+            'quiz_id', 'quiz__answer_key_version'
+        ).get()
+        entry = answer_key_for(quiz_id, version).get(self.question_id)
+        correct_option = entry.correct_option if entry else self.question.correct_option
+        self.is_correct = self.selected_option == correct_option
         super().save(*args, **kwargs)
+
+
+class StudentScoreSummary(models.Model):
+    """Running quiz statistics for one student, kept in step with their attempts"""
+    RECENT_SIZE = 6
+
+    student = models.OneToOneField(
+        Student,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score_summary'
+    )
+    total_attempts = models.PositiveIntegerField(default=0)
+    completed_attempts = models.PositiveIntegerField(default=0)
+    total_score = models.PositiveIntegerField(default=0)
+    total_possible = models.PositiveIntegerField(default=0)
+    percentage_sum = models.FloatField(default=0)
+    min_percentage = models.FloatField(null=True, blank=True)
+    max_percentage = models.FloatField(null=True, blank=True)
+    last_attempted_at = models.DateTimeField(null=True, blank=True)
+    # [attempted_at ISO string, percentage] of the latest completed attempts, newest first
+    recent_percentages = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Student score summaries"
+
+    def __str__(self):
+        return f"Score summary for {self.student_id}"
+
+    @classmethod
+    def for_student(cls, student):
+        """The student's summary, or an empty one if they have never attempted a quiz"""
+        try:
+            return student.score_summary
+        except cls.DoesNotExist:
+            return cls(student=student)
+
+    @property
+    def incomplete_attempts(self):
+        return self.total_attempts - self.completed_attempts
+
+    @property
+    def average_percentage(self):
+        """Mean of the completed attempts' percentages"""
+        if not self.completed_attempts:
+            return 0
+        return self.percentage_sum / self.completed_attempts
+
+    @property
+    def overall_percentage(self):
+        """Marks earned over marks possible across completed attempts"""
+        if not self.total_possible:
+            return 0
+        return self.total_score / self.total_possible * 100
+
+    @property
+    def recent_values(self):
+        """Percentages of the latest completed attempts, newest first"""
+        return [percentage for _, percentage in self.recent_percentages]
+
+
+class DailyScoreRollup(models.Model):
+    """Attempts and marks for one day, keyed by attempt start date"""
+    date = models.DateField()
+    attempts = models.PositiveIntegerField(default=0)
+    completed_attempts = models.PositiveIntegerField(default=0)
+    marks_earned = models.PositiveIntegerField(default=0)
+    marks_possible = models.PositiveIntegerField(default=0)
+    percentage_sum = models.FloatField(default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ['date']
+
+
+class StudentDailyRollup(DailyScoreRollup):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='daily_rollups')
+
+    class Meta(DailyScoreRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'date'], name='unique_student_daily_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} on {self.date}"
+
+
+class ClassDailyRollup(DailyScoreRollup):
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='class_daily_rollups')
+    class_name = models.CharField(max_length=50)
+
+    class Meta(DailyScoreRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'class_name', 'date'], name='unique_class_daily_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.class_name} ({self.teacher_id}) on {self.date}"
+
+
+class TeacherDailyRollup(DailyScoreRollup):
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='teacher_daily_rollups')
+
+    class Meta(DailyScoreRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['teacher', 'date'], name='unique_teacher_daily_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.teacher_id} on {self.date}"
@@ -0,0 +1,113 @@
+"""
+quizzes/question_bank.py
+Streaming import and export of a quiz's questions as CSV or JSONL.
+
+Exports are generated row by row from an iterator() over the quiz's
+questions. Imports read records lazily, validate them with
+QuestionCreateSerializer a chunk at a time and insert each chunk with one
+bulk_create, all in a single transaction.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Question
+from .serializers import QuestionCreateSerializer
+from .signals import question_batch
+
+
+FORMATS = ('csv', 'jsonl')
+FIELDS = QuestionCreateSerializer.Meta.fields
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class QuestionBankError(Exception):
+    """An import was rejected; ``rows`` maps 1-based record numbers to their errors"""
+
+    def __init__(self, message, rows=None):
+        super().__init__(message)
+        self.rows = rows or {}
+
+
+def guess_format(filename, default='csv'):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else default
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def export_questions(quiz, file_format='csv', chunk_size=2000):
+    """Yield the quiz's questions as lines of CSV or JSONL text"""
+    rows = Question.objects.filter(quiz=quiz).order_by('id').values_list(*FIELDS).iterator(chunk_size=chunk_size)
+    if file_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(FIELDS, row))) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def read_records(stream, file_format='csv'):
+    """Lazily parse a text stream of CSV or JSONL into question dicts"""
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise QuestionBankError(f'Line {line_number} is not valid JSON: {exc}')
+            if not isinstance(record, dict):
+                raise QuestionBankError(f'Line {line_number} is not a JSON object.')
+            yield record
+        return
+
+    reader = csv.DictReader(stream)
+    missing = set(FIELDS) - set(reader.fieldnames or []) - {'marks'}
+    if missing:
+        raise QuestionBankError(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+    for record in reader:
+        if not record.get('marks'):
+            record.pop('marks', None)
+        yield record
+
+
+def open_upload(upload):
+    """Wrap an uploaded file as a text stream without reading it into memory"""
+    return io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+
+
+def import_questions(quiz, records, batch_size=500):
+    """
+    Validate and insert question records into ``quiz``; returns the number created.
+
+    Nothing is saved if any record is invalid. Quiz totals and the answer key
+    are refreshed once at the end.
+    """
+    records = iter(records)
+    created = 0
+    with transaction.atomic(), question_batch(quiz.pk):
+        while chunk := list(islice(records, batch_size)):
+            serializer = QuestionCreateSerializer(data=chunk, many=True)
+            if not serializer.is_valid():
+                errors = serializer.errors
+                if isinstance(errors, list):
+                    errors = dict(enumerate(errors))
+                rows = {created + index + 1: error for index, error in errors.items() if error}
+                raise QuestionBankError('Invalid questions in the import; nothing was saved.', rows)
+            created += len(serializer.save(quiz=quiz))
+    return created
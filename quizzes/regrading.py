@@ -0,0 +1,121 @@
+"""
+quizzes/regrading.py
+Regrade submitted attempts after a quiz's answer key changes.
+
+QuizAnswer correctness is recomputed with one UPDATE per quiz against the
+questions' current correct options. Attempts are regraded by group: those
+sharing a layout, answer sheet and stored result grade alike, so each
+distinct group is graded once in Python and the groups that changed are
+written with one CASE-per-column UPDATE per batch of groups. Each quiz gets
+a new answer key version up front. Once every quiz is done, score summaries
+and daily rollups are rebuilt for the students whose attempts changed, their
+teachers and the days those attempts were made.
+"""
+import operator
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import (
+    BinaryField, BooleanField, Case, ExpressionWrapper, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When
+)
+from django.utils import timezone
+
+from .answer_key import get_answer_key, invalidate_answer_key
+from .answer_sheets import BLANK, layout_questions
+from .models import Quiz, Question, QuizAttempt, QuizAnswer
+from .rollups import rebuild_daily_rollups, rebuild_student_summaries
+
+
+def _grade_sheet(question_ids, answer_key, sheet):
+    """Correctness mask and score of one packed sheet under ``answer_key``"""
+    mask = score = 0
+    for position, (question_id, selected_option) in enumerate(zip(question_ids, sheet)):
+        if selected_option != BLANK and answer_key.is_correct(question_id, selected_option):
+            mask |= 1 << position
+            score += answer_key.get(question_id).marks
+    return mask.to_bytes((len(question_ids) + 7) // 8, 'little'), score
+
+
+def _regrade_answer_rows(quiz_id):
+    correct_option = Question.objects.filter(pk=OuterRef('question_id')).values('correct_option')
+    return QuizAnswer.objects.filter(attempt__quiz_id=quiz_id).update(
+        is_correct=ExpressionWrapper(Q(selected_option=Subquery(correct_option)), output_field=BooleanField())
+    )
+
+
+# Attempts that agree on these fields are regraded alike
+GROUP_FIELDS = ['answer_layout_id', 'answer_sheet', 'correct_mask', 'score', 'total_marks']
+
+
+def _regrade_sheets(quiz, batch_size):
+    """Regrade a quiz's attempts; returns (student id, teacher id, attempted_at) of each one that changed"""
+    answer_key = get_answer_key(quiz)
+    total_marks = answer_key.total_marks
+    attempts = QuizAttempt.objects.filter(quiz=quiz)
+    groups = [
+        dict(group, correct_mask=bytes(group['correct_mask']))
+        for group in attempts.order_by().values(*GROUP_FIELDS).distinct()
+    ]
+    layouts = layout_questions({group['answer_layout_id'] for group in groups if group['answer_layout_id']})
+
+    changes = []
+    for group in groups:
+        mask, score = group['correct_mask'], group['score']
+        if group['answer_layout_id']:
+            mask, score = _grade_sheet(layouts[group['answer_layout_id']], answer_key, group['answer_sheet'])
+        if (mask, score, total_marks) != (group['correct_mask'], group['score'], group['total_marks']):
+            changes.append((Q(**group), mask, score))
+
+    changed = []
+    for start in range(0, len(changes), batch_size):
+        batch = changes[start:start + batch_size]
+        matching = attempts.filter(reduce(operator.or_, (group for group, _, _ in batch)))
+        changed += matching.values_list('student_id', 'student__teacher_id', 'attempted_at')
+        matching.update(
+            correct_mask=Case(*(When(group, then=Value(mask)) for group, mask, _ in batch), output_field=BinaryField()),
+            score=Case(*(When(group, then=Value(score)) for group, _, score in batch), output_field=IntegerField()),
+            total_marks=total_marks,
+            percentage=Case(
+                *(When(group, then=Value(QuizAttempt.calculate_percentage(score, total_marks))) for group, _, score in batch),
+                output_field=FloatField()
+            ),
+        )
+    return changed
+
+
+def regrade_quizzes(quiz_ids, batch_size=100):
+    """
+    Regrade every attempt of the given quizzes against their current questions.
+
+    ``batch_size`` is the number of attempt groups written per UPDATE.
+    Returns ``{'quizzes': n, 'answers': n, 'attempts': n}`` where ``answers``
+    counts QuizAnswer rows rechecked and ``attempts`` the attempts whose
+    score, total or correctness mask changed.
+    """
+    quiz_ids = list(quiz_ids)
+    result = {'quizzes': 0, 'answers': 0, 'attempts': 0}
+    changed = []
+    with transaction.atomic():
+        Quiz.refresh_totals(quiz_ids)
+        for quiz in Quiz.objects.filter(pk__in=quiz_ids).only('id'):
+            # The questions may have been changed by queries that sent no signals,
+            # so start from a fresh key; the new version also retires cached analyses
+            quiz.answer_key_version = invalidate_answer_key(quiz.pk)
+            result['quizzes'] += 1
+            result['answers'] += _regrade_answer_rows(quiz.pk)
+            changed += _regrade_sheets(quiz, batch_size)
+
+        result['attempts'] = len(changed)
+        if changed:
+            student_ids = {student_id for student_id, _, _ in changed}
+            rebuild_student_summaries(student_ids)
+            rebuild_daily_rollups(
+                dates={timezone.localdate(attempted_at) for _, _, attempted_at in changed},
+                student_ids=student_ids,
+                teacher_ids={teacher_id for _, teacher_id, _ in changed},
+            )
+    return result
+
+
+def regrade_quiz(quiz, batch_size=100):
+    return regrade_quizzes([quiz.pk], batch_size=batch_size)
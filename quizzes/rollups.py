@@ -0,0 +1,351 @@
+"""
+quizzes/rollups.py
+Incrementally maintained score rollups.
+
+Every QuizAttempt feeds its student's StudentScoreSummary and the daily
+student, class and teacher rollups in the same transaction that starts or
+completes it. The rebuild functions recompute rows from attempt history for
+backfills and repairs.
+"""
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Window
+from django.db.models.functions import RowNumber, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from students.models import Student
+from .models import (
+    QuizAttempt, StudentScoreSummary, StudentDailyRollup, ClassDailyRollup, TeacherDailyRollup
+)
+
+
+SUMMARY_FIELDS = [
+    'total_attempts', 'completed_attempts', 'total_score', 'total_possible', 'percentage_sum',
+    'min_percentage', 'max_percentage', 'last_attempted_at', 'recent_percentages', 'updated_at',
+]
+
+
+def _recent_entry(attempted_at, percentage):
+    return [attempted_at.isoformat(timespec='microseconds'), percentage]
+
+
+# Keep whichever of the stored and the new value is later; NULL means never
+_LATEST = 'CASE WHEN {current} IS NULL OR {new} > {current} THEN {new} ELSE {current} END'
+
+
+def _upsert(model, keys, increments, values=None, replace=None):
+    """
+    Add ``increments`` to the row ``keys`` name in one INSERT ... ON CONFLICT statement.
+
+    A missing row is inserted with the increments as its counts, ``values``
+    for other fields and field defaults for the rest. On an existing row,
+    ``replace`` maps field names to SQL templates for their new value, with
+    ``{current}`` the stored column and ``{new}`` the inserted one.
+    """
+    meta = model._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    given = {**keys, **increments, **(values or {})}
+    fields = [
+        field for field in meta.concrete_fields
+        if field.attname in given or field.name in given or not field.primary_key
+    ]
+    params = [
+        field.get_db_prep_save(given.get(field.attname, given.get(field.name, field.get_default())), connection)
+        for field in fields
+    ]
+
+    def column(name):
+        return quote(meta.get_field(name).column)
+
+    assignments = [f'{column(name)} = {table}.{column(name)} + excluded.{column(name)}' for name in increments]
+    assignments += [
+        f'{column(name)} = ' + template.format(current=f'{table}.{column(name)}', new=f'excluded.{column(name)}')
+        for name, template in (replace or {}).items()
+    ]
+    sql = (
+        f'INSERT INTO {table} ({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))}) '
+        f'ON CONFLICT ({", ".join(column(name) for name in keys)}) DO UPDATE SET {", ".join(assignments)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _locked_summary(student_id):
+    summary, _ = StudentScoreSummary.objects.select_for_update().get_or_create(student_id=student_id)
+    return summary
+
+
+def _daily_keys(attempt):
+    student = attempt.student
+    day = timezone.localdate(attempt.attempted_at)
+    return [
+        (StudentDailyRollup, {'student_id': student.pk, 'date': day}),
+        (ClassDailyRollup, {'teacher_id': student.teacher_id, 'class_name': student.class_name, 'date': day}),
+        (TeacherDailyRollup, {'teacher_id': student.teacher_id, 'date': day}),
+    ]
+
+
+def _bump_daily(attempt, **increments):
+    """Add ``increments`` to the attempt's daily rows, creating any that are missing"""
+    for model, keys in _daily_keys(attempt):
+        _upsert(model, keys, increments)
+
+
+def record_attempt_started(attempt):
+    """Count a newly created attempt in its student's summary and daily rollups"""
+    _upsert(
+        StudentScoreSummary,
+        {'student_id': attempt.student_id},
+        {'total_attempts': 1},
+        values={'last_attempted_at': attempt.attempted_at, 'updated_at': timezone.now()},
+        replace={'last_attempted_at': _LATEST, 'updated_at': '{new}'},
+    )
+    _bump_daily(attempt, attempts=1)
+
+
+def record_attempt_completed(attempt):
+    """Add a just-completed attempt's result to its student's summary and daily rollups"""
+    summary = _locked_summary(attempt.student_id)
+    percentage = attempt.percentage
+
+    summary.completed_attempts += 1
+    summary.total_score += attempt.score
+    summary.total_possible += attempt.total_marks
+    summary.percentage_sum += percentage
+    summary.min_percentage = percentage if summary.min_percentage is None else min(summary.min_percentage, percentage)
+    summary.max_percentage = percentage if summary.max_percentage is None else max(summary.max_percentage, percentage)
+
+    recent = summary.recent_percentages + [_recent_entry(attempt.attempted_at, percentage)]
+    recent.sort(key=lambda entry: entry[0], reverse=True)
+    summary.recent_percentages = recent[:StudentScoreSummary.RECENT_SIZE]
+    summary.save()
+
+    _bump_daily(
+        attempt,
+        completed_attempts=1,
+        marks_earned=attempt.score,
+        marks_possible=attempt.total_marks,
+        percentage_sum=percentage,
+    )
+
+
+class _RollupRepair:
+    """The rollup rows to recompute once the current transaction commits; one is queued per transaction"""
+
+    def __init__(self):
+        self.student_ids = set()
+        self.teacher_ids = set()
+        self.dates = set()
+
+    def __call__(self):
+        rebuild_student_summaries(self.student_ids)
+        rebuild_daily_rollups(dates=self.dates, student_ids=self.student_ids, teacher_ids=self.teacher_ids)
+
+
+def schedule_rollup_repair(attempts):
+    """
+    Recompute the rollups that ``attempts`` feed once the current transaction commits.
+
+    Calls within one transaction share a single repair, which rebuilds only
+    the summaries of the attempts' students and the daily rows of those
+    students and their teachers on the attempts' days. The students must
+    still exist when this is called.
+    """
+    attempts = list(attempts)
+    if not attempts:
+        return
+    connection = transaction.get_connection()
+    repair = next(
+        (func for _, func, _ in connection.run_on_commit if isinstance(func, _RollupRepair)), None
+    ) if connection.in_atomic_block else None
+    queued = repair is not None
+    repair = repair or _RollupRepair()
+
+    student_ids = {attempt.student_id for attempt in attempts}
+    repair.teacher_ids.update(
+        Student.objects.filter(pk__in=student_ids - repair.student_ids).values_list('teacher_id', flat=True)
+    )
+    repair.student_ids |= student_ids
+    repair.dates.update(timezone.localdate(attempt.attempted_at) for attempt in attempts)
+    if not queued:
+        transaction.on_commit(repair)
+
+
+def rebuild_student_summaries(student_ids=None, batch_size=500):
+    """Recompute summaries from attempt history; returns the number of students rebuilt"""
+    students = Student.objects.order_by('pk')
+    if student_ids is not None:
+        students = students.filter(pk__in=list(student_ids))
+    ids = list(students.values_list('pk', flat=True))
+
+    for start in range(0, len(ids), batch_size):
+        _rebuild_batch(ids[start:start + batch_size])
+    return len(ids)
+
+
+def _rebuild_batch(student_ids):
+    completed = Q(quiz_attempts__is_completed=True)
+    percentage = F('quiz_attempts__percentage')
+    rows = Student.objects.filter(pk__in=student_ids).order_by().values('pk').annotate(
+        total_attempts=Count('quiz_attempts'),
+        completed_attempts=Count('quiz_attempts', filter=completed),
+        total_score=Sum('quiz_attempts__score', filter=completed),
+        total_possible=Sum('quiz_attempts__total_marks', filter=completed),
+        percentage_sum=Sum(percentage, filter=completed),
+        min_percentage=Min(percentage, filter=completed),
+        max_percentage=Max(percentage, filter=completed),
+        last_attempted_at=Max('quiz_attempts__attempted_at'),
+    )
+
+    recent = {student_id: [] for student_id in student_ids}
+    recent_attempts = QuizAttempt.objects.filter(
+        student__in=student_ids,
+        is_completed=True
+    ).annotate(
+        recent_rank=Window(RowNumber(), partition_by=F('student_id'), order_by=F('attempted_at').desc()),
+    ).filter(
+        recent_rank__lte=StudentScoreSummary.RECENT_SIZE
+    ).order_by('student_id', '-attempted_at').values_list('student_id', 'attempted_at', 'percentage')
+    for student_id, attempted_at, percentage in recent_attempts:
+        recent[student_id].append(_recent_entry(attempted_at, percentage))
+
+    summaries = [
+        StudentScoreSummary(
+            student_id=row['pk'],
+            total_attempts=row['total_attempts'],
+            completed_attempts=row['completed_attempts'],
+            total_score=row['total_score'] or 0,
+            total_possible=row['total_possible'] or 0,
+            percentage_sum=row['percentage_sum'] or 0,
+            min_percentage=row['min_percentage'],
+            max_percentage=row['max_percentage'],
+            last_attempted_at=row['last_attempted_at'],
+            recent_percentages=recent[row['pk']],
+        )
+        for row in rows
+    ]
+    StudentScoreSummary.objects.bulk_create(
+        summaries,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=SUMMARY_FIELDS,
+    )
+
+
+DAILY_DIMENSIONS = {
+    StudentDailyRollup: {'student_id': F('student_id')},
+    ClassDailyRollup: {'teacher_id': F('student__teacher_id'), 'class_name': F('student__class_name')},
+    TeacherDailyRollup: {'teacher_id': F('student__teacher_id')},
+}
+
+
+def rebuild_daily_rollups(start_date=None, end_date=None, batch_size=1000, dates=None, student_ids=None, teacher_ids=None):
+    """
+    Rewrite the daily rollups between two dates (inclusive) from attempt history.
+
+    Rows in the window that no longer have attempts are dropped, so this both
+    backfills and compacts. ``dates`` narrows the window to those days, and
+    ``student_ids`` and ``teacher_ids`` to the student rows and the class and
+    teacher rows of those owners. Returns the number of rows written.
+    """
+    attempts = QuizAttempt.objects.order_by()
+    if start_date:
+        attempts = attempts.filter(attempted_at__date__gte=start_date)
+    if end_date:
+        attempts = attempts.filter(attempted_at__date__lte=end_date)
+    if dates is not None:
+        attempts = attempts.filter(attempted_at__date__in=list(dates))
+
+    completed = Q(is_completed=True)
+    aggregates = {
+        'attempt_count': Count('id'),
+        'completed_count': Count('id', filter=completed),
+        'earned': Sum('score', filter=completed),
+        'possible': Sum('total_marks', filter=completed),
+        'percentages': Sum('percentage', filter=completed),
+    }
+
+    written = 0
+    with transaction.atomic():
+        for model, dimensions in DAILY_DIMENSIONS.items():
+            existing = model.objects.all()
+            if start_date:
+                existing = existing.filter(date__gte=start_date)
+            if end_date:
+                existing = existing.filter(date__lte=end_date)
+            if dates is not None:
+                existing = existing.filter(date__in=list(dates))
+            owned = attempts
+            if 'student_id' in dimensions and student_ids is not None:
+                existing = existing.filter(student_id__in=list(student_ids))
+                owned = owned.filter(student_id__in=list(student_ids))
+            elif 'teacher_id' in dimensions and teacher_ids is not None:
+                existing = existing.filter(teacher_id__in=list(teacher_ids))
+                owned = owned.filter(student__teacher_id__in=list(teacher_ids))
+            existing.delete()
+
+            keys = {f'key_{field}': expression for field, expression in dimensions.items()}
+            rows = owned.annotate(day=TruncDate('attempted_at'), **keys).values(
+                'day', *keys
+            ).annotate(**aggregates).iterator(chunk_size=batch_size)
+            objects = (
+                model(
+                    date=row['day'],
+                    attempts=row['attempt_count'],
+                    completed_attempts=row['completed_count'],
+                    marks_earned=row['earned'] or 0,
+                    marks_possible=row['possible'] or 0,
+                    percentage_sum=row['percentages'] or 0,
+                    **{field: row[f'key_{field}'] for field in dimensions},
+                )
+                for row in rows
+            )
+            while batch := list(islice(objects, batch_size)):
+                model.objects.bulk_create(batch)
+                written += len(batch)
+    return written
+
+
+def score_trends(rollups, weeks=8):
+    """
+    Monthly and ISO-weekly score trends from a queryset of daily rollup rows.
+
+    Only periods with completed attempts are reported; ``weeks`` limits the
+    weekly series to the most recent weeks with activity.
+    """
+    completed = rollups.filter(completed_attempts__gt=0).order_by()
+
+    def bucketed(bucket):
+        return completed.annotate(period_start=bucket).values('period_start').annotate(
+            percentages=Sum('percentage_sum'),
+            quizzes_taken=Sum('completed_attempts'),
+            marks_earned=Sum('marks_earned'),
+            marks_possible=Sum('marks_possible')
+        )
+
+    def trend_row(row, period):
+        return {
+            "period": period,
+            "average_percentage": round(row['percentages'] / row['quizzes_taken'], 2),
+            "quizzes_taken": row['quizzes_taken'],
+            "total_marks": row['marks_earned'],
+            "possible_marks": row['marks_possible']
+        }
+
+    monthly_trends = [
+        trend_row(row, row['period_start'].strftime('%Y-%m'))
+        for row in bucketed(TruncMonth('date')).order_by('period_start')
+    ]
+
+    weekly_trends = []
+    for row in reversed(list(bucketed(TruncWeek('date')).order_by('-period_start')[:weeks])):
+        year, week, _ = row['period_start'].isocalendar()
+        weekly_trends.append(trend_row(row, f"{year}-W{week:02d}"))
+
+    return {
+        "monthly": monthly_trends,
+        "weekly": weekly_trends
+    }
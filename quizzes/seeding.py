@@ -0,0 +1,280 @@
+"""
+quizzes/seeding.py
+Deterministic synthetic data for load testing.
+
+seed_load() creates teachers, parents, students, quizzes, questions and
+graded attempts from a random seed, so two runs with the same arguments
+produce the same rows. Everything is written with bulk_create in batches
+(answer rows with a plain executemany, and generated creation times
+written back after their bulk_create); users share one password hash
+computed up front. Attempts are graded with a simple ability-versus-
+difficulty model and stored the way submissions are (packed sheets, and
+QuizAnswer rows unless turned off). Score summaries and daily rollups are
+rebuilt from the result at the end.
+"""
+import math
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from students.models import Student
+from users.models import User
+from .answer_sheets import pack, store_answer_rows
+from .models import AnswerLayout, Quiz, Question, QuizAttempt, QuizAnswer
+from .rollups import rebuild_daily_rollups, rebuild_student_summaries
+
+
+# Dataset sizes for benchmarks; "large" holds roughly a million answers
+PRESETS = {
+    'small': {'teachers': 3, 'parents': 40, 'students': 60, 'quizzes': 12, 'questions': 10},
+    'medium': {'teachers': 10, 'parents': 400, 'students': 600, 'quizzes': 80, 'questions': 15},
+    'large': {'teachers': 40, 'parents': 3000, 'students': 4500, 'quizzes': 400, 'questions': 26},
+}
+
+FIRST_NAMES = [
+    'Aarav', 'Ananya', 'Diya', 'Ishaan', 'Kabir', 'Meera', 'Nikhil', 'Priya', 'Rohan', 'Saanvi',
+    'Tara', 'Vihaan', 'Zara', 'Arjun', 'Kavya', 'Dev', 'Isha', 'Neil', 'Riya', 'Aditya',
+]
+LAST_NAMES = [
+    'Sharma', 'Patel', 'Iyer', 'Reddy', 'Gupta', 'Khan', 'Das', 'Mehta', 'Nair', 'Singh',
+    'Rao', 'Joshi', 'Kapoor', 'Bose', 'Menon',
+]
+TOPICS = ['Fractions', 'Decimals', 'Geometry', 'Algebra', 'Ratios', 'Percentages', 'Integers', 'Statistics']
+OPTIONS = 'ABCD'
+MARKS = [1, 1, 1, 2, 2, 3, 5]
+TIME_LIMITS = [10, 15, 20, 30, 45, 60]
+
+
+def _bulk_create_dated(model, rows, field_name, batch_size):
+    """
+    bulk_create() ``rows`` keeping their generated values of an auto_now_add field.
+
+    bulk_create stamps such a field with the current time, so the generated
+    values are put back on the rows and written with one executemany UPDATE.
+    """
+    field = model._meta.get_field(field_name)
+    values = [getattr(row, field.attname) for row in rows]
+    rows = model.objects.bulk_create(rows, batch_size=batch_size)
+    for row, value in zip(rows, values):
+        setattr(row, field.attname, value)
+
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {quote(model._meta.db_table)} SET {quote(field.column)} = %s "
+            f"WHERE {quote(model._meta.pk.column)} = %s",
+            [(field.get_db_prep_save(value, connection), row.pk) for row, value in zip(rows, values)]
+        )
+    return rows
+
+
+def _spread(rng, items, weights, count):
+    """``count`` picks from ``items``, skewed by ``weights`` but giving each item at least one where possible"""
+    picks = list(items[:count])
+    picks += rng.choices(items, weights=weights, k=count - len(picks))
+    rng.shuffle(picks)
+    return picks
+
+
+def _name(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def _create_users(rng, role, count, prefix, password, batch_size):
+    users = []
+    for i in range(count):
+        first_name, last_name = _name(rng)
+        users.append(User(
+            username=f'{prefix}-{role}-{i}@example.com', email=f'{prefix}-{role}-{i}@example.com',
+            first_name=first_name, last_name=last_name, role=role, password=password,
+            school_name=f'School {i % 7}' if role == 'teacher' else None,
+        ))
+    return User.objects.bulk_create(users, batch_size=batch_size)
+
+
+def _grade(rng, ability, questions):
+    """Simulated answers of one student: ``{question_id: (option, correct)}`` and the score"""
+    answers = {}
+    score = 0
+    for question_id, correct_option, marks, difficulty in questions:
+        if rng.random() < 0.03:
+            continue
+        chance = 1 / (1 + math.exp(-1.7 * (ability - difficulty)))
+        if rng.random() < chance:
+            answers[question_id] = (correct_option, True)
+            score += marks
+        else:
+            answers[question_id] = (rng.choice([option for option in OPTIONS if option != correct_option]), False)
+    return answers, score
+
+
+def _insert_answers(rows):
+    """executemany() the answer rows; building a model instance per answer costs more than the insert"""
+    meta = QuizAnswer._meta
+    quote = connection.ops.quote_name
+    columns = [quote(meta.get_field(name).column) for name in ('attempt', 'question', 'selected_option', 'is_correct')]
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(meta.db_table)} ({', '.join(columns)}) VALUES (%s, %s, %s, %s)", rows
+        )
+
+
+def seed_load(seed=0, teachers=10, parents=400, students=600, quizzes=80, questions=15, attempt_rate=0.8,
+              days=120, prefix='load', password='loadtest123', answer_rows=None, batch_size=2000):
+    """
+    Create a synthetic dataset and return the number of rows made per model.
+
+    Students are spread unevenly over teachers and given to parents in
+    families of one to three. Each student attempts about ``attempt_rate``
+    of their teacher's quizzes; ``questions`` is the average quiz length.
+    Dates fall in the ``days`` before today. ``answer_rows`` defaults to the
+    QUIZ_STORE_ANSWER_ROWS setting.
+    """
+    rng = random.Random(seed)
+    if answer_rows is None:
+        answer_rows = store_answer_rows()
+    today = timezone.make_aware(datetime.combine(timezone.localdate(), time()))
+    counts = {}
+
+    with transaction.atomic():
+        # One hash for every user instead of a PBKDF2 run each
+        password_hash = make_password(password)
+        teacher_users = _create_users(rng, 'teacher', teachers, prefix, password_hash, batch_size)
+        parent_users = _create_users(rng, 'parent', parents, prefix, password_hash, batch_size)
+        counts['teachers'], counts['parents'] = len(teacher_users), len(parent_users)
+
+        teacher_weights = [rng.lognormvariate(0, 0.5) for _ in teacher_users]
+        classes = {teacher.pk: [f'{rng.randint(3, 8)}{section}' for section in 'ABC'[:rng.randint(1, 3)]]
+                   for teacher in teacher_users}
+
+        student_rows = []
+        families = iter(rng.choices([1, 1, 1, 2, 2, 3], k=students))
+        parent_index = family_left = 0
+        for teacher in _spread(rng, teacher_users, teacher_weights, students):
+            if family_left == 0:
+                parent = parent_users[parent_index % len(parent_users)]
+                parent_index += 1
+                family_left = next(families)
+            family_left -= 1
+            first_name, _ = _name(rng)
+            student_rows.append(Student(
+                name=f'{first_name} {parent.last_name}', parent=parent,
+                parent_name=f'{parent.first_name} {parent.last_name}', parent_email=parent.email,
+                class_name=rng.choice(classes[teacher.pk]), teacher=teacher,
+            ))
+        student_rows = Student.objects.bulk_create(student_rows, batch_size=batch_size)
+        counts['students'] = len(student_rows)
+
+        # Quiz rows carry their totals, so questions are drawn before either is saved
+        quiz_rows, question_specs = [], []
+        for i, teacher in enumerate(_spread(rng, teacher_users, teacher_weights, quizzes)):
+            created_at = today - timedelta(days=rng.uniform(0, days))
+            specs = [
+                (rng.choice(OPTIONS), rng.choice(MARKS), rng.gauss(0, 1))
+                for _ in range(max(1, round(rng.gauss(questions, questions / 4))))
+            ]
+            question_specs.append(specs)
+            quiz_rows.append(Quiz(
+                title=f'{rng.choice(TOPICS)} quiz {i}', description='Synthetic load-test quiz', teacher=teacher,
+                time_limit_minutes=rng.choice(TIME_LIMITS), created_at=created_at,
+                deadline=created_at + timedelta(days=rng.randint(7, 45)), is_active=rng.random() < 0.9,
+                total_questions=len(specs), total_marks=sum(marks for _, marks, _ in specs),
+                answer_key_version=rng.getrandbits(62),
+            ))
+        quiz_rows = _bulk_create_dated(Quiz, quiz_rows, 'created_at', batch_size)
+
+        question_rows = [
+            Question(
+                quiz=quiz, question_text=f'Question {n + 1} of {quiz.title}', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option=correct_option, marks=marks,
+            )
+            for quiz, specs in zip(quiz_rows, question_specs)
+            for n, (correct_option, marks, _) in enumerate(specs)
+        ]
+        question_rows = iter(Question.objects.bulk_create(question_rows, batch_size=batch_size))
+        quiz_questions = {
+            quiz.pk: [
+                (question.pk, question.correct_option, question.marks, difficulty)
+                # specs first: zip() stops on it without pulling the next quiz's question
+                for (_, _, difficulty), question in zip(specs, question_rows)
+            ]
+            for quiz, specs in zip(quiz_rows, question_specs)
+        }
+        layouts = AnswerLayout.objects.bulk_create([
+            AnswerLayout(quiz=quiz, question_ids=AnswerLayout.encode_ids(row[0] for row in quiz_questions[quiz.pk]))
+            for quiz in quiz_rows
+        ], batch_size=batch_size)
+        layouts = {layout.quiz_id: layout for layout in layouts}
+        counts['quizzes'], counts['questions'] = len(quiz_rows), sum(map(len, quiz_questions.values()))
+
+        teacher_quizzes = {}
+        for quiz in quiz_rows:
+            teacher_quizzes.setdefault(quiz.teacher_id, []).append(quiz)
+
+        counts['attempts'] = counts['answers'] = 0
+        attempts, answers = [], []
+
+        def flush():
+            _bulk_create_dated(QuizAttempt, attempts, 'attempted_at', batch_size)
+            if answer_rows:
+                _insert_answers([
+                    (attempt.pk, question_id, option, correct)
+                    for attempt, graded in answers for question_id, (option, correct) in graded.items()
+                ])
+            counts['attempts'] += len(attempts)
+            counts['answers'] += sum(len(graded) for _, graded in answers)
+            attempts.clear()
+            answers.clear()
+
+        for student in student_rows:
+            ability = rng.gauss(0, 1)
+            for quiz in teacher_quizzes.get(student.teacher_id, []):
+                if rng.random() >= attempt_rate:
+                    continue
+                window = max((min(quiz.deadline, today) - quiz.created_at).total_seconds(), 60)
+                attempt = QuizAttempt(
+                    quiz=quiz, student=student, parent_id=student.parent_id, total_marks=quiz.total_marks,
+                    attempted_at=quiz.created_at + timedelta(seconds=rng.uniform(0, window)),
+                )
+                if rng.random() < 0.95:
+                    questions_in_order = quiz_questions[quiz.pk]
+                    graded, attempt.score = _grade(rng, ability, questions_in_order)
+                    attempt.is_completed = True
+                    attempt.completed_at = attempt.attempted_at + timedelta(
+                        minutes=rng.uniform(1, quiz.time_limit_minutes)
+                    )
+                    attempt.percentage = QuizAttempt.calculate_percentage(attempt.score, attempt.total_marks)
+                    attempt.answer_layout = layouts[quiz.pk]
+                    attempt.answer_sheet, attempt.correct_mask = pack(
+                        [row[0] for row in questions_in_order], graded
+                    )
+                    answers.append((attempt, graded))
+                attempts.append(attempt)
+                if len(attempts) >= batch_size:
+                    flush()
+        flush()
+
+        rebuild_student_summaries()
+        rebuild_daily_rollups()
+    return counts
+
+
+def delete_seeded(prefix='load'):
+    """
+    Remove a previous dataset; returns the number of rows deleted.
+
+    Quizzes go teacher by teacher, so each delete only holds one teacher's
+    rows in memory, and their delete signals skip the answer sheets of
+    quizzes that are going as a whole. The rollup repair runs once, when
+    everything has been deleted.
+    """
+    users = User.objects.filter(username__startswith=f'{prefix}-')
+    deleted = 0
+    with transaction.atomic():
+        for teacher_id in users.filter(role='teacher').values_list('pk', flat=True):
+            deleted += Quiz.objects.filter(teacher_id=teacher_id).delete()[0]
+        deleted += users.delete()[0]
+    return deleted
@@ -22,12 +22,77 @@ class QuestionSerializer(serializers.ModelSerializer):
         return data
 
 
+class QuestionBulkCreateSerializer(serializers.ListSerializer):
+    """Creates a validated list of questions with a single bulk insert"""
+
+    def create(self, validated_data):
+        return Question.objects.bulk_create([Question(**item) for item in validated_data])
+
+
 class QuestionCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating questions - includes correct_option"""
 
     class Meta:
         model = Question
         fields = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_option', 'marks']
+        list_serializer_class = QuestionBulkCreateSerializer
+
+
+class QuestionBulkEditSerializer(serializers.ListSerializer):
+    """
+    Edits a quiz's question set in bulk; the instance is the quiz's current questions.
+
+    With partial=True (PATCH) every item names an existing question and only
+    the given fields change. Otherwise (PUT) the list replaces the set: items
+    with an id are updated, items without one are created and questions left
+    out are deleted.
+    """
+
+    def validate(self, attrs):
+        ids = [item['id'] for item in attrs if 'id' in item]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError('Each question may appear only once.')
+        unknown = set(ids) - {question.id for question in self.instance}
+        if unknown:
+            raise serializers.ValidationError(
+                f'Questions {sorted(unknown)} do not belong to this quiz.'
+            )
+        if self.partial and len(ids) != len(attrs):
+            raise serializers.ValidationError('Every question in a bulk update needs an id.')
+        return attrs
+
+    def update(self, instance, validated_data):
+        quiz = self.context['quiz']
+        questions = {question.id: question for question in instance}
+        changed, created, fields = [], [], set()
+        for item in validated_data:
+            item = dict(item)
+            question_id = item.pop('id', None)
+            if question_id is None:
+                created.append(Question(quiz=quiz, **item))
+                continue
+            question = questions.pop(question_id)
+            for field, value in item.items():
+                setattr(question, field, value)
+            fields.update(item)
+            changed.append(question)
+
+        if changed and fields:
+            Question.objects.bulk_update(changed, sorted(fields))
+        if created:
+            Question.objects.bulk_create(created)
+        if not self.partial and questions:
+            Question.objects.filter(pk__in=list(questions)).delete()
+        return changed + created
+
+
+class QuestionEditSerializer(QuestionCreateSerializer):
+    """Serializer for one question in a bulk edit - existing questions are named by id"""
+    id = serializers.IntegerField(required=False)
+
+    class Meta(QuestionCreateSerializer.Meta):
+        fields = ['id'] + QuestionCreateSerializer.Meta.fields
+        list_serializer_class = QuestionBulkEditSerializer
 
 
 class QuizListSerializer(serializers.ModelSerializer):
@@ -210,11 +275,11 @@ class QuizAttemptDetailSerializer(serializers.ModelSerializer):
 
     def get_correct_answers(self, obj):
         """Get number of correct answers for this attempt"""
-        return obj.answers.filter(is_correct=True).count()
+        return obj.answer_counts[1]
 
     def get_total_questions(self, obj):
         """Get total number of questions answered"""
-        return obj.answers.count()
+        return obj.answer_counts[0]
 
 
 class StudentDetailedScoresSerializer(serializers.Serializer):
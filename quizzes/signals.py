@@ -0,0 +1,161 @@
+"""
+quizzes/signals.py
+Keeps derived quiz data in step with question and quiz changes.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Quiz, Question, QuizAttempt, QuizAnswer
+from .answer_key import invalidate_answer_key
+from .answer_sheets import drop_questions, forget_answers, record_answer
+from .rollups import schedule_rollup_repair
+
+
+_batch = threading.local()
+_deleting = threading.local()
+
+
+def _refresh_quizzes(quiz_ids):
+    Quiz.refresh_totals(quiz_ids)
+    for quiz_id in quiz_ids:
+        invalidate_answer_key(quiz_id)
+
+
+@contextmanager
+def question_batch(*quiz_ids):
+    """
+    Refresh quiz totals and answer keys once for a batch of question changes.
+
+    Saves and deletes inside the block only record their quiz; the given
+    quizzes (bulk queries send no signals) and the recorded ones are
+    refreshed together when the block exits cleanly.
+    """
+    pending = getattr(_batch, 'quiz_ids', None)
+    if pending is not None:
+        pending.update(quiz_ids)
+        yield
+        return
+
+    _batch.quiz_ids = pending = set(quiz_ids)
+    try:
+        yield
+    finally:
+        _batch.quiz_ids = None
+    _refresh_quizzes(pending)
+
+
+def _batched(*quiz_ids):
+    pending = getattr(_batch, 'quiz_ids', None)
+    if pending is None:
+        return False
+    pending.update(quiz_ids)
+    return True
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    quiz_ids = {instance.quiz_id}
+    loaded_quiz_id = getattr(instance, '_loaded_quiz_id', None)
+    if loaded_quiz_id:
+        quiz_ids.add(loaded_quiz_id)
+    instance._loaded_quiz_id = instance.quiz_id
+
+    if not _batched(*quiz_ids):
+        _refresh_quizzes(quiz_ids)
+
+
+class _Deletion:
+    """The rows one delete() call removes, gathered from its pre_delete signals"""
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.ids = defaultdict(set)
+        # Rows whose post_delete signal hasn't arrived yet, by model
+        self.pending = defaultdict(set)
+        self.dropped = defaultdict(set)
+        self.forgotten = defaultdict(set)
+        self.attempts = []
+
+
+@receiver(pre_delete, sender=Quiz)
+@receiver(pre_delete, sender=Question)
+@receiver(pre_delete, sender=QuizAttempt)
+@receiver(pre_delete, sender=QuizAnswer)
+def deleting(sender, instance, origin=None, **kwargs):
+    # A delete sends every pre_delete before its first post_delete
+    deletion = getattr(_deleting, 'current', None)
+    if deletion is None or deletion.origin is not origin:
+        deletion = _deleting.current = _Deletion(origin)
+    deletion.ids[sender].add(instance.pk)
+    if sender is not Quiz:
+        deletion.pending[sender].add(instance.pk)
+
+
+def _deleted(sender, instance, origin):
+    """The deletion ``instance`` was part of, and whether it was the last row of its model in it"""
+    deletion = getattr(_deleting, 'current', None)
+    if deletion is None or deletion.origin is not origin:
+        return _Deletion(origin), True
+    pending = deletion.pending[sender]
+    pending.discard(instance.pk)
+    if not any(deletion.pending.values()):
+        _deleting.current = None
+    return deletion, not pending
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, origin=None, **kwargs):
+    deletion, last = _deleted(sender, instance, origin)
+    # Nothing to repair on a quiz that is going too
+    if instance.quiz_id not in deletion.ids[Quiz]:
+        deletion.dropped[instance.quiz_id].add(instance.pk)
+    if not last:
+        return
+    # One pass over each quiz's sheets for all of its questions deleted together
+    dropped, deletion.dropped = deletion.dropped, defaultdict(set)
+    for quiz_id, question_ids in dropped.items():
+        drop_questions(quiz_id, question_ids)
+    if dropped and not _batched(*dropped):
+        _refresh_quizzes(list(dropped))
+
+
+@receiver(post_delete, sender=QuizAnswer)
+def answer_deleted(sender, instance, origin=None, **kwargs):
+    deletion, last = _deleted(sender, instance, origin)
+    # Sheets of attempts going in the same delete are gone, and deleted questions are blanked everywhere
+    if instance.attempt_id not in deletion.ids[QuizAttempt] and instance.question_id not in deletion.ids[Question]:
+        deletion.forgotten[instance.attempt_id].add(instance.question_id)
+    if last:
+        for attempt_id, question_ids in deletion.forgotten.items():
+            forget_answers(attempt_id, question_ids)
+        deletion.forgotten.clear()
+
+
+@receiver(post_save, sender=QuizAnswer)
+def answer_saved(sender, instance, raw=False, **kwargs):
+    # Graded submissions pack their sheet directly; this covers rows saved one at a time
+    if not raw:
+        record_answer(instance)
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, raw=False, **kwargs):
+    if created or raw:
+        return
+    instance.answer_key_version = invalidate_answer_key(instance.pk)
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def attempt_deleted(sender, instance, origin=None, **kwargs):
+    deletion, last = _deleted(sender, instance, origin)
+    deletion.attempts.append(instance)
+    # Attempts go before their students, so the rollups they fed can still be found
+    if last:
+        schedule_rollup_repair(deletion.attempts)
+        deletion.attempts = []
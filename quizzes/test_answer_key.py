@@ -0,0 +1,81 @@
+"""
+Test the per-worker compiled answer-key cache and its invalidation
+"""
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from users.models import User
+from quizzes.models import Quiz, Question
+from quizzes.answer_key import get_answer_key, clear_answer_key_cache
+
+
+class AnswerKeyCacheTest(TestCase):
+    def setUp(self):
+        clear_answer_key_cache()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.quiz = self._create_quiz('Quiz')
+        self.question = self._add_question(self.quiz, 'A', 2)
+        self._add_question(self.quiz, 'C', 3)
+
+    def _create_quiz(self, title):
+        return Quiz.objects.create(
+            title=title, description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+
+    def _add_question(self, quiz, correct_option, marks):
+        return Question.objects.create(
+            quiz=quiz, question_text='Question', option_a='1', option_b='2',
+            option_c='3', option_d='4', correct_option=correct_option, marks=marks
+        )
+
+    def _fresh_quiz(self):
+        return Quiz.objects.get(pk=self.quiz.pk)
+
+    def test_key_is_compiled_and_cached(self):
+        quiz = self._fresh_quiz()
+        answer_key = get_answer_key(quiz)
+
+        self.assertEqual(answer_key.question_count, 2)
+        self.assertEqual(answer_key.total_marks, 5)
+        self.assertEqual(answer_key.get(self.question.id).correct_option, 'A')
+        with self.assertNumQueries(0):
+            self.assertIs(get_answer_key(quiz), answer_key)
+        with self.assertRaises(AttributeError):
+            answer_key.total_marks = 0
+
+    def test_question_changes_invalidate_key(self):
+        get_answer_key(self._fresh_quiz())
+
+        self.question.correct_option = 'B'
+        self.question.save()
+        self.assertEqual(get_answer_key(self._fresh_quiz()).get(self.question.id).correct_option, 'B')
+
+        self._add_question(self.quiz, 'D', 4)
+        self.assertEqual(get_answer_key(self._fresh_quiz()).total_marks, 9)
+
+        self.question.delete()
+        self.assertEqual(get_answer_key(self._fresh_quiz()).question_count, 2)
+
+    def test_quiz_edit_invalidates_key(self):
+        quiz = self._fresh_quiz()
+        stale_key = get_answer_key(quiz)
+
+        quiz.title = 'Renamed'
+        quiz.save()
+
+        self.assertNotEqual(self._fresh_quiz().answer_key_version, stale_key.version)
+        self.assertIsNot(get_answer_key(self._fresh_quiz()), stale_key)
+
+    @override_settings(QUIZ_ANSWER_KEY_CACHE_SIZE=1)
+    def test_least_recently_used_key_is_evicted(self):
+        quiz = self._fresh_quiz()
+        other_quiz = self._create_quiz('Other')
+        first_key = get_answer_key(quiz)
+        get_answer_key(other_quiz)
+
+        with self.assertNumQueries(1):
+            self.assertIsNot(get_answer_key(quiz), first_key)
@@ -0,0 +1,152 @@
+"""
+Test that graded answers are packed onto each attempt and read back from it
+"""
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, Question, QuizAttempt, QuizAnswer
+from quizzes.answer_sheets import BLANK, attempt_answers, pack, unpack
+
+
+class PackTest(TestCase):
+    def test_round_trip(self):
+        question_ids = list(range(1, 12))
+        answers = {1: ('A', True), 4: ('C', False), 9: ('D', True), 11: ('B', True)}
+
+        sheet, mask = pack(question_ids, answers)
+
+        self.assertEqual(sheet, 'A--C----D-B')
+        self.assertEqual(len(mask), 2)
+        self.assertEqual(unpack(question_ids, sheet, mask), answers)
+
+    def test_empty_layout(self):
+        self.assertEqual(pack([], {}), ('', b''))
+        self.assertEqual(unpack([], '', b''), {})
+
+
+class AnswerSheetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.student = Student.objects.create(
+            name='Student', parent=self.parent, parent_name='Parent',
+            parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+        )
+        self.quiz = Quiz.objects.create(
+            title='Sheets', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz, question_text=f'Question {i}', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option='B', marks=2
+            )
+            for i in range(4)
+        ]
+        self.quiz.refresh_from_db()
+
+    def _submit(self):
+        attempt = QuizAttempt.objects.create(
+            quiz=self.quiz, student=self.student, parent=self.parent, total_marks=self.quiz.total_marks
+        )
+        self.client.force_authenticate(user=self.parent)
+        response = self.client.post(
+            f'/api/quizzes/{self.quiz.id}/submit/',
+            {'student_id': self.student.id, 'answers': [
+                {'question_id': str(self.questions[0].id), 'selected_option': 'B'},
+                {'question_id': str(self.questions[2].id), 'selected_option': 'C'},
+            ]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        attempt.refresh_from_db()
+        return attempt
+
+    def test_submission_packs_sheet(self):
+        attempt = self._submit()
+
+        self.assertEqual(attempt.answer_sheet, f'B{BLANK}C{BLANK}')
+        self.assertEqual(bytes(attempt.correct_mask), b'\x01')
+        self.assertEqual(attempt.answer_layout.id_list, tuple(q.id for q in self.questions))
+        self.assertEqual(attempt.answer_counts, (2, 1))
+
+    @override_settings(QUIZ_STORE_ANSWER_ROWS=False)
+    def test_results_without_answer_rows(self):
+        attempt = self._submit()
+        self.assertFalse(QuizAnswer.objects.exists())
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(f'/api/quizzes/{self.quiz.id}/results/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        answers = response.data[0]['answers']
+        self.assertEqual([answer['selected_option'] for answer in answers], ['B', 'C'])
+        self.assertEqual([answer['is_correct'] for answer in answers], [True, False])
+
+        self.client.force_authenticate(user=self.parent)
+        response = self.client.get(f'/api/parent/performance/child/{self.student.id}/quiz/{attempt.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selected = {row['question_id']: row['selected_option'] for row in response.data['question_breakdown']}
+        self.assertEqual(selected[self.questions[0].id], 'B')
+        self.assertIsNone(selected[self.questions[1].id])
+
+    def test_deleted_question_is_blanked(self):
+        attempt = self._submit()
+
+        self.questions[0].delete()
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.answer_sheet, f'{BLANK}{BLANK}C{BLANK}')
+        self.assertEqual(bytes(attempt.correct_mask), b'\x00')
+        self.assertEqual([answer.question_id for answer in attempt_answers(attempt)], [self.questions[2].id])
+
+    def test_deleted_answer_rows_are_blanked(self):
+        attempt = self._submit()
+
+        with self.assertNumQueries(6):
+            QuizAnswer.objects.filter(attempt=attempt).delete()
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.answer_sheet, BLANK * 4)
+        self.assertEqual(attempt_answers(attempt), [])
+
+    def test_deleting_quiz_skips_sheet_repairs(self):
+        self._submit()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertNumQueries(12):
+                self.quiz.delete()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(QuizAttempt.objects.exists())
+
+    def test_single_answer_row_is_folded_into_sheet(self):
+        attempt = self._submit()
+
+        QuizAnswer.objects.create(attempt=attempt, question=self.questions[3], selected_option='B', is_correct=True)
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.answer_sheet, f'B{BLANK}CB')
+        self.assertEqual(attempt.answer_counts, (3, 2))
+
+    def test_stale_attempt_save_keeps_sheet(self):
+        attempt = QuizAttempt.objects.create(
+            quiz=self.quiz, student=self.student, parent=self.parent, total_marks=self.quiz.total_marks
+        )
+        QuizAnswer.objects.create(attempt=attempt, question=self.questions[1], selected_option='B', is_correct=True)
+
+        attempt.score = 2
+        attempt.save()
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.answer_sheet, f'{BLANK}B{BLANK}{BLANK}')
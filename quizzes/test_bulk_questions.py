@@ -0,0 +1,128 @@
+"""
+Test bulk question creation, update and replacement on the question list endpoint
+"""
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from quizzes.models import Quiz, Question
+from quizzes.answer_key import get_answer_key, clear_answer_key_cache
+
+
+def question_payload(i, correct_option='A', marks=1):
+    return {
+        'question_text': f'Question {i}', 'option_a': '1', 'option_b': '2',
+        'option_c': '3', 'option_d': '4', 'correct_option': correct_option, 'marks': marks
+    }
+
+
+class BulkQuestionTest(TestCase):
+    def setUp(self):
+        clear_answer_key_cache()
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.quiz = Quiz.objects.create(
+            title='Quiz', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        self.client.force_authenticate(user=self.teacher)
+        self.url = f'/api/quizzes/{self.quiz.id}/questions/'
+
+    def _quiz(self):
+        return Quiz.objects.get(pk=self.quiz.pk)
+
+    def test_list_post_is_one_insert(self):
+        payload = [question_payload(i, marks=2) for i in range(40)]
+
+        # quiz lookup, savepoint, insert, totals refresh, answer-key version, release
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 40)
+        self.assertEqual(response.data[0]['correct_option'], 'A')
+        quiz = self._quiz()
+        self.assertEqual((quiz.total_questions, quiz.total_marks), (40, 80))
+        self.assertEqual(get_answer_key(quiz).question_count, 40)
+
+    def test_invalid_item_rejects_whole_list(self):
+        payload = [question_payload(0), dict(question_payload(1), correct_option='E')]
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('correct_option', response.data[1])
+        self.assertFalse(Question.objects.exists())
+
+    def test_single_post_still_works(self):
+        response = self.client.post(self.url, question_payload(0, marks=3), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._quiz().total_marks, 3)
+
+    def test_bulk_patch(self):
+        self.client.post(self.url, [question_payload(i) for i in range(3)], format='json')
+        ids = list(Question.objects.values_list('id', flat=True))
+        stale_version = get_answer_key(self._quiz()).version
+
+        response = self.client.patch(
+            self.url, [{'id': ids[0], 'marks': 5}, {'id': ids[2], 'correct_option': 'D'}], format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['marks'] for row in response.data], [5, 1, 1])
+        self.assertEqual(Question.objects.get(id=ids[2]).correct_option, 'D')
+        answer_key = get_answer_key(self._quiz())
+        self.assertNotEqual(answer_key.version, stale_version)
+        self.assertEqual(answer_key.total_marks, 7)
+
+    def test_bulk_patch_requires_ids_from_this_quiz(self):
+        self.client.post(self.url, [question_payload(0)], format='json')
+        other_quiz = Quiz.objects.create(
+            title='Other', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        other_question = Question.objects.create(quiz=other_quiz, **question_payload(9))
+
+        missing_id = self.client.patch(self.url, [{'marks': 4}], format='json')
+        foreign_id = self.client.patch(self.url, [{'id': other_question.id, 'marks': 4}], format='json')
+
+        self.assertEqual(missing_id.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(foreign_id.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Question.objects.get(id=other_question.id).marks, 1)
+
+    def test_put_replaces_question_set(self):
+        self.client.post(self.url, [question_payload(i) for i in range(4)], format='json')
+        kept, *removed = Question.objects.values_list('id', flat=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                self.url,
+                [dict(question_payload(0, marks=4), id=kept), question_payload(7, marks=6)],
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertFalse(Question.objects.filter(id__in=removed).exists())
+        # The deleted questions are dropped from answer sheets in one pass
+        self.assertEqual(sum('FROM "quizzes_answerlayout"' in query['sql'] for query in queries.captured_queries), 1)
+        quiz = self._quiz()
+        self.assertEqual((quiz.total_questions, quiz.total_marks), (2, 10))
+
+    def test_other_teacher_cannot_edit(self):
+        other = User.objects.create_user(
+            username='other@test.com', email='other@test.com', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=other)
+
+        response = self.client.post(self.url, [question_payload(0)], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
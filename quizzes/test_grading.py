@@ -0,0 +1,136 @@
+"""
+Test that quiz submissions are graded with a constant number of queries
+"""
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, Question, QuizAttempt, QuizAnswer
+from quizzes.answer_key import clear_answer_key_cache, get_answer_key
+
+
+class SubmitQuizGradingTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.student = Student.objects.create(
+            name='Student', parent=self.parent, parent_name='Parent',
+            parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+        )
+        self.client.force_authenticate(user=self.parent)
+
+    def _create_quiz(self, question_count):
+        quiz = Quiz.objects.create(
+            title=f'Quiz {question_count}', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        questions = [
+            Question.objects.create(
+                quiz=quiz, question_text=f'Question {i}', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option='B', marks=2
+            )
+            for i in range(question_count)
+        ]
+        quiz.refresh_from_db()
+        return quiz, questions
+
+    def _submit(self, quiz, questions):
+        student = Student.objects.create(
+            name=f'Student {quiz.id}', parent=self.parent, parent_name='Parent',
+            parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+        )
+        QuizAttempt.objects.create(quiz=quiz, student=student, parent=self.parent, total_marks=quiz.total_marks)
+        answers = [
+            {'question_id': str(question.id), 'selected_option': 'B' if i % 2 == 0 else 'C'}
+            for i, question in enumerate(questions)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                f'/api/quizzes/{quiz.id}/submit/',
+                {'student_id': student.id, 'answers': answers},
+                format='json'
+            )
+        return response, len(ctx.captured_queries)
+
+    def test_submission_response_and_scoring(self):
+        quiz, questions = self._create_quiz(4)
+        response, _ = self._submit(quiz, questions)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['score'], 4)
+        self.assertEqual(response.data['total_marks'], 8)
+        self.assertEqual(response.data['percentage'], 50.0)
+        self.assertEqual(len(response.data['answers']), 4)
+        self.assertEqual(response.data['answers'][0]['question_text'], 'Question 0')
+        self.assertTrue(response.data['answers'][0]['is_correct'])
+        self.assertFalse(response.data['answers'][1]['is_correct'])
+        self.assertEqual(QuizAnswer.objects.filter(attempt_id=response.data['attempt_id']).count(), 4)
+        self.assertEqual(QuizAnswer.objects.filter(is_correct=True).count(), 2)
+
+    def test_query_count_is_independent_of_question_count(self):
+        small_quiz, small_questions = self._create_quiz(3)
+        large_quiz, large_questions = self._create_quiz(50)
+
+        small_response, small_queries = self._submit(small_quiz, small_questions)
+        large_response, large_queries = self._submit(large_quiz, large_questions)
+
+        self.assertEqual(small_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(large_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 17)
+
+    def test_current_cached_key_spares_question_reads(self):
+        quiz, questions = self._create_quiz(3)
+        clear_answer_key_cache()
+        get_answer_key(quiz)
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz, student=self.student, parent=self.parent, total_marks=quiz.total_marks
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                f'/api/quizzes/{quiz.id}/submit/',
+                {'student_id': self.student.id, 'answers': [{'question_id': str(questions[1].id), 'selected_option': 'B'}]},
+                format='json'
+            )
+            QuizAnswer.objects.create(attempt=attempt, question=questions[2], selected_option='B')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['answers'][0]['question_text'], 'Question 1')
+        self.assertEqual(response.data['answers'][0]['marks'], 2)
+        self.assertFalse([query for query in ctx.captured_queries if 'FROM "quizzes_question"' in query['sql']])
+        self.assertTrue(QuizAnswer.objects.get(attempt=attempt, question=questions[2]).is_correct)
+
+    def test_unknown_question_rejects_whole_submission(self):
+        quiz, questions = self._create_quiz(2)
+        other_quiz, other_questions = self._create_quiz(1)
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz, student=self.student, parent=self.parent, total_marks=quiz.total_marks
+        )
+        answers = [
+            {'question_id': str(questions[0].id), 'selected_option': 'B'},
+            {'question_id': str(other_questions[0].id), 'selected_option': 'B'},
+        ]
+
+        response = self.client.post(
+            f'/api/quizzes/{quiz.id}/submit/',
+            {'student_id': self.student.id, 'answers': answers},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(QuizAnswer.objects.filter(attempt=attempt).exists())
+        attempt.refresh_from_db()
+        self.assertFalse(attempt.is_completed)
@@ -0,0 +1,122 @@
+"""
+Test the quiz item-analysis statistics and their caching
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, Question, QuizAttempt, QuizAnswer
+
+
+# Selected option per attempt (rows) and question (columns); None is unanswered
+SHEETS = [
+    'AAAA', 'AAAB', 'AABB', 'ABCD', 'BBCC',
+    'BACD', 'AB D', 'CCCC', 'AAAA', 'DDDA',
+]
+
+
+class ItemAnalysisTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.quiz = Quiz.objects.create(
+            title='Quiz', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz, question_text=f'Question {i}', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option='A', marks=i + 1
+            )
+            for i in range(4)
+        ]
+        for sheet in SHEETS:
+            self._add_attempt(sheet)
+        self.client.force_authenticate(user=self.teacher)
+        self.url = f'/api/quizzes/{self.quiz.id}/analysis/'
+
+    def _add_attempt(self, sheet):
+        student = Student.objects.create(
+            name='Student', parent=self.parent, parent_name='Parent',
+            parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+        )
+        attempt = QuizAttempt.objects.create(quiz=self.quiz, student=student, parent=self.parent, total_marks=10)
+        for question, option in zip(self.questions, sheet):
+            if option != ' ':
+                QuizAnswer.objects.create(attempt=attempt, question=question, selected_option=option)
+        attempt.complete_attempt()
+
+    def _expected(self, index):
+        """Reference statistics for one question, computed with plain Python"""
+        marks = [q.marks for q in self.questions]
+        totals = [sum(m for m, option in zip(marks, sheet) if option == 'A') for sheet in SHEETS]
+        ranked = sorted(range(len(SHEETS)), key=lambda i: totals[i])
+        group = round(len(SHEETS) * 0.27)
+        correct = [sheet[index] == 'A' for sheet in SHEETS]
+
+        def share(rows):
+            return sum(correct[i] for i in rows) / len(rows)
+
+        return {
+            'difficulty': round(share(range(len(SHEETS))), 4),
+            'discrimination': round(share(ranked[-group:]) - share(ranked[:group]), 4),
+            'option_counts': {option: sum(sheet[index] == option for sheet in SHEETS) for option in 'ABCD'},
+            'unanswered': sum(sheet[index] == ' ' for sheet in SHEETS),
+        }
+
+    def test_statistics_match_reference(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['attempts_analysed'], 10)
+        self.assertEqual(response.data['group_size'], 3)
+        for index, row in enumerate(response.data['questions']):
+            self.assertEqual(row['question_id'], self.questions[index].id)
+            for field, value in self._expected(index).items():
+                self.assertEqual(row[field], value, (index, field))
+
+    def test_result_is_cached_until_an_attempt_completes(self):
+        self.client.get(self.url)
+
+        # quiz lookup and cache stamp only
+        with self.assertNumQueries(2):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data['attempts_analysed'], 10)
+
+        self._add_attempt('AAAA')
+        self.assertEqual(self.client.get(self.url).data['attempts_analysed'], 11)
+
+    def test_empty_quiz(self):
+        quiz = Quiz.objects.create(
+            title='Empty', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        Question.objects.create(
+            quiz=quiz, question_text='Question', option_a='1', option_b='2',
+            option_c='3', option_d='4', correct_option='A', marks=1
+        )
+
+        response = self.client.get(f'/api/quizzes/{quiz.id}/analysis/')
+
+        self.assertEqual(response.data['attempts_analysed'], 0)
+        self.assertIsNone(response.data['questions'][0]['difficulty'])
+        self.assertIsNone(response.data['questions'][0]['discrimination'])
+
+    def test_only_quiz_owner_can_view(self):
+        other = User.objects.create_user(
+            username='other@test.com', email='other@test.com', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,194 @@
+"""
+Test that the hot read queries of each endpoint are served by indexes
+
+Every SELECT an endpoint runs against a seeded database is passed through
+EXPLAIN QUERY PLAN. A plan that scans a whole table, or sorts through a
+temporary B-tree where the endpoint isn't expected to, fails the test.
+"""
+import unittest
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, Question, QuizAttempt
+from quizzes.grading import grade_submission
+from quizzes.rollups import rebuild_daily_rollups
+
+
+def query_plan(sql, params=None):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(sql, tables, allow_sort=False):
+    """Full table scans (and temp B-tree sorts unless allowed) in the plan of ``sql``"""
+    problems = []
+    for detail in query_plan(sql):
+        words = detail.split()
+        if words[0] == 'SCAN' and words[1] in tables:
+            problems.append(detail)
+        elif 'TEMP B-TREE' in detail and not allow_sort:
+            problems.append(detail)
+    return problems
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked against SQLite')
+class EndpointQueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teachers = [
+            User.objects.create_user(
+                username=f'teacher{t}@test.com', email=f'teacher{t}@test.com', password='testpass123', role='teacher'
+            )
+            for t in range(3)
+        ]
+        cls.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        cls.students = []
+        cls.quizzes = []
+        for t, teacher in enumerate(cls.teachers):
+            students = [
+                Student.objects.create(
+                    name=f'Student {t}-{s}', parent=cls.parent, parent_name='Parent',
+                    parent_email='parent@test.com', class_name=f'{t}{"AB"[s % 2]}', teacher=teacher
+                )
+                for s in range(4)
+            ]
+            cls.students.extend(students)
+            for q in range(3):
+                quiz = Quiz.objects.create(
+                    title=f'Quiz {t}-{q}', description='Seeded quiz', teacher=teacher, is_active=q != 2,
+                    time_limit_minutes=30, deadline=timezone.now() + timedelta(days=q - 1)
+                )
+                questions = [
+                    Question.objects.create(
+                        quiz=quiz, question_text=f'Question {i}', option_a='1', option_b='2',
+                        option_c='3', option_d='4', correct_option='B', marks=2
+                    )
+                    for i in range(4)
+                ]
+                quiz.refresh_from_db()
+                cls.quizzes.append(quiz)
+                for s, student in enumerate(students):
+                    attempt = QuizAttempt.objects.create(
+                        quiz=quiz, student=student, parent=cls.parent, total_marks=quiz.total_marks
+                    )
+                    if s == 3:
+                        continue
+                    _, attempt.score = grade_submission(quiz, attempt, [
+                        {'question_id': question.id, 'selected_option': 'B' if (i + s) % 3 else 'C'}
+                        for i, question in enumerate(questions)
+                    ])
+                    attempt.complete_attempt()
+        rebuild_daily_rollups()
+        cls.tables = set(connection.introspection.table_names())
+
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = self.teachers[0]
+        self.quiz = self.quizzes[0]
+        self.student = self.students[0]
+        self.attempt = QuizAttempt.objects.get(quiz=self.quiz, student=self.student)
+
+    def assertIndexedPlans(self, user, url, allow_sort=()):
+        """
+        Request ``url`` as ``user`` and check the plan of every SELECT it ran.
+
+        ``allow_sort`` lists table names whose queries may sort through a
+        temp B-tree, for result sets that merge several index ranges.
+        """
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+        selects = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects, url)
+        found = []
+        for sql in selects:
+            sortable = any(f'FROM "{table}"' in sql for table in allow_sort)
+            problems = plan_problems(sql, self.tables, allow_sort=sortable)
+            if problems:
+                found.append((sql, problems))
+        self.assertEqual(found, [], url)
+
+    def test_teacher_quiz_list(self):
+        self.assertIndexedPlans(self.teacher, '/api/quizzes/')
+
+    def test_teacher_question_list(self):
+        self.assertIndexedPlans(self.teacher, f'/api/quizzes/{self.quiz.id}/questions/')
+
+    def test_parent_quiz_list(self):
+        # Active quizzes of several teachers are merged, then sorted by creation date
+        self.assertIndexedPlans(self.parent, '/api/parent/quizzes/', allow_sort=['quizzes_quiz'])
+
+    def test_teacher_quiz_results(self):
+        self.assertIndexedPlans(self.teacher, f'/api/quizzes/{self.quiz.id}/results/')
+        self.assertIndexedPlans(self.teacher, f'/api/quizzes/{self.quiz.id}/results/?page=1&page_size=2')
+        self.assertIndexedPlans(self.teacher, f'/api/quizzes/{self.quiz.id}/results/?stream=ndjson')
+        self.assertIndexedPlans(self.teacher, f'/api/quizzes/{self.quiz.id}/results/?ordering=-percentage')
+
+    def test_parent_quiz_results(self):
+        self.assertIndexedPlans(self.parent, f'/api/quizzes/{self.quiz.id}/results/?student_id={self.student.id}')
+
+    def test_item_analysis(self):
+        self.assertIndexedPlans(self.teacher, f'/api/quizzes/{self.quiz.id}/analysis/')
+
+    def test_teacher_scores(self):
+        # Attempts of every student of the teacher are merged, then sorted by date
+        self.assertIndexedPlans(
+            self.teacher, f'/api/scores/teacher/{self.teacher.id}/students/', allow_sort=['quizzes_quizattempt']
+        )
+        self.assertIndexedPlans(self.teacher, f'/api/scores/teacher/{self.teacher.id}/student/{self.student.id}/')
+
+    def test_teacher_trends(self):
+        # Daily rollup rows are grouped by month and week, which no index can order
+        rollups = ['quizzes_teacherdailyrollup', 'quizzes_classdailyrollup']
+        self.assertIndexedPlans(self.teacher, f'/api/scores/teacher/{self.teacher.id}/trends/', allow_sort=rollups)
+        self.assertIndexedPlans(
+            self.teacher, f'/api/scores/teacher/{self.teacher.id}/trends/?class_name=0A', allow_sort=rollups
+        )
+
+    def test_teacher_students(self):
+        self.assertIndexedPlans(self.teacher, '/api/students/')
+        self.assertIndexedPlans(self.teacher, f'/api/teachers/{self.teacher.id}/students/')
+
+    def test_parent_children(self):
+        self.assertIndexedPlans(self.parent, '/api/parent/children/')
+        self.assertIndexedPlans(self.parent, '/api/parent/me/')
+
+    def test_parent_performance(self):
+        self.assertIndexedPlans(self.parent, '/api/parent/performance/')
+        self.assertIndexedPlans(
+            self.parent, f'/api/parent/performance/child/{self.student.id}/',
+            allow_sort=['quizzes_studentdailyrollup']
+        )
+        self.assertIndexedPlans(
+            self.parent, f'/api/parent/performance/child/{self.student.id}/quiz/{self.attempt.id}/'
+        )
+
+    def test_hot_filters_use_composite_indexes(self):
+        now = timezone.now()
+        plans = {
+            'attempt_student_timeline': QuizAttempt.objects.filter(student=self.student).order_by('-attempted_at'),
+            'attempt_quiz_completed': QuizAttempt.objects.filter(
+                quiz=self.quiz, is_completed=True
+            ).order_by('-attempted_at', '-pk'),
+            'attempt_quiz_percentage': QuizAttempt.objects.filter(quiz=self.quiz).order_by('-percentage'),
+            'quiz_teacher_open': Quiz.objects.filter(teacher__in=self.teachers, is_active=True, deadline__gt=now),
+            'quiz_teacher_created': Quiz.objects.filter(teacher=self.teacher).order_by('-created_at'),
+            'student_parent_teacher': Student.objects.filter(parent=self.parent).values('teacher_id').distinct(),
+        }
+        for index_name, queryset in plans.items():
+            plan = ' '.join(query_plan(*queryset.query.sql_with_params()))
+            self.assertIn(index_name, plan, index_name)
@@ -0,0 +1,117 @@
+"""
+Test streaming question-bank import and export
+"""
+import io
+import json
+import os
+import tempfile
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from quizzes.models import Quiz, Question
+from quizzes import question_bank
+
+
+class QuestionBankTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.source = self._create_quiz('Source')
+        self.target = self._create_quiz('Target')
+        for i in range(5):
+            Question.objects.create(
+                quiz=self.source, question_text=f'Question {i}, with "quotes"', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option='ABCD'[i % 4], marks=i + 1
+            )
+        self.client.force_authenticate(user=self.teacher)
+
+    def _create_quiz(self, title):
+        return Quiz.objects.create(
+            title=title, description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+
+    def _export(self, file_format):
+        response = self.client.get(f'/api/quizzes/{self.source.id}/questions/export/', {'file_format': file_format})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def _import(self, name, content):
+        return self.client.post(
+            f'/api/quizzes/{self.target.id}/questions/import/',
+            {'file': SimpleUploadedFile(name, content)},
+            format='multipart'
+        )
+
+    def _questions(self, quiz):
+        return list(Question.objects.filter(quiz=quiz).values_list(
+            'question_text', 'option_a', 'correct_option', 'marks'
+        ))
+
+    def test_csv_round_trip(self):
+        response = self._import('bank.csv', self._export('csv'))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(self._questions(self.target), self._questions(self.source))
+        target = Quiz.objects.get(pk=self.target.pk)
+        self.assertEqual((target.total_questions, target.total_marks), (5, 15))
+
+    def test_jsonl_round_trip(self):
+        content = self._export('jsonl')
+        self.assertEqual(json.loads(content.splitlines()[0])['question_text'], 'Question 0, with "quotes"')
+
+        response = self._import('bank.jsonl', content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self._questions(self.target), self._questions(self.source))
+
+    def test_invalid_record_rejects_whole_import(self):
+        lines = self._export('jsonl').splitlines()
+        bad = json.loads(lines[3])
+        bad['correct_option'] = 'Z'
+        lines[3] = json.dumps(bad).encode()
+
+        response = self._import('bank.jsonl', b'\n'.join(lines))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data['rows']), [4])
+        self.assertFalse(Question.objects.filter(quiz=self.target).exists())
+
+    def test_import_is_batched(self):
+        records = question_bank.read_records(io.StringIO(self._export('jsonl').decode()), 'jsonl')
+
+        # savepoint, three 2-row inserts, totals refresh, answer-key version, release
+        with self.assertNumQueries(7):
+            created = question_bank.import_questions(self.target, records, batch_size=2)
+
+        self.assertEqual(created, 5)
+
+    def test_management_commands(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.csv')
+            call_command('export_questions', self.source.id, output=path, stdout=io.StringIO())
+            call_command('import_questions', self.target.id, path, batch_size=2, stdout=io.StringIO())
+
+        self.assertEqual(self._questions(self.target), self._questions(self.source))
+        with self.assertRaises(CommandError):
+            call_command('import_questions', 999999, path)
+
+    def test_other_teacher_cannot_export(self):
+        other = User.objects.create_user(
+            username='other@test.com', email='other@test.com', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(f'/api/quizzes/{self.source.id}/questions/export/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,142 @@
+"""
+Test the teacher quiz results listing in its list, paginated and streaming modes
+"""
+import json
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, Question, QuizAttempt, QuizAnswer
+
+
+class TeacherQuizResultsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.quiz = Quiz.objects.create(
+            title='Quiz', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        self.questions = [
+            Question.objects.create(
+                quiz=self.quiz, question_text=f'Question {i}', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option='A', marks=1
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.teacher)
+
+    def _add_attempts(self, count):
+        for i in range(count):
+            student = Student.objects.create(
+                name=f'Student {i}', parent=self.parent, parent_name='Parent',
+                parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+            )
+            attempt = QuizAttempt.objects.create(
+                quiz=self.quiz, student=student, parent=self.parent, total_marks=3
+            )
+            for j, question in enumerate(self.questions):
+                QuizAnswer.objects.create(
+                    attempt=attempt, question=question, selected_option='A' if j <= i % 3 else 'B'
+                )
+            attempt.score = i % 3 + 1
+            attempt.complete_attempt()
+
+    def _url(self):
+        return f'/api/quizzes/{self.quiz.id}/results/'
+
+    def test_full_listing(self):
+        self._add_attempts(4)
+
+        response = self.client.get(self._url())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 4)
+        result = next(row for row in response.data if row['student_name'] == 'Student 1')
+        self.assertEqual(result['score'], 2)
+        self.assertEqual(result['percentage'], 66.67)
+        self.assertEqual([answer['question_text'] for answer in result['answers']],
+                         ['Question 0', 'Question 1', 'Question 2'])
+        self.assertEqual([answer['is_correct'] for answer in result['answers']], [True, True, False])
+
+    def test_query_count_is_independent_of_attempts(self):
+        self._add_attempts(2)
+        with CaptureQueriesContext(connection) as small_ctx:
+            self.client.get(self._url())
+
+        self._add_attempts(20)
+        with CaptureQueriesContext(connection) as large_ctx:
+            self.client.get(self._url())
+
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+
+    def test_paginated_listing(self):
+        self._add_attempts(5)
+
+        first = self.client.get(self._url(), {'page_size': 2})
+        last = self.client.get(self._url(), {'page_size': 2, 'page': 3})
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data['count'], 5)
+        self.assertEqual(len(first.data['results']), 2)
+        self.assertIsNotNone(first.data['next'])
+        self.assertEqual(len(last.data['results']), 1)
+        self.assertIsNone(last.data['next'])
+        self.assertEqual(len(last.data['results'][0]['answers']), 3)
+
+    def test_ndjson_stream(self):
+        self._add_attempts(3)
+
+        response = self.client.get(self._url(), {'stream': 'ndjson'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        results = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(
+            [result['attempt_id'] for result in results],
+            [row['attempt_id'] for row in self.client.get(self._url()).data]
+        )
+        self.assertEqual(len(results[0]['answers']), 3)
+
+    def test_other_teacher_is_denied(self):
+        other = User.objects.create_user(
+            username='other@test.com', email='other@test.com', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(self._url(), {'stream': 'ndjson'})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_percentage_filter_and_ordering(self):
+        self._add_attempts(6)
+
+        response = self.client.get(self._url(), {'ordering': '-percentage', 'min_percentage': 50})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['percentage'] for row in response.data], [100.0, 100.0, 66.67, 66.67])
+        self.assertEqual(self.client.get(self._url(), {'max_percentage': 'low'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_percentage_is_stored_on_save(self):
+        self._add_attempts(1)
+        attempt = QuizAttempt.objects.get(quiz=self.quiz)
+        self.assertEqual(attempt.percentage, 33.33)
+
+        attempt.score = 3
+        attempt.save(update_fields=['score'])
+
+        self.assertEqual(QuizAttempt.objects.filter(quiz=self.quiz, percentage=100.0).count(), 1)
@@ -0,0 +1,91 @@
+"""
+Test the stored question count and total marks on Quiz
+"""
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from quizzes.models import Quiz, Question
+
+
+class QuizTotalsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=self.teacher)
+        self.quiz = self._create_quiz('Quiz')
+
+    def _create_quiz(self, title):
+        return Quiz.objects.create(
+            title=title, description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+
+    def _add_question(self, quiz, marks):
+        return Question.objects.create(
+            quiz=quiz, question_text='Question', option_a='1', option_b='2',
+            option_c='3', option_d='4', correct_option='A', marks=marks
+        )
+
+    def _assert_totals(self, quiz, total_questions, total_marks):
+        quiz.refresh_from_db()
+        self.assertEqual(quiz.total_questions, total_questions)
+        self.assertEqual(quiz.total_marks, total_marks)
+
+    def test_totals_follow_question_changes(self):
+        first = self._add_question(self.quiz, 2)
+        second = self._add_question(self.quiz, 3)
+        self._assert_totals(self.quiz, 2, 5)
+
+        first.marks = 4
+        first.save()
+        self._assert_totals(self.quiz, 2, 7)
+
+        other_quiz = self._create_quiz('Other')
+        second.quiz = other_quiz
+        second.save()
+        self._assert_totals(self.quiz, 1, 4)
+        self._assert_totals(other_quiz, 1, 3)
+
+        Question.objects.filter(quiz=self.quiz).delete()
+        self._assert_totals(self.quiz, 0, 0)
+
+    def test_stale_quiz_save_keeps_totals(self):
+        stale_quiz = Quiz.objects.get(pk=self.quiz.pk)
+        self._add_question(self.quiz, 5)
+
+        stale_quiz.title = 'Renamed'
+        stale_quiz.save()
+
+        self._assert_totals(self.quiz, 1, 5)
+
+    def test_rebuild_command(self):
+        self._add_question(self.quiz, 2)
+        Quiz.objects.update(total_questions=0, total_marks=0)
+
+        call_command('rebuild_quiz_totals', stdout=open('/dev/null', 'w'))
+
+        self._assert_totals(self.quiz, 1, 2)
+
+    def test_quiz_list_query_count_is_independent_of_size(self):
+        def list_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/quizzes/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries)
+
+        self._add_question(self.quiz, 1)
+        single = list_queries()
+        for i in range(10):
+            self._add_question(self._create_quiz(f'Quiz {i}'), 2)
+
+        self.assertEqual(list_queries(), single)
+        self.assertEqual(single, 1)
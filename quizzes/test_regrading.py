@@ -0,0 +1,141 @@
+"""
+Test that attempts are regraded in bulk after a quiz's answer key changes
+"""
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, Question, QuizAttempt, QuizAnswer, StudentScoreSummary, StudentDailyRollup
+from quizzes.regrading import regrade_quiz
+
+
+class RegradeTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+
+    def _create_quiz(self, question_count=3):
+        quiz = Quiz.objects.create(
+            title='Regrade', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        questions = [
+            Question.objects.create(
+                quiz=quiz, question_text=f'Question {i}', option_a='1', option_b='2',
+                option_c='3', option_d='4', correct_option='B', marks=2
+            )
+            for i in range(question_count)
+        ]
+        quiz.refresh_from_db()
+        return quiz, questions
+
+    def _submit(self, quiz, questions, options):
+        student = Student.objects.create(
+            name=f'Student {Student.objects.count()}', parent=self.parent, parent_name='Parent',
+            parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+        )
+        attempt = QuizAttempt.objects.create(quiz=quiz, student=student, parent=self.parent, total_marks=quiz.total_marks)
+        self.client.force_authenticate(user=self.parent)
+        response = self.client.post(
+            f'/api/quizzes/{quiz.id}/submit/',
+            {'student_id': student.id, 'answers': [
+                {'question_id': str(question.id), 'selected_option': option}
+                for question, option in zip(questions, options)
+            ]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return attempt
+
+    def test_regrade_endpoint_applies_new_correct_option_and_marks(self):
+        quiz, questions = self._create_quiz()
+        first = self._submit(quiz, questions, ['B', 'C', 'B'])
+        second = self._submit(quiz, questions, ['C', 'C', 'A'])
+
+        # Bulk UPDATEs send no signals, so nothing is regraded until asked
+        Question.objects.filter(pk=questions[1].pk).update(correct_option='C', marks=5)
+
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.post(f'/api/quizzes/{quiz.id}/regrade/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['answers_checked'], 6)
+        self.assertEqual(response.data['attempts_updated'], 2)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.score, first.total_marks), (9, 9))
+        self.assertEqual((second.score, second.total_marks), (5, 9))
+        self.assertEqual(second.percentage, 55.56)
+        self.assertEqual(first.answer_counts, (3, 3))
+        self.assertEqual(bytes(second.correct_mask), b'\x02')
+        self.assertEqual(
+            list(QuizAnswer.objects.filter(attempt=second).order_by('question_id').values_list('is_correct', flat=True)),
+            [False, True, False]
+        )
+
+        summary = StudentScoreSummary.objects.get(student=first.student)
+        self.assertEqual((summary.total_score, summary.total_possible), (9, 9))
+        rollup = StudentDailyRollup.objects.get(student=second.student)
+        self.assertEqual(rollup.marks_earned, 5)
+
+        analysis = self.client.get(f'/api/quizzes/{quiz.id}/analysis/').data
+        self.assertEqual(analysis['questions'][1]['difficulty'], 1.0)
+
+    def test_regrade_is_limited_to_own_quizzes(self):
+        quiz, _ = self._create_quiz()
+        other_teacher = User.objects.create_user(
+            username='other@test.com', email='other@test.com', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=other_teacher)
+
+        response = self.client.post(f'/api/quizzes/{quiz.id}/regrade/')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_query_count_is_independent_of_attempt_count(self):
+        small_quiz, small_questions = self._create_quiz()
+        large_quiz, large_questions = self._create_quiz()
+        self._submit(small_quiz, small_questions, ['B', 'C', 'D'])
+        for i in range(8):
+            self._submit(large_quiz, large_questions, ['B', 'C', 'D'] if i % 2 else ['A', 'C', 'B'])
+        Question.objects.filter(quiz__in=[small_quiz, large_quiz], correct_option='B').update(correct_option='C')
+
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(regrade_quiz(small_quiz)['attempts'], 1)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(regrade_quiz(large_quiz)['attempts'], 8)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_unchanged_key_updates_nothing(self):
+        quiz, questions = self._create_quiz()
+        self._submit(quiz, questions, ['B', 'C', 'B'])
+
+        self.assertEqual(regrade_quiz(quiz)['attempts'], 0)
+
+    def test_management_command(self):
+        quiz, questions = self._create_quiz()
+        attempt = self._submit(quiz, questions, ['A', 'A', 'A'])
+        Question.objects.filter(quiz=quiz).update(correct_option='A')
+
+        out = StringIO()
+        call_command('regrade_quizzes', quiz.id, stdout=out)
+
+        self.assertIn('1 attempts updated', out.getvalue())
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 6)
@@ -0,0 +1,209 @@
+"""
+Test that incrementally maintained score rollups match a rebuild from history
+"""
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import (
+    Quiz, QuizAttempt, StudentScoreSummary, StudentDailyRollup, ClassDailyRollup, TeacherDailyRollup
+)
+from quizzes.rollups import rebuild_student_summaries, rebuild_daily_rollups
+
+
+SUMMARY_FIELDS = [
+    'total_attempts', 'completed_attempts', 'total_score', 'total_possible', 'percentage_sum',
+    'min_percentage', 'max_percentage', 'last_attempted_at', 'recent_percentages',
+]
+
+
+class StudentScoreSummaryTest(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.student = Student.objects.create(
+            name='Student', parent=self.parent, parent_name='Parent',
+            parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+        )
+        for i in range(9):
+            quiz = Quiz.objects.create(
+                title=f'Quiz {i}', description='Test quiz', teacher=self.teacher,
+                time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+            )
+            attempt = QuizAttempt.objects.create(
+                quiz=quiz, student=self.student, parent=self.parent, score=i % 4, total_marks=3 + i % 2
+            )
+            if i != 4:
+                attempt.complete_attempt()
+
+    def _snapshot(self):
+        summary = StudentScoreSummary.objects.get(student=self.student)
+        return {field: getattr(summary, field) for field in SUMMARY_FIELDS}
+
+    def test_incremental_summary_matches_rebuild(self):
+        incremental = self._snapshot()
+
+        self.assertEqual(incremental['total_attempts'], 9)
+        self.assertEqual(incremental['completed_attempts'], 8)
+        self.assertEqual(len(incremental['recent_percentages']), StudentScoreSummary.RECENT_SIZE)
+
+        StudentScoreSummary.objects.all().delete()
+        rebuild_student_summaries()
+        rebuilt = self._snapshot()
+        self.assertAlmostEqual(rebuilt.pop('percentage_sum'), incremental.pop('percentage_sum'))
+        self.assertEqual(rebuilt, incremental)
+
+    def test_start_keeps_latest_attempt_time(self):
+        later = timezone.now() + timedelta(hours=1)
+        StudentScoreSummary.objects.filter(student=self.student).update(last_attempted_at=later)
+        quiz = Quiz.objects.create(
+            title='Quiz 9', description='Test quiz', teacher=self.teacher,
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+
+        # One upsert each for the summary and the three daily rollups
+        with self.assertNumQueries(5):
+            QuizAttempt.objects.create(quiz=quiz, student=self.student, parent=self.parent, total_marks=3)
+
+        snapshot = self._snapshot()
+        self.assertEqual(snapshot['total_attempts'], 10)
+        self.assertEqual(snapshot['last_attempted_at'], later)
+
+    def test_completing_twice_counts_once(self):
+        attempt = QuizAttempt.objects.filter(is_completed=True).first()
+        attempt.complete_attempt()
+
+        self.assertEqual(self._snapshot()['completed_attempts'], 8)
+
+    def test_deleting_attempt_rebuilds_summary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            QuizAttempt.objects.filter(is_completed=False).delete()
+
+        self.assertEqual(self._snapshot()['total_attempts'], 8)
+
+    def test_rebuild_command(self):
+        StudentScoreSummary.objects.all().delete()
+
+        call_command('rebuild_score_summaries', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(self._snapshot()['completed_attempts'], 8)
+
+
+class DailyScoreRollupTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.students = [
+            Student.objects.create(
+                name=f'Student {i}', parent=self.parent, parent_name='Parent',
+                parent_email='parent@test.com', class_name=class_name, teacher=self.teacher
+            )
+            for i, class_name in enumerate(['5A', '5A', '5B'])
+        ]
+        for i in range(6):
+            quiz = Quiz.objects.create(
+                title=f'Quiz {i}', description='Test quiz', teacher=self.teacher,
+                time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+            )
+            for j, student in enumerate(self.students):
+                attempt = QuizAttempt.objects.create(
+                    quiz=quiz, student=student, parent=self.parent, score=(i + j) % 5, total_marks=4 + j
+                )
+                if (i + j) % 3:
+                    attempt.complete_attempt()
+        self.client.force_authenticate(user=self.teacher)
+
+    def _snapshot(self):
+        return {
+            model: sorted(
+                model.objects.values_list(*keys, 'date', 'attempts', 'completed_attempts',
+                                          'marks_earned', 'marks_possible', 'percentage_sum')
+            )
+            for model, keys in [
+                (StudentDailyRollup, ['student_id']),
+                (ClassDailyRollup, ['teacher_id', 'class_name']),
+                (TeacherDailyRollup, ['teacher_id']),
+            ]
+        }
+
+    def test_incremental_rollups_match_rebuild(self):
+        incremental = self._snapshot()
+
+        teacher_row = TeacherDailyRollup.objects.get(teacher=self.teacher)
+        self.assertEqual(teacher_row.attempts, 18)
+        self.assertEqual(teacher_row.completed_attempts, QuizAttempt.objects.filter(is_completed=True).count())
+        self.assertEqual(ClassDailyRollup.objects.count(), 2)
+
+        StudentDailyRollup.objects.all().delete()
+        ClassDailyRollup.objects.all().delete()
+        TeacherDailyRollup.objects.all().delete()
+        rebuild_daily_rollups()
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_rebuild_compacts_days_without_attempts(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        QuizAttempt.objects.filter(student=self.students[2]).update(
+            attempted_at=timezone.now() - timedelta(days=1)
+        )
+
+        call_command('rebuild_daily_rollups', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual(
+            set(StudentDailyRollup.objects.filter(student=self.students[2]).values_list('date', flat=True)),
+            {yesterday}
+        )
+        self.assertEqual(ClassDailyRollup.objects.get(class_name='5B').date, yesterday)
+        self.assertEqual(TeacherDailyRollup.objects.filter(teacher=self.teacher).count(), 2)
+
+    def test_deleting_attempt_rebuilds_its_day(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            QuizAttempt.objects.filter(student=self.students[0]).delete()
+            QuizAttempt.objects.filter(student=self.students[1]).first().delete()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(StudentDailyRollup.objects.filter(student=self.students[0]).exists())
+        self.assertEqual(TeacherDailyRollup.objects.get(teacher=self.teacher).attempts, 11)
+        repaired = self._snapshot()
+        rebuild_daily_rollups()
+        self.assertEqual(self._snapshot(), repaired)
+
+    def test_teacher_trends_endpoint(self):
+        completed = QuizAttempt.objects.filter(is_completed=True)
+        class_completed = [attempt for attempt in completed if attempt.student.class_name == '5B']
+
+        response = self.client.get(f'/api/scores/teacher/{self.teacher.id}/trends/')
+        class_response = self.client.get(f'/api/scores/teacher/{self.teacher.id}/trends/', {'class_name': '5B'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        month = response.json()['monthly'][0]
+        self.assertEqual(month['quizzes_taken'], completed.count())
+        self.assertEqual(
+            month['average_percentage'],
+            round(sum(attempt.percentage for attempt in completed) / completed.count(), 2)
+        )
+        self.assertEqual(len(response.json()['weekly']), 1)
+        self.assertEqual(class_response.json()['monthly'][0]['quizzes_taken'], len(class_completed))
+
+    def test_teacher_trends_are_private(self):
+        other = User.objects.create_user(
+            username='other@test.com', email='other@test.com', password='testpass123', role='teacher'
+        )
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(f'/api/scores/teacher/{self.teacher.id}/trends/')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
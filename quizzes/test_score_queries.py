@@ -0,0 +1,104 @@
+"""
+Test the teacher score summary output and its query budget
+"""
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import serializers, status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, QuizAttempt
+
+
+def legacy_student_summary(student):
+    """Per-student summary as the original view computed it, one row at a time"""
+    attempts = QuizAttempt.objects.filter(student=student)
+    completed = [attempt for attempt in attempts if attempt.is_completed]
+    if completed:
+        avg_percentage = sum(attempt.percentage for attempt in completed) / len(completed)
+        latest_date = attempts.order_by('-attempted_at').first().attempted_at
+    else:
+        avg_percentage = 0.0
+        latest_date = None
+    return {
+        'id': student.id,
+        'name': student.name,
+        'total_quizzes_attempted': attempts.count(),
+        'average_score_percentage': round(avg_percentage, 2),
+        'latest_quiz_date': latest_date,
+        'completed_attempts': len(completed),
+        'incomplete_attempts': attempts.count() - len(completed),
+    }
+
+
+class TeacherStudentsScoresTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123', role='teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.quizzes = [
+            Quiz.objects.create(
+                title=f'Quiz {i}', description='Test quiz', teacher=self.teacher,
+                time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+            )
+            for i in range(4)
+        ]
+        self.client.force_authenticate(user=self.teacher)
+
+    def _add_students(self, count):
+        for i in range(count):
+            student = Student.objects.create(
+                name=f'Student {i}', parent=self.parent, parent_name='Parent',
+                parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+            )
+            for j, quiz in enumerate(self.quizzes[:i % 5]):
+                attempt = QuizAttempt.objects.create(
+                    quiz=quiz, student=student, parent=self.parent,
+                    score=(i + j) % 7, total_marks=7 if j != 2 else 0
+                )
+                if j != 1:
+                    attempt.complete_attempt()
+
+    def _get(self):
+        return self.client.get(f'/api/scores/teacher/{self.teacher.id}/students/')
+
+    def test_summary_matches_legacy_computation(self):
+        self._add_students(6)
+
+        response = self._get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        students = {row['id']: row for row in response.json()['students']}
+        for student in Student.objects.all():
+            expected = legacy_student_summary(student)
+            row = students[student.id]
+            for field in ('name', 'total_quizzes_attempted', 'average_score_percentage',
+                          'completed_attempts', 'incomplete_attempts'):
+                self.assertEqual(row[field], expected[field], field)
+            expected_date = expected['latest_quiz_date']
+            self.assertEqual(
+                row['latest_quiz_date'],
+                serializers.DateTimeField().to_representation(expected_date) if expected_date else None
+            )
+        self.assertEqual(len(response.json()['all_quiz_attempts']), QuizAttempt.objects.count())
+
+    def test_query_budget_is_fixed(self):
+        self._add_students(3)
+        with self.assertNumQueries(2):
+            self.assertEqual(self._get().status_code, status.HTTP_200_OK)
+
+        self._add_students(12)
+        with self.assertNumQueries(2):
+            self.assertEqual(self._get().status_code, status.HTTP_200_OK)
+
+    def test_no_students(self):
+        response = self._get()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'message': 'No students found for this teacher.'})
@@ -0,0 +1,84 @@
+"""
+Test the synthetic load-test data generator
+"""
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, QuizAttempt, QuizAnswer, StudentScoreSummary
+from quizzes.answer_sheets import attempt_answers
+from quizzes.regrading import regrade_quizzes
+from quizzes.seeding import delete_seeded, seed_load
+
+
+SIZES = {'teachers': 2, 'parents': 6, 'students': 10, 'quizzes': 4, 'questions': 5}
+
+
+class SeedLoadTest(TestCase):
+    def _snapshot(self):
+        return sorted(
+            QuizAttempt.objects.values_list(
+                'student__name', 'quiz__title', 'score', 'total_marks', 'attempted_at', 'answer_sheet', 'is_completed'
+            )
+        )
+
+    def test_counts_and_consistency(self):
+        counts = seed_load(seed=3, **SIZES)
+
+        self.assertEqual(counts['teachers'], 2)
+        self.assertEqual(User.objects.filter(role='parent').count(), 6)
+        self.assertEqual(Student.objects.count(), 10)
+        self.assertEqual(Quiz.objects.count(), 4)
+        self.assertEqual(QuizAttempt.objects.count(), counts['attempts'])
+        self.assertEqual(QuizAnswer.objects.count(), counts['answers'])
+        self.assertEqual(StudentScoreSummary.objects.count(), 10)
+
+        # Every user gets the same precomputed hash, and it is a real one
+        self.assertEqual(User.objects.values('password').distinct().count(), 1)
+        self.assertTrue(User.objects.first().check_password('loadtest123'))
+
+        for attempt in QuizAttempt.objects.filter(is_completed=True).select_related('quiz'):
+            answers = attempt_answers(attempt)
+            self.assertEqual(attempt.score, sum(answer.question.marks for answer in answers if answer.is_correct))
+            self.assertEqual(attempt.total_marks, attempt.quiz.total_marks)
+            self.assertEqual(len(answers), attempt.answers.count())
+            self.assertLessEqual(attempt.attempted_at, attempt.completed_at)
+
+        # Sheets were graded against each quiz's own questions
+        self.assertEqual(regrade_quizzes(Quiz.objects.values_list('pk', flat=True))['attempts'], 0)
+
+        # Generated creation times are stored, and rows saved later are still stamped
+        self.assertLess(Quiz.objects.earliest('created_at').created_at, timezone.now() - timedelta(days=1))
+        quiz = Quiz.objects.create(
+            title='New', description='Test quiz', teacher=User.objects.filter(role='teacher').first(),
+            time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+        )
+        self.assertGreater(quiz.created_at, timezone.now() - timedelta(minutes=1))
+
+    def test_same_seed_gives_same_data(self):
+        seed_load(seed=5, **SIZES)
+        first = self._snapshot()
+
+        delete_seeded()
+        self.assertFalse(User.objects.exists())
+        seed_load(seed=5, **SIZES)
+
+        self.assertEqual(self._snapshot(), first)
+
+        delete_seeded()
+        seed_load(seed=6, **SIZES)
+        self.assertNotEqual(self._snapshot(), first)
+
+    def test_command_without_answer_rows(self):
+        out = StringIO()
+        call_command(
+            'seed_load', '--preset', 'small', '--students', '8', '--quizzes', '3', '--no-answer-rows', stdout=out
+        )
+
+        self.assertIn('8 students', out.getvalue())
+        self.assertFalse(QuizAnswer.objects.exists())
+        self.assertTrue(QuizAttempt.objects.exclude(answer_sheet='').exists())
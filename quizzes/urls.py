@@ -8,6 +8,8 @@ urlpatterns = [
 
     # Question management
     path('quizzes/<int:quiz_id>/questions/', views.QuestionListCreateView.as_view(), name='question-list-create'),
+    path('quizzes/<int:quiz_id>/questions/export/', views.export_quiz_questions, name='question-export'),
+    path('quizzes/<int:quiz_id>/questions/import/', views.import_quiz_questions, name='question-import'),
 
     # Parent quiz access
     path('parent/quizzes/', views.ParentQuizListView.as_view(), name='parent-quiz-list'),
@@ -16,8 +18,11 @@ urlpatterns = [
     path('quizzes/<int:quiz_id>/attempt/', views.start_quiz_attempt, name='start-quiz-attempt'),
     path('quizzes/<int:quiz_id>/submit/', views.submit_quiz, name='submit-quiz'),
     path('quizzes/<int:quiz_id>/results/', views.get_quiz_results, name='quiz-results'),
+    path('quizzes/<int:quiz_id>/analysis/', views.quiz_item_analysis, name='quiz-item-analysis'),
+    path('quizzes/<int:quiz_id>/regrade/', views.regrade_quiz_attempts, name='quiz-regrade'),
 
     # Score endpoints for teachers
     path('scores/teacher/<int:teacher_id>/students/', views.teacher_students_scores, name='teacher-students-scores'),
     path('scores/teacher/<int:teacher_id>/student/<int:student_id>/', views.teacher_student_detailed_scores, name='teacher-student-detailed-scores'),
+    path('scores/teacher/<int:teacher_id>/trends/', views.teacher_score_trends, name='teacher-score-trends'),
 ]
@@ -1,17 +1,33 @@
+import csv
+import json
+from itertools import islice
+
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.encoders import JSONEncoder
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db import transaction
 from django.db.models import Q
 
-from .models import Quiz, Question, QuizAttempt, QuizAnswer
+from .models import (
+    Quiz, Question, QuizAttempt, StudentScoreSummary, ClassDailyRollup, TeacherDailyRollup
+)
+from .grading import GradingError, grade_submission
+from .answer_sheets import attempt_answers, load_answers
+from .rollups import score_trends
+from .item_analysis import get_item_analysis
+from .regrading import regrade_quiz
+from .signals import question_batch
+from . import question_bank
 from .serializers import (
     QuizListSerializer, QuizDetailSerializer, QuizCreateSerializer, QuizUpdateSerializer,
-    QuestionSerializer, QuestionCreateSerializer, QuizAttemptSerializer,
+    QuestionSerializer, QuestionCreateSerializer, QuestionEditSerializer, QuizAttemptSerializer,
     QuizSubmissionSerializer, QuizResultSerializer, ParentQuizListSerializer,
-    QuizAnswerSerializer, StudentScoreSummarySerializer, QuizAttemptDetailSerializer,
+    StudentScoreSummarySerializer, QuizAttemptDetailSerializer,
     StudentDetailedScoresSerializer, AllQuizzesAttemptedSerializer
 )
 from students.models import Student
@@ -43,7 +59,7 @@ class QuizListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         # Return only quizzes created by the current teacher
-        return Quiz.objects.filter(teacher=self.request.user)
+        return Quiz.objects.filter(teacher=self.request.user).select_related('teacher')
 
 
 class QuizDetailUpdateView(generics.RetrieveUpdateAPIView):
@@ -60,13 +76,15 @@ class QuizDetailUpdateView(generics.RetrieveUpdateAPIView):
 
     def get_queryset(self):
         # Return only quizzes created by the current teacher
-        return Quiz.objects.filter(teacher=self.request.user)
+        return Quiz.objects.filter(teacher=self.request.user).select_related('teacher')
 
 
 class QuestionListCreateView(generics.ListCreateAPIView):
     """
     GET /api/quizzes/{quiz_id}/questions/ - Get all questions for a quiz
-    POST /api/quizzes/{quiz_id}/questions/ - Teacher adds questions to a quiz
+    POST /api/quizzes/{quiz_id}/questions/ - Teacher adds one question, or a list of them
+    PATCH /api/quizzes/{quiz_id}/questions/ - Teacher updates several questions by id
+    PUT /api/quizzes/{quiz_id}/questions/ - Teacher replaces the whole question set
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -91,10 +109,104 @@ class QuestionListCreateView(generics.ListCreateAPIView):
 
         return Question.objects.filter(quiz=quiz)
 
+    def get_teacher_quiz(self):
+        return get_object_or_404(Quiz, id=self.kwargs['quiz_id'], teacher=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        # A list is validated as a whole and inserted with one bulk query
+        quiz = self.get_teacher_quiz()
+        serializer = QuestionCreateSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic(), question_batch(quiz.pk):
+            questions = serializer.save(quiz=quiz)
+
+        data = QuestionSerializer(questions, many=True, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
     def perform_create(self, serializer):
-        quiz_id = self.kwargs['quiz_id']
-        quiz = get_object_or_404(Quiz, id=quiz_id, teacher=self.request.user)
-        serializer.save(quiz=quiz)
+        serializer.save(quiz=self.get_teacher_quiz())
+
+    def patch(self, request, *args, **kwargs):
+        return self.bulk_edit(request, partial=True)
+
+    def put(self, request, *args, **kwargs):
+        return self.bulk_edit(request, partial=False)
+
+    def bulk_edit(self, request, partial):
+        quiz = self.get_teacher_quiz()
+        with transaction.atomic(), question_batch(quiz.pk):
+            questions = list(Question.objects.select_for_update().filter(quiz=quiz))
+            serializer = QuestionEditSerializer(
+                questions, data=request.data, many=True, partial=partial, context={'quiz': quiz}
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        data = QuestionSerializer(
+            Question.objects.filter(quiz=quiz), many=True, context=self.get_serializer_context()
+        ).data
+        return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsTeacher])
+def export_quiz_questions(request, quiz_id):
+    """
+    GET /api/quizzes/{quiz_id}/questions/export/?file_format=csv|jsonl
+    Stream the quiz's questions as a CSV or JSONL download
+    """
+    quiz = get_object_or_404(Quiz, id=quiz_id, teacher=request.user)
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in question_bank.FORMATS:
+        return Response(
+            {'error': f"file_format must be one of: {', '.join(question_bank.FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    response = StreamingHttpResponse(
+        question_bank.export_questions(quiz, file_format),
+        content_type=question_bank.CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = f'attachment; filename="quiz-{quiz.id}-questions.{file_format}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsTeacher])
+def import_quiz_questions(request, quiz_id):
+    """
+    POST /api/quizzes/{quiz_id}/questions/import/ - Teacher uploads a CSV or JSONL question bank
+    The upload goes in the "file" field; its extension picks the format unless file_format is given.
+    """
+    quiz = get_object_or_404(Quiz, id=quiz_id, teacher=request.user)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response(
+            {'error': 'A CSV or JSONL file is required.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    file_format = request.data.get('file_format') or question_bank.guess_format(upload.name)
+    if file_format not in question_bank.FORMATS:
+        return Response(
+            {'error': f"file_format must be one of: {', '.join(question_bank.FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        created = question_bank.import_questions(
+            quiz, question_bank.read_records(question_bank.open_upload(upload), file_format)
+        )
+    except (question_bank.QuestionBankError, UnicodeDecodeError, csv.Error) as exc:
+        error = {'error': str(exc)}
+        if getattr(exc, 'rows', None):
+            error['rows'] = exc.rows
+        return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'quiz_id': quiz.id, 'created': created}, status=status.HTTP_201_CREATED)
 
 
 class ParentQuizListView(generics.ListAPIView):
@@ -109,9 +221,6 @@ class ParentQuizListView(generics.ListAPIView):
         parent = self.request.user
         children = Student.objects.filter(parent=parent)
 
-        if not children.exists():
-            return Quiz.objects.none()
-
         # Get quizzes taught by teachers of the parent's children that are active and not past deadline
         teacher_ids = children.values_list('teacher_id', flat=True).distinct()
 
@@ -119,7 +228,7 @@ class ParentQuizListView(generics.ListAPIView):
             teacher_id__in=teacher_ids,
             is_active=True,
             deadline__gt=timezone.now()
-        ).distinct()
+        ).select_related('teacher').distinct()
 
 
 @api_view(['POST'])
@@ -162,7 +271,7 @@ def start_quiz_attempt(request, quiz_id):
         )
 
     # Check if student is taught by the quiz teacher
-    if student.teacher != quiz.teacher:
+    if student.teacher_id != quiz.teacher_id:
         return Response(
             {'error': 'This quiz is not available for this student.'},
             status=status.HTTP_400_BAD_REQUEST
@@ -215,7 +324,7 @@ def submit_quiz(request, quiz_id):
 
     # Get the quiz attempt
     try:
-        attempt = QuizAttempt.objects.get(quiz=quiz, student=student, parent=parent)
+        attempt = QuizAttempt.objects.select_related('student').get(quiz=quiz, student=student, parent=parent)
     except QuizAttempt.DoesNotExist:
         return Response(
             {'error': 'Quiz attempt not found. Please start the quiz first.'},
@@ -239,39 +348,14 @@ def submit_quiz(request, quiz_id):
     answers_data = submission_serializer.validated_data['answers']
 
     with transaction.atomic():
-        total_score = 0
-        quiz_answers = []
-
-        # Process each answer
-        for answer_data in answers_data:
-            question_id = int(answer_data['question_id'])
-            selected_option = answer_data['selected_option']
-
-            try:
-                question = Question.objects.get(id=question_id, quiz=quiz)
-            except Question.DoesNotExist:
-                return Response(
-                    {'error': f'Question {question_id} not found in this quiz.'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Create or update quiz answer
-            quiz_answer, created = QuizAnswer.objects.get_or_create(
-                attempt=attempt,
-                question=question,
-                defaults={'selected_option': selected_option}
+        try:
+            quiz_answers, total_score = grade_submission(quiz, attempt, answers_data)
+        except GradingError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-            if not created:
-                quiz_answer.selected_option = selected_option
-                quiz_answer.save()
-
-            # Add to score if correct
-            if quiz_answer.is_correct:
-                total_score += question.marks
-
-            quiz_answers.append(quiz_answer)
-
         # Update attempt with score and mark as completed
         attempt.score = total_score
         attempt.complete_attempt()
@@ -286,20 +370,56 @@ def submit_quiz(request, quiz_id):
         'percentage': attempt.percentage,
         'attempted_at': attempt.attempted_at,
         'completed_at': attempt.completed_at,
-        'answers': QuizAnswerSerializer(quiz_answers, many=True).data
+        'answers': quiz_answers
     }
 
-    serializer = QuizResultSerializer(data=result_data)
-    serializer.is_valid()
+    # Render the graded answers directly; validating them as input would
+    # look every question up again
+    serializer = QuizResultSerializer(result_data)
 
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+# Attempts loaded (with their answers) per round trip when listing quiz results
+QUIZ_RESULTS_CHUNK_SIZE = 100
+
+
+class QuizResultsPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def _quiz_results(quiz, attempts, chunk_size=QUIZ_RESULTS_CHUNK_SIZE):
+    """Yield the serialized result of each attempt, decoding answer sheets a chunk at a time"""
+    questions = Question.objects.filter(quiz=quiz).in_bulk()
+    attempts = iter(attempts)
+    while chunk := list(islice(attempts, chunk_size)):
+        answers = load_answers(chunk, questions)
+        for attempt in chunk:
+            yield QuizResultSerializer({
+                'attempt_id': attempt.id,
+                'quiz_title': quiz.title,
+                'student_name': attempt.student.name,
+                'score': attempt.score,
+                'total_marks': attempt.total_marks,
+                'percentage': attempt.percentage,
+                'attempted_at': attempt.attempted_at,
+                'completed_at': attempt.completed_at,
+                'answers': answers[attempt.pk]
+            }).data
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_quiz_results(request, quiz_id):
     """
     GET /api/quizzes/{id}/results/ - Get quiz results for a specific attempt
+
+    Teachers get every completed attempt. Add ?page=N (and optionally
+    &page_size=M) for a paginated response, or ?stream=ndjson to stream one
+    result per line. ?min_percentage= / ?max_percentage= filter and
+    ?ordering=percentage or -percentage sorts on the stored percentage.
     """
     quiz = get_object_or_404(Quiz, id=quiz_id)
     user = request.user
@@ -312,25 +432,36 @@ def get_quiz_results(request, quiz_id):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Get all attempts for this quiz
-        attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True)
-        results = []
+        attempts = QuizAttempt.objects.filter(quiz=quiz, is_completed=True).select_related('student')
+        try:
+            for param, lookup in (('min_percentage', 'percentage__gte'), ('max_percentage', 'percentage__lte')):
+                if request.query_params.get(param):
+                    attempts = attempts.filter(**{lookup: float(request.query_params[param])})
+        except ValueError:
+            return Response(
+                {'error': 'min_percentage and max_percentage must be numbers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ordering = request.query_params.get('ordering')
+        if ordering in ('percentage', '-percentage'):
+            attempts = attempts.order_by(ordering, '-pk')
+        else:
+            attempts = attempts.order_by('-attempted_at', '-pk')
 
-        for attempt in attempts:
-            answers = QuizAnswer.objects.filter(attempt=attempt)
-            result_data = {
-                'attempt_id': attempt.id,
-                'quiz_title': quiz.title,
-                'student_name': attempt.student.name,
-                'score': attempt.score,
-                'total_marks': attempt.total_marks,
-                'percentage': attempt.percentage,
-                'attempted_at': attempt.attempted_at,
-                'completed_at': attempt.completed_at,
-                'answers': QuizAnswerSerializer(answers, many=True).data
-            }
-            results.append(result_data)
+        if request.query_params.get('stream') == 'ndjson':
+            # One JSON document per line, written as each chunk of attempts is loaded
+            lines = (
+                json.dumps(result, cls=JSONEncoder) + '\n'
+                for result in _quiz_results(quiz, attempts.iterator(chunk_size=QUIZ_RESULTS_CHUNK_SIZE))
+            )
+            return StreamingHttpResponse(lines, content_type='application/x-ndjson')
 
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = QuizResultsPagination()
+            page = paginator.paginate_queryset(attempts, request)
+            return paginator.get_paginated_response(list(_quiz_results(quiz, page)))
+
+        results = list(_quiz_results(quiz, attempts.iterator(chunk_size=QUIZ_RESULTS_CHUNK_SIZE)))
         return Response(results, status=status.HTTP_200_OK)
 
     elif user.role == 'parent':
@@ -358,7 +489,6 @@ def get_quiz_results(request, quiz_id):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        answers = QuizAnswer.objects.filter(attempt=attempt)
         result_data = {
             'attempt_id': attempt.id,
             'quiz_title': quiz.title,
@@ -368,11 +498,10 @@ def get_quiz_results(request, quiz_id):
             'percentage': attempt.percentage,
             'attempted_at': attempt.attempted_at,
             'completed_at': attempt.completed_at,
-            'answers': QuizAnswerSerializer(answers, many=True).data
+            'answers': attempt_answers(attempt)
         }
 
-        serializer = QuizResultSerializer(data=result_data)
-        serializer.is_valid()
+        serializer = QuizResultSerializer(result_data)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -397,10 +526,12 @@ def teacher_students_scores(request, teacher_id):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Get all students assigned to this teacher
-    students = Student.objects.filter(teacher_id=teacher_id)
+    # Get all students assigned to this teacher with their score summaries
+    students = list(
+        Student.objects.filter(teacher_id=teacher_id).select_related('score_summary').order_by('pk')
+    )
 
-    if not students.exists():
+    if not students:
         return Response(
             {'message': 'No students found for this teacher.'},
             status=status.HTTP_200_OK
@@ -409,41 +540,26 @@ def teacher_students_scores(request, teacher_id):
     students_data = []
 
     for student in students:
-        # Get all quiz attempts for this student
-        attempts = QuizAttempt.objects.filter(student=student)
-
-        # Calculate statistics
-        total_attempts = attempts.count()
-        completed_attempts = attempts.filter(is_completed=True).count()
-        incomplete_attempts = total_attempts - completed_attempts
-
-        # Calculate average percentage for completed attempts
-        completed_quiz_attempts = attempts.filter(is_completed=True)
-        if completed_quiz_attempts.exists():
-            avg_percentage = sum(attempt.percentage for attempt in completed_quiz_attempts) / completed_quiz_attempts.count()
-            latest_attempt = attempts.order_by('-attempted_at').first()
-            latest_date = latest_attempt.attempted_at if latest_attempt else None
-        else:
-            avg_percentage = 0.0
-            latest_date = None
+        summary = StudentScoreSummary.for_student(student)
+        has_completed = summary.completed_attempts > 0
 
         student_data = {
             'id': student.id,
             'name': student.name,
             'parent_email': student.parent_email,
             'class_name': student.class_name,
-            'total_quizzes_attempted': total_attempts,
-            'average_score_percentage': round(avg_percentage, 2),
-            'latest_quiz_date': latest_date,
-            'completed_attempts': completed_attempts,
-            'incomplete_attempts': incomplete_attempts
+            'total_quizzes_attempted': summary.total_attempts,
+            'average_score_percentage': round(summary.average_percentage, 2),
+            'latest_quiz_date': summary.last_attempted_at if has_completed else None,
+            'completed_attempts': summary.completed_attempts,
+            'incomplete_attempts': summary.incomplete_attempts
         }
         students_data.append(student_data)
 
     # Get all quiz attempts by all students under this teacher for the overview section
     all_attempts = QuizAttempt.objects.filter(
         student__teacher_id=teacher_id
-    ).order_by('-attempted_at')
+    ).select_related('student', 'quiz').order_by('-attempted_at')
 
     response_data = {
         'students': StudentScoreSummarySerializer(students_data, many=True).data,
@@ -477,7 +593,7 @@ def teacher_student_detailed_scores(request, teacher_id, student_id):
         )
 
     # Get all quiz attempts for this student
-    quiz_attempts = QuizAttempt.objects.filter(student=student).order_by('-attempted_at')
+    quiz_attempts = QuizAttempt.objects.filter(student=student).select_related('quiz').order_by('-attempted_at')
 
     response_data = {
         'student_id': student.id,
@@ -488,3 +604,58 @@ def teacher_student_detailed_scores(request, teacher_id, student_id):
     }
 
     return Response(response_data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsTeacher])
+def teacher_score_trends(request, teacher_id):
+    """
+    GET /api/scores/teacher/{teacher_id}/trends/?class_name=5A
+    Monthly and weekly score trends across a teacher's students, optionally for one class
+    """
+    if request.user.id != teacher_id:
+        return Response(
+            {'error': 'You can only access your own students\' scores.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    class_name = request.query_params.get('class_name')
+    if class_name:
+        rollups = ClassDailyRollup.objects.filter(teacher_id=teacher_id, class_name=class_name)
+    else:
+        rollups = TeacherDailyRollup.objects.filter(teacher_id=teacher_id)
+
+    response_data = {
+        'teacher_id': teacher_id,
+        'class_name': class_name,
+        **score_trends(rollups)
+    }
+
+    return Response(response_data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsTeacher])
+def quiz_item_analysis(request, quiz_id):
+    """
+    GET /api/quizzes/{id}/analysis/
+    Per-question difficulty, discrimination index and option counts over completed attempts
+    """
+    quiz = get_object_or_404(Quiz, id=quiz_id, teacher=request.user)
+    return Response(get_item_analysis(quiz), status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsTeacher])
+def regrade_quiz_attempts(request, quiz_id):
+    """
+    POST /api/quizzes/{id}/regrade/
+    Recompute answer correctness and attempt scores against the quiz's current questions
+    """
+    quiz = get_object_or_404(Quiz, id=quiz_id, teacher=request.user)
+    result = regrade_quiz(quiz)
+    return Response({
+        'message': f"Regraded {quiz.title}.",
+        'answers_checked': result['answers'],
+        'attempts_updated': result['attempts'],
+    }, status=status.HTTP_200_OK)
@@ -10,5 +10,11 @@ class Student(models.Model):
 	teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='students', limit_choices_to={'role': 'teacher'})
 	temp_password = models.CharField(max_length=64, blank=True, null=True)
 
+	class Meta:
+		indexes = [
+			# A parent's children by teacher, e.g. the teachers whose quizzes a parent sees
+			models.Index(fields=['parent', 'teacher'], name='student_parent_teacher'),
+		]
+
 	def __str__(self) -> str:
 		return f"{self.name} ({self.class_name})"
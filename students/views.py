@@ -22,14 +22,14 @@ class ParentChildrenListView(APIView):
 
     def get(self, request):
         # Get children for the current parent
-        children = Student.objects.filter(parent=request.user)
+        children = Student.objects.filter(parent=request.user).select_related('teacher')
         serializer = ParentChildrenSerializer(children, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class StudentListCreateView(APIView):
 	permission_classes = [IsAuthenticated]
 	def get(self, request):
-		students = Student.objects.filter(teacher=request.user)
+		students = Student.objects.filter(teacher=request.user).select_related('parent')
 		return Response(StudentSerializer(students, many=True).data)
 	def post(self, request):
 		serializer = StudentCreateSerializer(data=request.data, context={"request": request})
@@ -41,7 +41,7 @@ class StudentRetrieveUpdateDeleteView(APIView):
 	permission_classes = [IsAuthenticated]
 	def get(self, request, pk):
 		try:
-			student = Student.objects.get(pk=pk, teacher=request.user)
+			student = Student.objects.select_related('parent').get(pk=pk, teacher=request.user)
 		except Student.DoesNotExist:
 			return Response({"error": "Not found"}, status=404)
 		return Response(StudentSerializer(student).data)
@@ -75,14 +75,23 @@ class QuizAttemptPerformanceSerializer(serializers.ModelSerializer):
             'is_completed', 'time_taken_display', 'performance_level'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join the quiz and its teacher; answer counts come from the attempt's packed sheet"""
+        return queryset.select_related('quiz__teacher')
+
+    def _answer_counts(self, obj):
+        return obj.answer_counts
+
     def get_correct_answers(self, obj):
-        return obj.answers.filter(is_correct=True).count()
+        return self._answer_counts(obj)[1]
 
     def get_incorrect_answers(self, obj):
-        return obj.answers.filter(is_correct=False).count()
+        answered_count, correct_count = self._answer_counts(obj)
+        return answered_count - correct_count
 
     def get_unanswered_questions(self, obj):
-        answered_count = obj.answers.count()
+        answered_count = self._answer_counts(obj)[0]
         total_questions = obj.quiz.total_questions
         return total_questions - answered_count
 
@@ -0,0 +1,183 @@
+"""
+Test the parent performance overview output and its query budget
+"""
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from users.models import User
+from students.models import Student
+from quizzes.models import Quiz, Question, QuizAttempt, QuizAnswer
+from quizzes.rollups import rebuild_daily_rollups
+
+
+class ParentPerformanceTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = User.objects.create_user(
+            username='teacher@test.com', email='teacher@test.com', password='testpass123',
+            role='teacher', first_name='Tina', last_name='Teacher'
+        )
+        self.parent = User.objects.create_user(
+            username='parent@test.com', email='parent@test.com', password='testpass123', role='parent'
+        )
+        self.client.force_authenticate(user=self.parent)
+
+    def _add_child(self, name, results):
+        """Create a child with one completed attempt per (score, total_marks) pair, oldest first"""
+        child = Student.objects.create(
+            name=name, parent=self.parent, parent_name='Parent',
+            parent_email='parent@test.com', class_name='5A', teacher=self.teacher
+        )
+        start = timezone.now() - timedelta(days=len(results))
+        for i, (score, total_marks) in enumerate(results):
+            quiz = Quiz.objects.create(
+                title=f'{name} quiz {i}', description='Test quiz', teacher=self.teacher,
+                time_limit_minutes=30, deadline=timezone.now() + timedelta(days=1)
+            )
+            attempt = QuizAttempt.objects.create(
+                quiz=quiz, student=child, parent=self.parent, score=score, total_marks=total_marks
+            )
+            QuizAttempt.objects.filter(pk=attempt.pk).update(attempted_at=start + timedelta(days=i))
+            QuizAttempt.objects.get(pk=attempt.pk).complete_attempt()
+        # Back-dating with update() bypasses the incremental daily rollups
+        rebuild_daily_rollups()
+        return child
+
+
+class ParentAllChildrenPerformanceTest(ParentPerformanceTestCase):
+    def _get(self):
+        response = self.client.get('/api/parent/performance/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_statistics_use_percentages(self):
+        # 9/20 is the highest raw score but the lowest percentage
+        self._add_child('Asha', [(4, 5), (9, 20), (3, 4), (5, 5), (5, 5), (5, 5)])
+
+        data = self._get()
+
+        child = data['children_performance'][0]
+        self.assertEqual(child['highest_score_percentage'], 100.0)
+        self.assertEqual(child['lowest_score_percentage'], 45.0)
+        self.assertEqual(child['total_marks_earned'], 31)
+        self.assertEqual(child['total_possible_marks'], 44)
+        self.assertEqual(child['average_score_percentage'], round(31 / 44 * 100, 2))
+        self.assertEqual(child['recent_performance_trend'], 'improving')
+        self.assertEqual(child['incomplete_quizzes'], 0)
+        self.assertEqual(child['teacher_name'], 'Tina Teacher')
+        self.assertEqual(data['overall_statistics']['total_quiz_attempts'], 6)
+
+    def test_query_budget_is_fixed(self):
+        self._add_child('Asha', [(1, 2), (2, 2), (1, 2)])
+        with self.assertNumQueries(1):
+            self._get()
+
+        for i in range(4):
+            self._add_child(f'Child {i}', [(i, 5)] * (i + 3))
+        with self.assertNumQueries(1):
+            data = self._get()
+        self.assertEqual(data['children_count'], 5)
+        self.assertEqual(len(data['children_performance']), 5)
+
+    def test_no_children(self):
+        self.assertEqual(self._get(), {
+            'children_count': 0,
+            'overall_statistics': {},
+            'children_performance': []
+        })
+
+
+class ParentChildPerformanceDetailTest(ParentPerformanceTestCase):
+    def _get_detail(self, child):
+        response = self.client.get(f'/api/parent/performance/child/{child.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def _answer_all(self, child, correct_count):
+        for attempt in child.quiz_attempts.all():
+            for i in range(3):
+                question = Question.objects.create(
+                    quiz=attempt.quiz, question_text='Question', option_a='1', option_b='2',
+                    option_c='3', option_d='4', correct_option='A', marks=1
+                )
+                if i < 2:
+                    QuizAnswer.objects.create(
+                        attempt=attempt, question=question,
+                        selected_option='A' if i < correct_count else 'B'
+                    )
+
+    def test_attempt_counts_come_from_annotations(self):
+        child = self._add_child('Asha', [(1, 3), (2, 3)])
+        self._answer_all(child, correct_count=1)
+
+        data = self._get_detail(child)
+
+        self.assertEqual(len(data['quiz_attempts']), 2)
+        for attempt in data['quiz_attempts']:
+            self.assertEqual(attempt['quiz_total_questions'], 3)
+            self.assertEqual(attempt['quiz_total_marks'], 3)
+            self.assertEqual(attempt['correct_answers'], 1)
+            self.assertEqual(attempt['incorrect_answers'], 1)
+            self.assertEqual(attempt['unanswered_questions'], 1)
+            self.assertEqual(attempt['teacher_name'], 'Tina Teacher')
+
+    def test_query_budget_is_independent_of_attempts(self):
+        small = self._add_child('Asha', [(1, 2)] * 3)
+        large = self._add_child('Ravi', [(1, 2)] * 30)
+        self._answer_all(small, correct_count=2)
+        self._answer_all(large, correct_count=2)
+
+        with CaptureQueriesContext(connection) as small_ctx:
+            self._get_detail(small)
+        with CaptureQueriesContext(connection) as large_ctx:
+            self._get_detail(large)
+
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+        self.assertLessEqual(len(large_ctx.captured_queries), 6)
+
+
+def legacy_trends(attempts):
+    """Trend buckets as the original view grouped them in Python"""
+    monthly, weekly = {}, {}
+    for attempt in sorted(attempts, key=lambda a: a.attempted_at):
+        monthly.setdefault(attempt.attempted_at.strftime('%Y-%m'), []).append(attempt)
+        year, week, _ = attempt.attempted_at.isocalendar()
+        weekly.setdefault(f"{year}-W{week:02d}", []).append(attempt)
+
+    def rows(groups):
+        return [
+            {
+                'period': period,
+                'average_percentage': round(sum(a.percentage for a in group) / len(group), 2),
+                'quizzes_taken': len(group),
+                'total_marks': sum(a.score for a in group),
+                'possible_marks': sum(a.total_marks for a in group),
+            }
+            for period, group in groups
+        ]
+
+    return {'monthly': rows(sorted(monthly.items())), 'weekly': rows(sorted(weekly.items())[-8:])}
+
+
+class ParentChildPerformanceTrendsTest(ParentPerformanceTestCase):
+    def test_trends_match_python_grouping(self):
+        results = [((i * 3) % 8, 7 if i % 5 else 9) for i in range(40)]
+        child = self._add_child('Asha', results)
+        # Spread the attempts over several months, a few per week
+        for i, attempt in enumerate(child.quiz_attempts.order_by('attempted_at')):
+            QuizAttempt.objects.filter(pk=attempt.pk).update(
+                attempted_at=timezone.now() - timedelta(days=150 - i * 3, hours=i)
+            )
+        rebuild_daily_rollups()
+
+        response = self.client.get(f'/api/parent/performance/child/{child.id}/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        trends = response.json()['performance_trends']
+        self.assertEqual(trends, legacy_trends(QuizAttempt.objects.filter(student=child, is_completed=True)))
+        self.assertEqual(len(trends['weekly']), 8)
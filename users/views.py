@@ -15,7 +15,9 @@ from .serializers import (
     PerformanceTrendDataSerializer
 )
 from students.models import Student
-from quizzes.models import QuizAttempt, Quiz
+from quizzes.models import QuizAttempt, Quiz, StudentScoreSummary, StudentDailyRollup
+from quizzes.rollups import score_trends
+from quizzes.answer_sheets import load_answers
 
 
 class TeacherRegisterView(APIView):
@@ -73,7 +75,7 @@ class TeacherStudentsView(APIView):
 	def get(self, request, pk):
 		from students.models import Student
 		from students.serializers import StudentSerializer
-		students = Student.objects.filter(teacher_id=pk)
+		students = Student.objects.filter(teacher_id=pk).select_related('parent')
 		return Response(StudentSerializer(students, many=True).data)
 
 class ParentProfileView(APIView):
@@ -112,9 +114,12 @@ class ParentAllChildrenPerformanceView(APIView):
 			return Response({"error": "Not a parent"}, status=403)
 
 		parent = request.user
-		children = Student.objects.filter(parent=parent).select_related('teacher')
+		# Per-child statistics come from the maintained score summaries
+		children = list(
+			Student.objects.filter(parent=parent).select_related('teacher', 'score_summary').order_by('pk')
+		)
 
-		if not children.exists():
+		if not children:
 			return Response({
 				"children_count": 0,
 				"overall_statistics": {},
@@ -127,61 +132,46 @@ class ParentAllChildrenPerformanceView(APIView):
 		total_possible = 0
 
 		for child in children:
-			attempts = QuizAttempt.objects.filter(student=child).select_related('quiz')
-
-			if attempts.exists():
-				completed_attempts = attempts.filter(is_completed=True)
-
-				# Calculate basic statistics
-				completed_count = completed_attempts.count()
-				if completed_count > 0:
-					# Calculate averages and totals separately
-					total_score_child = sum(attempt.score for attempt in completed_attempts)
-					total_possible_child = sum(attempt.total_marks for attempt in completed_attempts)
-					avg_percentage = (total_score_child / total_possible_child * 100) if total_possible_child > 0 else 0
-
-					# Get min/max scores for percentage calculation
-					max_attempt = completed_attempts.order_by('-score').first()
-					min_attempt = completed_attempts.order_by('score').first()
-					max_percentage = (max_attempt.score / max_attempt.total_marks * 100) if max_attempt and max_attempt.total_marks > 0 else 0
-					min_percentage = (min_attempt.score / min_attempt.total_marks * 100) if min_attempt and min_attempt.total_marks > 0 else 0
-				else:
-					total_score_child = 0
-					total_possible_child = 0
-					avg_percentage = 0
-					max_percentage = 0
-					min_percentage = 0
-
-				# Calculate trend (compare last 3 vs previous 3 attempts)
-				recent_attempts = list(completed_attempts.order_by('-attempted_at')[:6])
-				trend = self._calculate_trend(recent_attempts)
-
-				# Performance level
-				performance_level = self._get_performance_level(avg_percentage)
-
-				children_performance.append({
-					"student_id": child.id,
-					"student_name": child.name,
-					"class_name": child.class_name,
-					"teacher_name": child.teacher.get_full_name() or child.teacher.username,
-					"total_quizzes_attempted": attempts.count(),
-					"completed_quizzes": completed_count,
-					"incomplete_quizzes": attempts.filter(is_completed=False).count(),
-					"average_score_percentage": round(avg_percentage, 2),
-					"highest_score_percentage": round(max_percentage, 2),
-					"lowest_score_percentage": round(min_percentage, 2),
-					"total_marks_earned": total_score_child,
-					"total_possible_marks": total_possible_child,
-					"recent_performance_trend": trend,
-					"last_quiz_date": attempts.order_by('-attempted_at').first().attempted_at if attempts.exists() else None,
-					"performance_level": performance_level
-				})
-
-				total_attempts += completed_count
-				total_score += total_score_child
-				total_possible += total_possible_child		# Overall statistics
+			summary = StudentScoreSummary.for_student(child)
+			if not summary.total_attempts:
+				continue
+
+			completed_count = summary.completed_attempts
+			avg_percentage = summary.overall_percentage
+			max_percentage = summary.max_percentage or 0
+			min_percentage = summary.min_percentage or 0
+
+			# Calculate trend (compare last 3 vs previous 3 attempts)
+			trend = self._calculate_trend(summary.recent_values)
+
+			# Performance level
+			performance_level = self._get_performance_level(avg_percentage)
+
+			children_performance.append({
+				"student_id": child.id,
+				"student_name": child.name,
+				"class_name": child.class_name,
+				"teacher_name": child.teacher.get_full_name() or child.teacher.username,
+				"total_quizzes_attempted": summary.total_attempts,
+				"completed_quizzes": completed_count,
+				"incomplete_quizzes": summary.incomplete_attempts,
+				"average_score_percentage": round(avg_percentage, 2),
+				"highest_score_percentage": round(max_percentage, 2),
+				"lowest_score_percentage": round(min_percentage, 2),
+				"total_marks_earned": summary.total_score,
+				"total_possible_marks": summary.total_possible,
+				"recent_performance_trend": trend,
+				"last_quiz_date": summary.last_attempted_at,
+				"performance_level": performance_level
+			})
+
+			total_attempts += completed_count
+			total_score += summary.total_score
+			total_possible += summary.total_possible
+
+		# Overall statistics
 		overall_stats = {
-			"total_children": children.count(),
+			"total_children": len(children),
 			"total_quiz_attempts": total_attempts,
 			"overall_average_percentage": round((total_score / max(total_possible, 1)) * 100, 2),
 			"total_marks_earned": total_score,
@@ -189,25 +179,25 @@ class ParentAllChildrenPerformanceView(APIView):
 		}
 
 		return Response({
-			"children_count": children.count(),
+			"children_count": len(children),
 			"overall_statistics": overall_stats,
 			"children_performance": children_performance
 		})
 
-	def _calculate_trend(self, attempts):
-		"""Calculate performance trend based on recent attempts"""
-		if len(attempts) < 3:
+	def _calculate_trend(self, percentages):
+		"""Calculate performance trend from recent attempt percentages, newest first"""
+		if len(percentages) < 3:
 			return "insufficient_data"
 
 		# Split into recent vs older attempts
-		recent = attempts[:3]
-		older = attempts[3:6] if len(attempts) >= 6 else attempts[3:]
+		recent = percentages[:3]
+		older = percentages[3:6] if len(percentages) >= 6 else percentages[3:]
 
 		if not older:
 			return "insufficient_data"
 
-		recent_avg = sum(a.percentage for a in recent) / len(recent)
-		older_avg = sum(a.percentage for a in older) / len(older)
+		recent_avg = sum(recent) / len(recent)
+		older_avg = sum(older) / len(older)
 
 		diff = recent_avg - older_avg
 
@@ -243,26 +233,26 @@ class ParentChildPerformanceDetailView(APIView):
 			return Response({"error": "Not a parent"}, status=403)
 
 		try:
-			child = Student.objects.select_related('teacher').get(
+			child = Student.objects.select_related('teacher', 'score_summary').get(
 				id=child_id,
 				parent=request.user
 			)
 		except Student.DoesNotExist:
 			return Response({"error": "Child not found"}, status=404)
 
-		# Get all quiz attempts for this child
-		attempts = QuizAttempt.objects.filter(student=child).select_related('quiz').order_by('-attempted_at')
+		# Get all quiz attempts for this child, with quiz totals and answer counts
+		attempts = list(QuizAttemptPerformanceSerializer.setup_eager_loading(
+			QuizAttempt.objects.filter(student=child)
+		).order_by('-attempted_at'))
 
 		# Performance summary
-		performance_summary = self._get_child_performance_summary(child, attempts)
+		performance_summary = self._get_child_performance_summary(child)
 
 		# Detailed quiz attempts
-		quiz_attempts = []
-		for attempt in attempts:
-			quiz_attempts.append(QuizAttemptPerformanceSerializer(attempt).data)
+		quiz_attempts = QuizAttemptPerformanceSerializer(attempts, many=True).data
 
 		# Performance trends (monthly)
-		performance_trends = self._get_performance_trends(attempts)
+		performance_trends = self._get_performance_trends(child)
 
 		return Response({
 			"student_id": child.id,
@@ -274,9 +264,10 @@ class ParentChildPerformanceDetailView(APIView):
 			"performance_trends": performance_trends
 		})
 
-	def _get_child_performance_summary(self, child, attempts):
-		"""Get performance summary for a child"""
-		if not attempts.exists():
+	def _get_child_performance_summary(self, child):
+		"""Get performance summary for a child from its maintained score summary"""
+		summary = StudentScoreSummary.for_student(child)
+		if not summary.total_attempts:
 			return {
 				"student_id": child.id,
 				"student_name": child.name,
@@ -295,57 +286,40 @@ class ParentChildPerformanceDetailView(APIView):
 				"performance_level": "No Data"
 			}
 
-		completed_attempts = attempts.filter(is_completed=True)
-
-		if completed_attempts.exists():
-			# Calculate averages and statistics
-			percentages = [attempt.percentage for attempt in completed_attempts]
-			avg_percentage = sum(percentages) / len(percentages)
-
-			# Calculate totals without aggregation conflicts
-			total_marks_earned = sum(attempt.score for attempt in completed_attempts)
-			total_possible_marks = sum(attempt.total_marks for attempt in completed_attempts)
-		else:
-			avg_percentage = 0
-			percentages = []
-			total_marks_earned = 0
-			total_possible_marks = 0
-
-		# Calculate trend
-		trend = self._calculate_trend(list(completed_attempts[:6]))
+		avg_percentage = summary.average_percentage
 
 		return {
 			"student_id": child.id,
 			"student_name": child.name,
 			"class_name": child.class_name,
 			"teacher_name": child.teacher.get_full_name() or child.teacher.username,
-			"total_quizzes_attempted": attempts.count(),
-			"completed_quizzes": completed_attempts.count(),
-			"incomplete_quizzes": attempts.filter(is_completed=False).count(),
+			"total_quizzes_attempted": summary.total_attempts,
+			"completed_quizzes": summary.completed_attempts,
+			"incomplete_quizzes": summary.incomplete_attempts,
 			"average_score_percentage": round(avg_percentage, 2),
-			"highest_score_percentage": round(max(percentages) if percentages else 0, 2),
-			"lowest_score_percentage": round(min(percentages) if percentages else 0, 2),
-			"total_marks_earned": total_marks_earned,
-			"total_possible_marks": total_possible_marks,
-			"recent_performance_trend": trend,
-			"last_quiz_date": attempts.first().attempted_at if attempts.exists() else None,
+			"highest_score_percentage": round(summary.max_percentage or 0, 2),
+			"lowest_score_percentage": round(summary.min_percentage or 0, 2),
+			"total_marks_earned": summary.total_score,
+			"total_possible_marks": summary.total_possible,
+			"recent_performance_trend": self._calculate_trend(summary.recent_values),
+			"last_quiz_date": summary.last_attempted_at,
 			"performance_level": self._get_performance_level(avg_percentage)
 		}
 
-	def _calculate_trend(self, attempts):
-		"""Calculate performance trend based on recent attempts"""
-		if len(attempts) < 3:
+	def _calculate_trend(self, percentages):
+		"""Calculate performance trend from recent attempt percentages, newest first"""
+		if len(percentages) < 3:
 			return "insufficient_data"
 
 		# Split into recent vs older attempts
-		recent = attempts[:3]
-		older = attempts[3:6] if len(attempts) >= 6 else attempts[3:]
+		recent = percentages[:3]
+		older = percentages[3:6] if len(percentages) >= 6 else percentages[3:]
 
 		if not older:
 			return "insufficient_data"
 
-		recent_avg = sum(a.percentage for a in recent) / len(recent)
-		older_avg = sum(a.percentage for a in older) / len(older)
+		recent_avg = sum(recent) / len(recent)
+		older_avg = sum(older) / len(older)
 
 		diff = recent_avg - older_avg
 
@@ -369,61 +343,9 @@ class ParentChildPerformanceDetailView(APIView):
 		else:
 			return "Needs Improvement"
 
-	def _get_performance_trends(self, attempts):
-		"""Get performance trends over time"""
-		completed_attempts = attempts.filter(is_completed=True).order_by('attempted_at')
-
-		if not completed_attempts.exists():
-			return {"monthly": [], "weekly": []}
-
-		# Monthly trends
-		monthly_data = {}
-		weekly_data = {}
-
-		for attempt in completed_attempts:
-			# Monthly grouping
-			month_key = attempt.attempted_at.strftime('%Y-%m')
-			if month_key not in monthly_data:
-				monthly_data[month_key] = {'attempts': [], 'period': month_key}
-			monthly_data[month_key]['attempts'].append(attempt)
-
-			# Weekly grouping (ISO week)
-			year, week, _ = attempt.attempted_at.isocalendar()
-			week_key = f"{year}-W{week:02d}"
-			if week_key not in weekly_data:
-				weekly_data[week_key] = {'attempts': [], 'period': week_key}
-			weekly_data[week_key]['attempts'].append(attempt)
-
-		# Process monthly data
-		monthly_trends = []
-		for period, data in sorted(monthly_data.items()):
-			attempts_list = data['attempts']
-			percentages = [a.percentage for a in attempts_list]
-			monthly_trends.append({
-				"period": period,
-				"average_percentage": round(sum(percentages) / len(percentages), 2),
-				"quizzes_taken": len(attempts_list),
-				"total_marks": sum(a.score for a in attempts_list),
-				"possible_marks": sum(a.total_marks for a in attempts_list)
-			})
-
-		# Process weekly data (last 8 weeks only)
-		weekly_trends = []
-		for period, data in sorted(weekly_data.items())[-8:]:
-			attempts_list = data['attempts']
-			percentages = [a.percentage for a in attempts_list]
-			weekly_trends.append({
-				"period": period,
-				"average_percentage": round(sum(percentages) / len(percentages), 2),
-				"quizzes_taken": len(attempts_list),
-				"total_marks": sum(a.score for a in attempts_list),
-				"possible_marks": sum(a.total_marks for a in attempts_list)
-			})
-
-		return {
-			"monthly": monthly_trends,
-			"weekly": weekly_trends
-		}
+	def _get_performance_trends(self, child):
+		"""Get monthly and weekly performance trends from the child's daily rollups"""
+		return score_trends(StudentDailyRollup.objects.filter(student=child))
 
 
 class ParentChildQuizAttemptDetailView(APIView):
@@ -438,7 +360,9 @@ class ParentChildQuizAttemptDetailView(APIView):
 
 		try:
 			child = Student.objects.get(id=child_id, parent=request.user)
-			attempt = QuizAttempt.objects.select_related('quiz').prefetch_related('answers__question').get(
+			attempt = QuizAttemptPerformanceSerializer.setup_eager_loading(
+				QuizAttempt.objects.all()
+			).get(
 				id=attempt_id,
 				student=child
 			)
@@ -448,8 +372,9 @@ class ParentChildQuizAttemptDetailView(APIView):
 		# Get detailed quiz attempt data
 		attempt_data = QuizAttemptPerformanceSerializer(attempt).data
 
-		# Get question-by-question breakdown
-		answers = attempt.answers.select_related('question').all()
+		# Get question-by-question breakdown from the attempt's packed answer sheet
+		questions = attempt.quiz.questions.in_bulk()
+		answers = load_answers([attempt], questions)[attempt.pk]
 		question_breakdown = []
 
 		for answer in answers:
@@ -468,8 +393,10 @@ class ParentChildQuizAttemptDetailView(APIView):
 			})
 
 		# Add unanswered questions
-		answered_question_ids = [answer.question.id for answer in answers]
-		unanswered_questions = attempt.quiz.questions.exclude(id__in=answered_question_ids)
+		answered_question_ids = {answer.question.id for answer in answers}
+		unanswered_questions = [
+			question for question in questions.values() if question.id not in answered_question_ids
+		]
 
 		for question in unanswered_questions:
 			question_breakdown.append({